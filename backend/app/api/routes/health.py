@@ -0,0 +1,89 @@
+"""
+Health check endpoints for the Baseball Stats Dashboard.
+
+This module provides the endpoints used by Kubernetes probes and monitoring:
+- /healthz reports whether MongoDB is reachable, along with connection pool,
+  admission control and query cache usage (and shared cache usage and
+  scatter-gather query counts, if enabled); it backs the liveness probe
+- /readyz reports whether this instance should receive traffic
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+from app.db.mongodb import ping_mongo, get_pool_stats, get_sharding_stats
+from app.services.query_cache import get_query_cache
+from app.services.shared_cache import get_shared_cache
+
+router = APIRouter(tags=["Health"])
+
+
+def _admission_stats(request: Request) -> dict:
+    admission = getattr(request.app.state, "admission", None)
+    return admission.stats() if admission is not None else {}
+
+
+@router.get("/healthz")
+async def healthz(request: Request):
+    """
+    Health endpoint for monitoring.
+    
+    Returns:
+        dict: MongoDB reachability, connection pool usage, admission control
+        usage and query cache usage (including its hit ratio and size in
+        bytes), and with a shard key, targeted and scatter-gather query
+        counts. Responds with 503 if MongoDB cannot be reached.
+    """
+    mongo_reachable = await ping_mongo()
+    content = {
+        "status": "ok" if mongo_reachable else "unavailable",
+        "mongodb": {"reachable": mongo_reachable, "pool": get_pool_stats()},
+        "admission": _admission_stats(request),
+        "query_cache": get_query_cache().stats(),
+    }
+    shared = get_shared_cache()
+    if shared is not None:
+        content["shared_cache"] = shared.stats()
+    sharding = get_sharding_stats()
+    if sharding is not None:
+        content["sharding"] = sharding
+    if not mongo_reachable:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=content)
+    return content
+
+
+@router.get("/readyz")
+async def readyz(request: Request):
+    """
+    Readiness endpoint for Kubernetes probes.
+    
+    Reports ready only once startup has connected to MongoDB and created the
+    collection indexes, MongoDB is still reachable, and the connection pool
+    has connections to spare. Reports not ready again while shutting down.
+    While index creation keeps failing, the response includes the last error.
+    """
+    if not getattr(request.app.state, "ready", False):
+        content = {"status": "starting"}
+        error = getattr(request.app.state, "bootstrap_error", None)
+        if error:
+            content["error"] = error
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=content,
+        )
+    
+    if not await ping_mongo():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "mongodb unreachable"},
+        )
+    
+    pool = get_pool_stats()
+    if pool["headroom"] <= 0:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "mongodb pool exhausted", "pool": pool},
+        )
+    
+    return {"status": "ready"}
@@ -0,0 +1,88 @@
+"""
+Background job API endpoints for the Baseball Stats Dashboard.
+
+This module provides API endpoints for running long-running work off the
+request path, including:
+- Submitting an ingest or description backfill job
+- Checking the status and progress of a job
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from fastapi import APIRouter, HTTPException, status
+
+from app.models.job import Job, JobCreate
+from app.services.jobs import JobQueueFull, get_job_runner
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.post("/", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(job: JobCreate):
+    """
+    Submit a background job.
+    
+    The job is queued and runs in the background; poll ``GET /api/jobs/{id}``
+    for its progress and result.
+    
+    Args:
+        job: The job type and its parameters.
+        
+    Returns:
+        Job: The queued job.
+        
+    Raises:
+        HTTPException: If the job queue is full.
+        
+    Example:
+        ```
+        POST /api/jobs/
+        {
+            "type": "description_backfill",
+            "params": {"limit": 100}
+        }
+        ```
+    """
+    runner = get_job_runner()
+    if runner is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job runner is not running"
+        )
+    
+    try:
+        return await runner.submit(job.type.value, job.params)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"},
+        )
+
+
+@router.get("/{id}", response_model=Job)
+async def get_job(id: str):
+    """
+    Retrieve the status and progress of a background job.
+    
+    Args:
+        id: The unique identifier of the job.
+        
+    Returns:
+        Job: The job, including its progress and, once finished, its result or error.
+        
+    Raises:
+        HTTPException: If the job is not found.
+        
+    Example:
+        ```
+        GET /api/jobs/5f0c6d2e9a7b4c1d8e3f2a1b0c9d8e7f
+        ```
+    """
+    runner = get_job_runner()
+    job = await runner.get(id) if runner is not None else None
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {id} not found"
+        )
+    return job
@@ -7,90 +7,402 @@ This module provides API endpoints for managing baseball player data, including:
 - Adding new players
 - Updating existing players
 - Deleting players
-- Generating AI-enhanced descriptions for players
+- Generating AI-enhanced descriptions for players, optionally streamed token by token
 - Loading sample player data
+- Retrieving the players changed since a given change sequence value
+- Streaming live player change events
+- Exporting players in bulk as CSV, Parquet or Arrow
+- Importing players in bulk from CSV, NDJSON or Parquet
+- Finding the player-seasons most similar to a player
+
+Generated descriptions are cached on the player document and dropped when the
+player is replaced, so a description is only generated once per player version.
+
+Routes access player data through the ``PlayerRepository`` provided by the
+``get_player_repository`` dependency. Routes by player ID take an optional
+``year`` parameter, the player's season, which they pass on with the ID so a
+collection sharded on (Year, id) can serve them from a single shard.
 
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any
-import httpx
-from openai import OpenAI
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncIterator, Optional
 
-from app.models.player import Player, PlayerWithDescription
-from app.db.mongodb import get_collection
+from app.models.player import Player, PlayerChanges, PlayerImportResult, PlayerWithDescription, SimilarPlayer
 from app.core.config import settings
+from app.services.export import EXPORT_FIELDS, EXPORT_FORMATS, build_player_filter, export_players
+from app.services.importer import ImportFormatError, detect_import_format, import_players
+from app.services.changes import resume_seq
+from app.services.events import event_stream, format_event, get_event_bus, publishes_locally
+from app.services.llm import get_description_batcher, get_description_provider
+from app.services.query_cache import cached_query, invalidate_queries
+from app.services.shared_cache import get_shared_cache
+from app.services.player_jobs import IngestError, ingest_players
+from app.services.repository import PlayerRepository, get_player_repository
+from app.services.similarity import get_similarity_index
+from app.services.static_views import etag_of, render_players
 
 router = APIRouter(prefix="/players", tags=["Players"])
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# The season of the player a route is for, passed on as part of the shard key
+season_hint = Query(None, description="The player's season, if known; lets a sharded cluster serve the request from one shard")
 
+def default_player_description(player: Dict[str, Any]) -> str:
+    """
+    Build the description used when no AI-generated description is available.
+    """
+    return f"No AI-generated description available for {player['Player']} at this time. During the {player['Year']} season, they recorded {player['Hits']} hits at age {player['AgeThatYear']}."
 
-async def generate_player_description(player: Dict[str, Any]) -> str:
+
+async def generate_player_description(player: Dict[str, Any], fallback: bool = True) -> str:
     """
-    Generate an AI-enhanced description for a baseball player using OpenAI.
+    Generate an AI-enhanced description for a baseball player.
+    
+    Requests are batched with other concurrent description requests and sent
+    to the configured provider (OpenAI by default).
     
     Args:
         player: A dictionary containing player information.
-        
+        fallback: Return a default description instead of raising on API errors.
+    
     Returns:
         str: An AI-generated description of the player.
-        
+    
     Raises:
-        Exception: If there's an error communicating with the OpenAI API.
+        Exception: If there's an error communicating with the provider and fallback is False.
     """
     try:
-        response = openai_client.completions.create(
-            model="gpt-3.5-turbo-instruct",
-            prompt=f"Write a detailed description for the baseball player: {player['Player']}. Include information about their {player['Year']} season when they had {player['Hits']} hits at age {player['AgeThatYear']}.",
-            max_tokens=250
-        )
-        return response.choices[0].text.strip()
+        return await get_description_batcher().describe(player)
     except Exception as e:
+        if not fallback:
+            raise
         # Return a default description in case of API failure
-        return f"No AI-generated description available for {player['Player']} at this time. During the {player['Year']} season, they recorded {player['Hits']} hits at age {player['AgeThatYear']}."
+        print(f"Error generating description for player {player.get('id')}: {e}")
+        return default_player_description(player)
+
+
+async def generate_shared_description(player: Dict[str, Any]) -> str:
+    """
+    Generate a player's description once across all pods.
+    
+    With the shared cache tier enabled, concurrent requests for the same
+    version of a player wait for a single generation, and a description
+    generated by any pod is reused until the player changes.
+    
+    Args:
+        player: A dictionary containing player information.
+    
+    Returns:
+        str: An AI-generated description of the player.
+    
+    Raises:
+        Exception: If there's an error communicating with the provider.
+    """
+    shared = get_shared_cache()
+    if shared is None:
+        return await generate_player_description(player, fallback=False)
+    
+    async def generate() -> bytes:
+        return (await generate_player_description(player, fallback=False)).encode()
+    
+    key = _description_key(shared, player)
+    return (await shared.get_or_compute(key, generate, settings.SHARED_CACHE_DESCRIPTION_TTL)).decode()
+
+
+def _description_key(shared, player: Dict[str, Any]) -> str:
+    return shared.key("description", player["id"], player.get("_seq", 0))
+
+
+async def get_shared_description(player: Dict[str, Any]) -> Optional[str]:
+    """
+    Get a description another request or pod generated for this version of a
+    player, or None if there is none (or the shared cache tier is off or down).
+    """
+    shared = get_shared_cache()
+    if shared is None or not shared.available:
+        return None
+    try:
+        value = await shared.get(_description_key(shared, player))
+    except Exception:
+        shared.record_error()
+        return None
+    return value.decode() if value is not None else None
+
+
+async def share_description(player: Dict[str, Any], description: str):
+    """
+    Store a generated description in the shared cache tier, for other pods to reuse.
+    """
+    shared = get_shared_cache()
+    if shared is None or not shared.available:
+        return
+    try:
+        await shared.set(_description_key(shared, player), description.encode(), settings.SHARED_CACHE_DESCRIPTION_TTL)
+    except Exception:
+        shared.record_error()
+
+
+async def save_description(repository: PlayerRepository, player: Dict[str, Any], description: str):
+    """
+    Cache a generated description on the player, logging rather than raising
+    on failure so the caller can still return the description.
+    """
+    try:
+        await repository.set_description(player["id"], description, year=player["Year"])
+    except Exception as e:
+        print(f"Error saving description for player {player['id']}: {e}")
+
+
+async def stream_player_description(player: Dict[str, Any]) -> AsyncIterator[str]:
+    """
+    Generate a player description, yielding text as it is produced.
+    
+    Args:
+        player: A dictionary containing player information.
+    
+    Yields:
+        str: The next piece of generated text.
+    
+    Raises:
+        Exception: If there's an error communicating with the provider.
+    """
+    async for text in get_description_provider().stream_description(player):
+        yield text
 
 
 @router.get("/", response_model=List[Player])
-async def get_players():
+async def get_players(
+    year: Optional[int] = Query(None, description="Only list players from this season"),
+    if_none_match: Optional[str] = Header(None),
+    repository: PlayerRepository = Depends(get_player_repository),
+):
     """
     Retrieve all baseball players from the database.
     
+    The ``X-Change-Seq`` response header holds the change sequence value the
+    list is current as of; pass it to ``GET /api/players/changes`` to fetch
+    only what changed afterwards. The list may be served by a secondary, and
+    is served from the query cache until the next player write by any worker.
+    
+    Listing every season reads from every shard of a sharded cluster; with
+    ``year`` and a (Year, id) shard key, only the shards holding that season
+    are read.
+    
+    The ``ETag`` response header is a hash of the list, and requests with a
+    matching ``If-None-Match`` header get an empty 304 response. With
+    STATIC_VIEWS_DIR set, nginx serves these lists from pre-rendered files
+    and only passes requests on when a list has not been rendered.
+    
+    Args:
+        year: Only list players from this season (optional).
+        if_none_match: The ETag of the list the client already has, if any.
+    
     Returns:
-        List[Player]: A list of all baseball players.
-        
+        List[Player]: A list of all baseball players (at most 1000).
+    
+    Example:
+        ```
+        GET /api/players/?year=2004
+        ```
+    """
+    async def list_players():
+        seq, players = await repository.snapshot(1000, year=year)
+        body = render_players(players)
+        return body, {"X-Change-Seq": str(seq), "ETag": etag_of(body)}
+    
+    cached = await cached_query("players", list_players, seq=await repository.change_seq(), limit=1000, year=year)
+    if if_none_match is not None and if_none_match == cached.headers.get("ETag"):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cached.headers)
+    return Response(content=cached.body, media_type="application/json", headers=cached.headers)
+
+
+@router.get("/changes", response_model=PlayerChanges)
+async def get_player_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    repository: PlayerRepository = Depends(get_player_repository),
+):
+    """
+    Retrieve the players inserted, updated or deleted since a change sequence value.
+    
+    Clients load the full list once, then poll this endpoint with the ``seq``
+    from the previous response, removing the ``deleted`` IDs and then applying
+    the ``upserted`` players. While ``has_more`` is true, call again straight away.
+    
+    Args:
+        since: The last change sequence value the client has applied.
+        limit: The maximum number of changes to return.
+    
+    Returns:
+        PlayerChanges: The changed players, deleted player IDs and the new sequence value.
+    
+    Example:
+        ```
+        GET /api/players/changes?since=42
+        ```
+    """
+    return await repository.changes_since(since, limit)
+
+
+@router.get("/events")
+async def stream_player_events(
+    year: List[int] = Query([]),
+    id: List[int] = Query([]),
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Stream player change events as server-sent events.
+    
+    Each ``upserted`` event carries the player and each ``deleted`` event its ID.
+    The event ID is a change sequence value every change up to which had been
+    sent when the event was, so reconnecting clients resume without skipping
+    changes (it may repeat some). A ``resync`` event means events
+    were skipped (the client fell behind, or many players changed at once) and
+    the client should catch up with ``GET /api/players/changes?since=<since>``.
+    
+    Args:
+        year: Only stream events for players in these seasons (repeatable).
+        id: Only stream events for these players (repeatable).
+        last_event_id: Sent by reconnecting EventSource clients; triggers a resync.
+    
+    Example:
+        ```
+        GET /api/players/events?year=2021&year=2022
+        ```
+    """
+    subscription = get_event_bus().subscribe(years=year, ids=id, last_seq=last_event_id or 0)
+    if last_event_id is not None:
+        # Events published while the client was disconnected were not kept
+        subscription.resync()
+    return StreamingResponse(
+        event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+async def export_player_data(
+    format: str = Query("csv", pattern="^(csv|parquet|arrow)$"),
+    year: Optional[int] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    min_hits: Optional[int] = None,
+    repository: PlayerRepository = Depends(get_player_repository),
+):
+    """
+    Export players in bulk, streamed straight from the database.
+    
+    Players are read with a server-side filter and written out batch by batch,
+    so exports of any size run in constant memory. Exports may be served by
+    a secondary.
+    
+    Args:
+        format: ``csv``, ``parquet`` or ``arrow`` (Arrow IPC stream).
+        year: Only export players from this season.
+        year_min: Only export players from this season onwards.
+        year_max: Only export players up to this season.
+        min_hits: Only export players with at least this many hits.
+    
     Example:
         ```
-        GET /api/players/
+        GET /api/players/export?format=parquet&year_min=2000
         ```
     """
-    collection = get_collection()
-    players = await collection.find().to_list(1000)
-    return players
+    query = build_player_filter(year, year_min, year_max, min_hits)
+    cursor = repository.find(query, EXPORT_FIELDS, batch_size=settings.EXPORT_BATCH_SIZE)
+    
+    media_type, filename = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_players(cursor, format, settings.EXPORT_BATCH_SIZE),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=PlayerImportResult)
+async def import_player_data(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson|parquet)$"),
+    repository: PlayerRepository = Depends(get_player_repository),
+):
+    """
+    Import players in bulk from an uploaded file.
+    
+    The file is read and validated in chunks, and the valid players in each
+    chunk are inserted or replaced (by ID) with a single bulk write. Rows that
+    cannot be parsed, fail validation or fail to write are skipped and
+    reported by row number (the header line of a CSV file is not counted).
+    
+    Args:
+        file: The file to import, sent as ``multipart/form-data``.
+        format: ``csv``, ``ndjson`` or ``parquet``; detected from the file name
+            or content type if omitted.
+    
+    Returns:
+        PlayerImportResult: Row counts and the errors for the rows that were skipped.
+    
+    Raises:
+        HTTPException: If the format is unknown or the file cannot be read.
+    
+    Example:
+        ```
+        curl -F "file=@players.csv" http://localhost:8000/api/players/import
+        ```
+    """
+    format = format or detect_import_format(file.filename, file.content_type)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not detect the file format; pass format=csv, ndjson or parquet"
+        )
+    
+    try:
+        result = await import_players(
+            repository,
+            file.file,
+            format,
+            batch_size=settings.IMPORT_BATCH_SIZE,
+            max_errors=settings.MAX_IMPORT_ERRORS,
+        )
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    finally:
+        await file.close()
+    
+    if result["inserted"] + result["updated"]:
+        await invalidate_queries()
+        if publishes_locally():
+            get_event_bus().publish_resync()
+    
+    return result
 
 
 @router.get("/{id}", response_model=Player)
-async def get_player(id: int):
+async def get_player(id: int, year: Optional[int] = season_hint, repository: PlayerRepository = Depends(get_player_repository)):
     """
     Retrieve a specific baseball player by ID.
     
     Args:
         id: The unique identifier of the player.
-        
+        year: The player's season, if known.
+    
     Returns:
         Player: The requested player information.
-        
+    
     Raises:
         HTTPException: If the player with the specified ID is not found.
-        
+    
     Example:
         ```
-        GET /api/players/1
+        GET /api/players/1?year=2021
         ```
     """
-    collection = get_collection()
-    player = await collection.find_one({"id": id})
+    player = await repository.get(id, year)
     if player is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,64 +411,183 @@ async def get_player(id: int):
     return player
 
 
+@router.get("/{id}/similar", response_model=List[SimilarPlayer])
+async def get_similar_players(
+    id: int,
+    k: int = Query(10, ge=1, le=settings.MAX_SIMILAR_PLAYERS, description="Number of similar players to return"),
+    repository: PlayerRepository = Depends(get_player_repository),
+):
+    """
+    Retrieve the player-seasons most statistically similar to a player.
+    
+    Players are compared on hits, age, season, at-bats and rank, each
+    standardized so they count equally. The search runs against an in-memory
+    index that is at most SIMILARITY_REFRESH_INTERVAL seconds behind writes.
+    
+    Args:
+        id: The unique identifier of the player.
+        k: The number of similar players to return.
+    
+    Returns:
+        List[SimilarPlayer]: The most similar players, closest first, with their distance.
+    
+    Raises:
+        HTTPException: If the player with the specified ID is not found.
+    
+    Example:
+        ```
+        GET /api/players/1/similar?k=5
+        ```
+    """
+    index = get_similarity_index()
+    await index.refresh(repository, max_age=settings.SIMILARITY_REFRESH_INTERVAL)
+    nearest = index.nearest(id, k)
+    if nearest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player with ID {id} not found"
+        )
+    
+    distances = dict(nearest)
+    players = [player async for player in repository.find({"id": {"$in": list(distances)}})]
+    return sorted(
+        (SimilarPlayer(**player, distance=distances[player["id"]]) for player in players),
+        key=lambda player: player.distance,
+    )
+
+
 @router.get("/description/{id}", response_model=PlayerWithDescription)
-async def describe_player(id: int):
+async def describe_player(id: int, year: Optional[int] = season_hint, repository: PlayerRepository = Depends(get_player_repository)):
     """
     Retrieve a player with an AI-generated description.
     
     This endpoint fetches a player by ID and enhances it with an AI-generated
-    description using OpenAI's GPT model.
+    description using OpenAI's GPT model. The description is cached on the
+    player, so it is only generated on the first request.
     
     Args:
         id: The unique identifier of the player.
-        
+        year: The player's season, if known.
+    
     Returns:
         PlayerWithDescription: The player information with an AI-generated description.
-        
+    
     Raises:
         HTTPException: If the player is not found or if there's an error generating the description.
-        
+    
     Example:
         ```
         GET /api/players/description/1
         ```
     """
-    collection = get_collection()
-    player = await collection.find_one({"id": id})
+    player = await repository.get(id, year)
     if player is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Player with ID {id} not found"
         )
     
-    # Generate description using OpenAI
-    try:
-        description = await generate_player_description(player)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating description: {str(e)}"
-        )
+    description = player.get("description")
+    if not description:
+        # Generate description using OpenAI, caching it only if generation succeeded
+        try:
+            description = await generate_shared_description(player)
+        except Exception as e:
+            print(f"Error generating description for player {id}: {e}")
+            description = default_player_description(player)
+        else:
+            await save_description(repository, player, description)
     
     player_with_description = PlayerWithDescription(**player, description=description)
     return player_with_description
 
 
+@router.get("/description/{id}/stream")
+async def stream_describe_player(id: int, year: Optional[int] = season_hint, repository: PlayerRepository = Depends(get_player_repository)):
+    """
+    Stream a player's AI-generated description as server-sent events.
+    
+    Sends a ``token`` event for each piece of text as the model produces it,
+    then a ``done`` event with the full description, which is also cached on
+    the player and in the shared cache tier. A description cached on the
+    player, or generated for this version of it by another pod, is sent as a
+    single ``token`` event. If
+    generation fails before any text is sent, the default description is sent
+    instead; if it fails part way, an ``error`` event ends the stream. Neither
+    is cached.
+    
+    Args:
+        id: The unique identifier of the player.
+        year: The player's season, if known.
+    
+    Raises:
+        HTTPException: If the player is not found.
+    
+    Example:
+        ```
+        GET /api/players/description/1/stream
+        ```
+    """
+    player = await repository.get(id, year)
+    if player is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player with ID {id} not found"
+        )
+    
+    async def tokens():
+        description = player.get("description")
+        if not description:
+            description = await get_shared_description(player)
+            if description:
+                await save_description(repository, player, description)
+        if description:
+            yield format_event("token", {"text": description})
+            yield format_event("done", {"description": description})
+            return
+        
+        parts = []
+        try:
+            async for text in stream_player_description(player):
+                parts.append(text)
+                yield format_event("token", {"text": text})
+        except Exception:
+            if parts:
+                # Don't cache a truncated description
+                yield format_event("error", {"detail": "Description generation was interrupted"})
+                return
+            description = default_player_description(player)
+            yield format_event("token", {"text": description})
+            yield format_event("done", {"description": description})
+            return
+        
+        description = "".join(parts).strip()
+        await share_description(player, description)
+        await save_description(repository, player, description)
+        yield format_event("done", {"description": description})
+    
+    return StreamingResponse(
+        tokens(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/{id}", status_code=status.HTTP_201_CREATED)
-async def add_player(id: int, player: Player):
+async def add_player(id: int, player: Player, repository: PlayerRepository = Depends(get_player_repository)):
     """
     Add a new baseball player to the database.
     
     Args:
         id: The unique identifier for the new player.
         player: The player information to add.
-        
+    
     Returns:
         dict: A message confirming the player was added successfully.
-        
+    
     Raises:
         HTTPException: If a player with the specified ID already exists or if there's an error adding the player.
-        
+    
     Example:
         ```
         POST /api/players/3
@@ -169,10 +600,8 @@ async def add_player(id: int, player: Player):
         }
         ```
     """
-    collection = get_collection()
-    
-    # Check if player with this ID already exists
-    existing_player = await collection.find_one({"id": id})
+    # Check if player with this ID already exists, in any season (so on every shard)
+    existing_player = await repository.get(id)
     if existing_player:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -180,31 +609,41 @@ async def add_player(id: int, player: Player):
         )
     
     # Insert new player
-    result = await collection.insert_one(player.model_dump())
-    if not result.acknowledged:
+    document = await repository.insert(player.model_dump())
+    if document is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to add player"
         )
     
+    await invalidate_queries()
+    if publishes_locally():
+        get_event_bus().publish_upsert(document, resume_seq(document))
+    
     return {"message": "Player added successfully", "player_id": id}
 
 
 @router.put("/{id}", response_model=Player)
-async def update_player(id: int, player: Player):
+async def update_player(
+    id: int,
+    player: Player,
+    year: Optional[int] = season_hint,
+    repository: PlayerRepository = Depends(get_player_repository),
+):
     """
     Update an existing baseball player.
     
     Args:
         id: The unique identifier of the player to update.
         player: The updated player information.
-        
+        year: The player's current season, if known (the update may change it).
+    
     Returns:
         Player: The updated player information.
-        
+    
     Raises:
         HTTPException: If the player is not found or if there's an error updating the player.
-        
+    
     Example:
         ```
         PUT /api/players/2
@@ -217,10 +656,8 @@ async def update_player(id: int, player: Player):
         }
         ```
     """
-    collection = get_collection()
-    
     # Check if player exists
-    existing_player = await collection.find_one({"id": id})
+    existing_player = await repository.get(id, year)
     if not existing_player:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -228,105 +665,94 @@ async def update_player(id: int, player: Player):
         )
     
     # Update player
-    result = await collection.replace_one({"id": id}, player.model_dump())
-    if result.modified_count == 0:
+    document = await repository.replace(id, player.model_dump(), year=existing_player.get("Year"))
+    if document is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update player"
         )
     
+    await invalidate_queries()
+    if publishes_locally():
+        get_event_bus().publish_upsert(document, resume_seq(document))
+    
     return player
 
 
 @router.delete("/{id}", status_code=status.HTTP_200_OK)
-async def delete_player(id: int):
+async def delete_player(id: int, year: Optional[int] = season_hint, repository: PlayerRepository = Depends(get_player_repository)):
     """
     Delete a baseball player from the database.
     
     Args:
         id: The unique identifier of the player to delete.
-        
+        year: The player's season, if known.
+    
     Returns:
         dict: A message confirming the player was deleted successfully.
-        
+    
     Raises:
         HTTPException: If the player is not found.
-        
+    
     Example:
         ```
         DELETE /api/players/3
         ```
     """
-    collection = get_collection()
-    
-    # Delete player
-    result = await collection.delete_one({"id": id})
-    if result.deleted_count == 0:
+    # Delete player, leaving a tombstone
+    tombstone = await repository.delete(id, year)
+    if tombstone is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Player with ID {id} not found"
         )
     
+    await invalidate_queries()
+    if publishes_locally():
+        get_event_bus().publish_delete(id, resume_seq(tombstone))
+    
     return {"message": f"Player with ID {id} deleted successfully"}
 
 
 @router.get("/load", status_code=status.HTTP_200_OK)
-async def load_players():
+async def load_players(repository: PlayerRepository = Depends(get_player_repository)):
     """
     Load sample baseball player data from an external API.
     
     This endpoint fetches baseball player data from an external API and populates
     the database with the retrieved data. It only loads data if the collection is empty.
+    For large datasets, submit an ``ingest`` job to ``POST /api/jobs`` instead.
     
     Returns:
         dict: A message indicating the number of players loaded or that the collection already contains data.
-        
+    
     Raises:
         HTTPException: If there's an error fetching data from the external API or inserting it into the database.
-        
+    
     Example:
         ```
         GET /api/players/load
         ```
     """
-    collection = get_collection()
-    
     # Check if collection is empty
-    count = await collection.count_documents({})
+    count = await repository.count()
     if count > 0:
         return {"message": f"Collection already contains {count} players"}
     
-    # Fetch players from external API
+    skipped = 0
+    
+    async def count_skipped(errors: List[Dict[str, Any]]):
+        nonlocal skipped
+        skipped = len(errors)
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(settings.BASEBALL_API_URL)
-            response.raise_for_status()
-            players_data = response.json()
-    except httpx.RequestError as e:
+        loaded = await ingest_players(repository, on_errors=count_skipped)
+    except IngestError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching data: {str(e)}"
+            detail=str(e)
         )
     
-    # Insert players into database
-    if isinstance(players_data, list) and len(players_data) > 0:
-        # Calculate missing ranks if needed
-        for player in players_data:
-            if not player.get("Rank"):
-                # Simple ranking based on hits (higher hits = better rank)
-                player["Rank"] = str(player.get("Hits", 0))
-        
-        # Insert players
-        result = await collection.insert_many(players_data)
-        if not result.acknowledged:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to insert players"
-            )
-        
-        return {"message": f"Successfully loaded {len(players_data)} players"}
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Invalid data format received from API"
-        )
+    if skipped:
+        return {"message": f"Successfully loaded {loaded} players, skipped {skipped} invalid players"}
+    return {"message": f"Successfully loaded {loaded} players"}
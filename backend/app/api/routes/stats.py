@@ -0,0 +1,110 @@
+"""
+Season statistics API endpoints for the Baseball Stats Dashboard.
+
+This module provides API endpoints for approximate season statistics,
+answered from per-season sketches instead of reading every player:
+- Quantiles of hits or age, with distinct player counts, per season or
+  over a range of seasons
+- The serialized sketches, for merging with those of other deployments
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.core.config import settings
+from app.models.stats import SeasonQuantiles
+from app.services.repository import PlayerRepository, get_player_repository
+from app.services.sketches import QUANTILE_FIELDS, get_season_stats
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/quantiles", response_model=List[SeasonQuantiles])
+async def get_quantiles(
+    field: str = Query("Hits", pattern=f"^({'|'.join(QUANTILE_FIELDS)})$", description="Field to get quantiles of"),
+    q: List[float] = Query([0.25, 0.5, 0.75, 0.9, 0.99], description="Quantiles, between 0 and 1"),
+    start_year: Optional[int] = Query(None, description="First season to include"),
+    end_year: Optional[int] = Query(None, description="Last season to include"),
+    combined: bool = Query(False, description="Merge the seasons into a single distribution"),
+    repository: PlayerRepository = Depends(get_player_repository),
+):
+    """
+    Retrieve approximate quantiles of hits or age by season.
+    
+    Quantiles are within SKETCH_RELATIVE_ACCURACY of the exact values, and
+    distinct player counts (by name) within a few percent. The sketches are
+    at most SKETCH_REFRESH_INTERVAL seconds behind writes.
+    
+    Args:
+        field: ``Hits`` or ``AgeThatYear``.
+        q: The quantiles to compute.
+        start_year: The first season to include, if any.
+        end_year: The last season to include, if any.
+        combined: Whether to return one entry for the whole range instead of one per season.
+    
+    Returns:
+        List[SeasonQuantiles]: The quantiles of each season with players, in
+        order, or of the whole range.
+    
+    Raises:
+        HTTPException: If a quantile is not between 0 and 1.
+    
+    Example:
+        ```
+        GET /api/stats/quantiles?field=Hits&q=0.5&q=0.9&start_year=2000&end_year=2009&combined=true
+        ```
+    """
+    if any(not 0 <= value <= 1 for value in q):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quantiles must be between 0 and 1"
+        )
+    
+    stats = get_season_stats()
+    await stats.refresh(repository, max_age=settings.SKETCH_REFRESH_INTERVAL)
+    sketches = stats.sketches
+    years = sketches.years(start_year, end_year)
+    if not years:
+        return []
+    
+    if combined:
+        merged = sketches.combined(years)
+        entries = [(None, years[0], years[-1], merged, 0)]
+    else:
+        entries = [(year, year, year, sketches, year) for year in years]
+    
+    return [
+        SeasonQuantiles(
+            year=year,
+            start_year=first,
+            end_year=last,
+            count=source.counts[key],
+            distinct_players=source.players[key].count(),
+            quantiles=dict(zip(map(str, q), source.quantile_sketches[key][field].quantiles(q))),
+        )
+        for year, first, last, source, key in entries
+    ]
+
+
+@router.get("/sketches")
+async def get_sketches(repository: PlayerRepository = Depends(get_player_repository)):
+    """
+    Retrieve the serialized season sketches.
+    
+    Sketches from several deployments (or partitions of the data) can be
+    combined with ``SeasonSketches.from_dict`` and ``SeasonSketches.merge``.
+    
+    Returns:
+        dict: The sketch settings and, by season, the player count, distinct
+        player estimate and quantile sketches.
+    
+    Example:
+        ```
+        GET /api/stats/sketches
+        ```
+    """
+    stats = get_season_stats()
+    await stats.refresh(repository, max_age=settings.SKETCH_REFRESH_INTERVAL)
+    return dict(stats.sketches.to_dict(), seq=stats.seq)
@@ -0,0 +1,142 @@
+"""
+Admission control for the Baseball Stats Dashboard API.
+
+This module provides an ASGI middleware that caps the number of requests each
+worker handles concurrently. Requests over the limit are rejected straight
+away with 503 Service Unavailable and a Retry-After header, so an overloaded
+pod sheds excess load instead of queueing it and letting latency grow without
+bound. Expensive routes (such as AI descriptions) can be given their own,
+smaller budget so they cannot crowd out the rest of the API.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from typing import Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ConcurrencyBudget:
+    """
+    Counts in-flight requests against a fixed limit.
+    
+    All requests of a worker run on the same event loop, so no locking is needed.
+    """
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.shed = 0
+    
+    @property
+    def headroom(self) -> int:
+        return self.limit - self.in_flight
+    
+    def try_acquire(self) -> bool:
+        """
+        Take a slot from the budget.
+        
+        Returns:
+            bool: True if a slot was taken, False if the budget is exhausted.
+        """
+        if self.in_flight >= self.limit:
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+    
+    def release(self):
+        """
+        Return a slot to the budget.
+        """
+        self.in_flight -= 1
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "headroom": self.headroom,
+            "shed": self.shed,
+        }
+
+
+class AdmissionController:
+    """
+    Maps request paths to concurrency budgets.
+    
+    Args:
+        default_limit: Concurrency limit for requests not matching any prefix.
+        prefix_limits: Separate limits for paths starting with the given prefixes.
+        exempt_paths: Paths that are never limited (e.g. health probes).
+    """
+    def __init__(
+        self,
+        default_limit: int,
+        prefix_limits: Optional[Dict[str, int]] = None,
+        exempt_paths: Iterable[str] = (),
+    ):
+        self.default = ConcurrencyBudget("default", default_limit)
+        self.prefixes = {
+            prefix: ConcurrencyBudget(prefix, limit)
+            for prefix, limit in (prefix_limits or {}).items()
+        }
+        self.exempt_paths = set(exempt_paths)
+    
+    def budget_for(self, path: str) -> Optional[ConcurrencyBudget]:
+        """
+        Get the budget a request path counts against.
+        
+        Returns:
+            ConcurrencyBudget: The matching budget, or None if the path is exempt.
+        """
+        if path in self.exempt_paths:
+            return None
+        for prefix, budget in self.prefixes.items():
+            if path.startswith(prefix):
+                return budget
+        return self.default
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {"default": self.default.stats()}
+        for prefix, budget in self.prefixes.items():
+            stats[prefix] = budget.stats()
+        return stats
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds requests once their budget is exhausted.
+    
+    Args:
+        app: The ASGI application to wrap.
+        controller: The admission controller holding the budgets.
+        retry_after: Seconds clients are told to wait before retrying.
+    """
+    def __init__(self, app: ASGIApp, controller: AdmissionController, retry_after: int = 1):
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        budget = self.controller.budget_for(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        
+        if not budget.try_acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry later"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
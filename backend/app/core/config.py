@@ -22,6 +22,13 @@ class Settings(BaseSettings):
     PROJECT_DESCRIPTION: str = "API for managing baseball player statistics with AI-generated descriptions"
     PROJECT_VERSION: str = "1.0.0"
     
+    # Server settings
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = one worker per available CPU (one while process-local stores are used)
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    KEEPALIVE_TIMEOUT: int = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+    PRELOAD_APP: bool = os.getenv("PRELOAD_APP", "true").lower() == "true"
+    
     # CORS settings
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
@@ -29,13 +36,133 @@ class Settings(BaseSettings):
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "Baseball")
     COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "Players")
+    COUNTERS_COLLECTION_NAME: str = os.getenv("COUNTERS_COLLECTION_NAME", "Counters")
+    TOMBSTONES_COLLECTION_NAME: str = os.getenv("TOMBSTONES_COLLECTION_NAME", "PlayerTombstones")
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    CHANGE_SEQ_RESERVATION_TIMEOUT: float = float(os.getenv("CHANGE_SEQ_RESERVATION_TIMEOUT", "60"))  # Seconds before an unfinished write stops holding back the change sequence
+    
+    # Replica set settings: list, changes and export reads may be served by
+    # secondaries, while writes wait for the configured write concern
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")  # "primary", "primaryPreferred", "secondary", "secondaryPreferred" or "nearest"
+    MONGO_MAX_STALENESS_SECONDS: int = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "90"))  # -1 for no limit, otherwise at least 90
+    MONGO_WRITE_CONCERN: str = os.getenv("MONGO_WRITE_CONCERN", "majority")  # "majority" or a number of members
+    MONGO_WRITE_TIMEOUT_MS: int = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "5000"))
+    MONGO_CAUSAL_SESSIONS: bool = os.getenv("MONGO_CAUSAL_SESSIONS", "false").lower() == "true"  # One causally consistent session per request
+    
+    # Sharded cluster settings: with a shard key, the players collection is
+    # sharded when indexes are created (MONGO_URI must point at a mongos)
+    SHARD_KEY: str = os.getenv("SHARD_KEY", "")  # "" (not sharded), "id" (hashed id) or "year_id" (Year, then hashed id)
+    SHARD_MAX_REPORTED_SHAPES: int = int(os.getenv("SHARD_MAX_REPORTED_SHAPES", "100"))  # Scatter-gather query shapes counted
+    
+    # Player storage backend: "mongo", "partitioned" (one collection per decade
+    # of seasons), or "memory" for load tests and benchmarks (process-local and
+    # lost on restart; needs EVENT_SOURCE=local)
+    PLAYER_REPOSITORY: str = os.getenv("PLAYER_REPOSITORY", "mongo")
+    
+    # Partitioned storage settings. A decade is sealed once it ended more than
+    # PARTITION_SEAL_AFTER_YEARS ago; reads from sealed decades are cached.
+    PARTITION_DIRECTORY_COLLECTION_NAME: str = os.getenv("PARTITION_DIRECTORY_COLLECTION_NAME", "PlayerPartitions")
+    PARTITION_REFRESH_INTERVAL: float = float(os.getenv("PARTITION_REFRESH_INTERVAL", "60"))
+    PARTITION_SEAL_AFTER_YEARS: int = int(os.getenv("PARTITION_SEAL_AFTER_YEARS", "2"))
+    PARTITION_CACHE_SIZE: int = int(os.getenv("PARTITION_CACHE_SIZE", "256"))
+    PARTITION_CACHE_TTL: float = float(os.getenv("PARTITION_CACHE_TTL", "30"))
+    PARTITION_CACHE_MAX_ROWS: int = int(os.getenv("PARTITION_CACHE_MAX_ROWS", "5000"))
+    
+    # Health check and load shedding settings
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+    MAX_CONCURRENT_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_REQUESTS", "200"))
+    MAX_CONCURRENT_AI_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_AI_REQUESTS", "10"))
+    SHED_RETRY_AFTER: int = int(os.getenv("SHED_RETRY_AFTER", "1"))
+    BOOTSTRAP_RETRY_INITIAL: float = float(os.getenv("BOOTSTRAP_RETRY_INITIAL", "1"))  # Seconds before retrying failed index creation
+    BOOTSTRAP_RETRY_MAX: float = float(os.getenv("BOOTSTRAP_RETRY_MAX", "60"))  # The delay doubles up to this
     
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
+    # Description generation settings
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")  # "openai", "openai_compatible" or "template"
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "")  # e.g. http://localhost:8080/v1 for a local server
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo-instruct")
+    LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "250"))
+    LLM_BATCH_SIZE: int = int(os.getenv("LLM_BATCH_SIZE", "16"))
+    LLM_BATCH_WAIT_MS: float = float(os.getenv("LLM_BATCH_WAIT_MS", "5"))
+    
+    # Bulk import and export settings
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+    MAX_IMPORT_ERRORS: int = int(os.getenv("MAX_IMPORT_ERRORS", "1000"))
+    MAX_CONCURRENT_IMPORTS: int = int(os.getenv("MAX_CONCURRENT_IMPORTS", "2"))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+    MAX_CONCURRENT_EXPORTS: int = int(os.getenv("MAX_CONCURRENT_EXPORTS", "4"))
+    
+    # Query result cache settings (QUERY_CACHE_MAX_BYTES=0 disables it)
+    QUERY_CACHE_MAX_BYTES: int = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    QUERY_CACHE_TTL: float = float(os.getenv("QUERY_CACHE_TTL", "30"))
+    
+    # Shared cache tier, for query results and descriptions across pods (disabled without REDIS_URL)
+    REDIS_URL: str = os.getenv("REDIS_URL", "")  # e.g. redis://redis:6379/0
+    SHARED_CACHE_PREFIX: str = os.getenv("SHARED_CACHE_PREFIX", "bsd:")
+    SHARED_CACHE_TTL: float = float(os.getenv("SHARED_CACHE_TTL", "300"))
+    SHARED_CACHE_DESCRIPTION_TTL: float = float(os.getenv("SHARED_CACHE_DESCRIPTION_TTL", "86400"))
+    SHARED_CACHE_LOCK_TIMEOUT: float = float(os.getenv("SHARED_CACHE_LOCK_TIMEOUT", "10"))
+    SHARED_CACHE_LOCK_POLL_INTERVAL: float = float(os.getenv("SHARED_CACHE_LOCK_POLL_INTERVAL", "0.05"))
+    # Seconds to wait on Redis before treating it as down, and to skip it for afterwards
+    SHARED_CACHE_SOCKET_TIMEOUT: float = float(os.getenv("SHARED_CACHE_SOCKET_TIMEOUT", "0.25"))
+    SHARED_CACHE_CONNECT_TIMEOUT: float = float(os.getenv("SHARED_CACHE_CONNECT_TIMEOUT", "0.5"))
+    SHARED_CACHE_RETRY_AFTER: float = float(os.getenv("SHARED_CACHE_RETRY_AFTER", "5"))
+    NEAR_CACHE_SIZE: int = int(os.getenv("NEAR_CACHE_SIZE", "1024"))
+    NEAR_CACHE_TTL: float = float(os.getenv("NEAR_CACHE_TTL", "5"))
+    
+    # Similar player search settings
+    SIMILARITY_SYNC_BATCH_SIZE: int = int(os.getenv("SIMILARITY_SYNC_BATCH_SIZE", "10000"))
+    SIMILARITY_REFRESH_INTERVAL: float = float(os.getenv("SIMILARITY_REFRESH_INTERVAL", "1"))  # Max seconds behind writes
+    MAX_SIMILAR_PLAYERS: int = int(os.getenv("MAX_SIMILAR_PLAYERS", "100"))
+    SIMILARITY_SNAPSHOT_DIR: str = os.getenv("SIMILARITY_SNAPSHOT_DIR", "")  # Local disk or shared volume; empty disables snapshots
+    SIMILARITY_SNAPSHOT_INTERVAL: float = float(os.getenv("SIMILARITY_SNAPSHOT_INTERVAL", "600"))  # Min seconds between snapshots
+    
+    # Season statistics sketch settings
+    SKETCH_RELATIVE_ACCURACY: float = float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01"))  # Max relative error of quantiles
+    SKETCH_HLL_PRECISION: int = int(os.getenv("SKETCH_HLL_PRECISION", "12"))  # 2**n registers per season
+    SKETCH_SYNC_BATCH_SIZE: int = int(os.getenv("SKETCH_SYNC_BATCH_SIZE", "10000"))
+    SKETCH_REFRESH_INTERVAL: float = float(os.getenv("SKETCH_REFRESH_INTERVAL", "1"))  # Max seconds behind writes
+    
+    # Pre-rendered static views, served by nginx from a directory shared with
+    # the backend (empty disables them)
+    STATIC_VIEWS_DIR: str = os.getenv("STATIC_VIEWS_DIR", "")  # e.g. /var/lib/baseball/views
+    STATIC_VIEWS_DEBOUNCE: float = float(os.getenv("STATIC_VIEWS_DEBOUNCE", "1"))  # Seconds to gather writes before rendering; 0 renders after every write
+    STATIC_VIEWS_POLL_INTERVAL: float = float(os.getenv("STATIC_VIEWS_POLL_INTERVAL", "5"))  # Max seconds behind writes made by other processes
+    STATIC_VIEWS_SYNC_BATCH_SIZE: int = int(os.getenv("STATIC_VIEWS_SYNC_BATCH_SIZE", "10000"))
+    
+    # Live update settings
+    EVENT_SOURCE: str = os.getenv("EVENT_SOURCE", "local")  # "local" or "change_stream"
+    EVENT_BUFFER_SIZE: int = int(os.getenv("EVENT_BUFFER_SIZE", "100"))
+    EVENT_KEEPALIVE_INTERVAL: float = float(os.getenv("EVENT_KEEPALIVE_INTERVAL", "15"))
+    MAX_EVENT_SUBSCRIBERS: int = int(os.getenv("MAX_EVENT_SUBSCRIBERS", "1000"))
+    
+    # Background job settings
+    JOB_STORE: str = os.getenv("JOB_STORE", "memory")  # "memory" or "mongo"
+    JOBS_COLLECTION_NAME: str = os.getenv("JOBS_COLLECTION_NAME", "Jobs")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_LEASE_DURATION: float = float(os.getenv("JOB_LEASE_DURATION", "60"))  # Seconds before a job whose runner stopped renewing its lease is run again
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+    BACKFILL_CONCURRENCY: int = int(os.getenv("BACKFILL_CONCURRENCY", "16"))
+    
     # External API settings
     BASEBALL_API_URL: str = os.getenv("BASEBALL_API_URL", "https://api.hirefraction.com/api/test/baseball")
     
+    # Outbound HTTP client settings
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", "3"))
+    HTTP_BACKOFF_BASE: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    HTTP_BACKOFF_MAX: float = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,220 @@
+"""
+Outbound HTTP client for the Baseball Stats Dashboard API.
+
+This module manages the shared HTTP client used to call external services.
+The client is created once per worker in the application lifespan, so
+connections (and their TLS sessions) are pooled and kept alive across
+requests instead of being set up for every call.
+
+Requests made through get_with_retries() use explicit timeouts, retry
+transient failures with jittered exponential backoff, and go through a
+per-host circuit breaker that fails fast while an upstream is down.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import random
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+
+# Response status codes worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Shared HTTP client instance
+http_client = None
+
+# Circuit breakers, keyed by scheme and host
+circuit_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused because the upstream's circuit is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker tracking consecutive failures of an upstream service.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail immediately. Once ``reset_timeout`` seconds have passed a
+    single trial request is let through (half-open); its outcome closes the
+    circuit again or re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent to the upstream.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self._trial_in_flight = False
+    
+    def end_trial(self):
+        """
+        End a trial request whether or not its outcome was recorded (e.g. if
+        it was cancelled), so the next request can be let through as a trial.
+        """
+        self._trial_in_flight = False
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Get the delay before a retry, using exponential backoff with full jitter.
+    
+    Args:
+        attempt: The number of attempts made so far (starting at 1).
+        
+    Returns:
+        float: Seconds to wait, uniformly drawn up to the capped exponential delay.
+    """
+    cap = min(settings.HTTP_BACKOFF_MAX, settings.HTTP_BACKOFF_BASE * 2 ** (attempt - 1))
+    return random.uniform(0, cap)
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker for the host a URL points to.
+    """
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    if key not in circuit_breakers:
+        circuit_breakers[key] = CircuitBreaker(
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+        )
+    return circuit_breakers[key]
+
+
+async def start_http_client():
+    """
+    Create the shared HTTP client
+    """
+    global http_client
+    import httpx
+    
+    http_client = httpx.AsyncClient(
+        http2=settings.HTTP2_ENABLED,
+        timeout=httpx.Timeout(
+            settings.HTTP_READ_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+    )
+
+async def close_http_client():
+    """
+    Close the shared HTTP client and its pooled connections
+    """
+    global http_client
+    if http_client:
+        await http_client.aclose()
+        http_client = None
+
+def get_http_client():
+    """
+    Get the shared HTTP client
+    """
+    return http_client
+
+
+async def get_with_retries(url: str, **kwargs):
+    """
+    Send a GET request with retries, through the upstream's circuit breaker.
+    
+    Connection errors, timeouts and retryable status codes (429 and 5xx) are
+    retried up to HTTP_RETRIES times. Other error responses are not retried.
+    
+    Args:
+        url: The URL to request.
+        **kwargs: Passed on to ``httpx.AsyncClient.get``.
+        
+    Returns:
+        httpx.Response: The successful response.
+        
+    Raises:
+        CircuitOpenError: If the upstream's circuit is open.
+        httpx.HTTPError: If the request still fails after all retries.
+    """
+    import httpx
+    
+    breaker = get_circuit_breaker(url)
+    trial = breaker.state == CircuitBreaker.HALF_OPEN
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit open for {url}, not sending request")
+    
+    attempts = settings.HTTP_RETRIES + 1
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await http_client.get(url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # The upstream is healthy even if it rejected this request
+                    breaker.record_success()
+                    response.raise_for_status()
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"Server error '{response.status_code}' for url '{url}'",
+                    request=response.request,
+                    response=response,
+                )
+            except httpx.TransportError as e:
+                error = e
+            
+            if attempt == attempts:
+                breaker.record_failure()
+                raise error
+            await asyncio.sleep(backoff_delay(attempt))
+    finally:
+        # A trial cancelled or failed by anything else must not leave the
+        # circuit half-open with a trial in flight, refusing every request
+        if trial:
+            breaker.end_trial()
@@ -0,0 +1,138 @@
+"""
+Production worker settings for the Baseball Stats Dashboard API.
+
+This module provides the Uvicorn worker class used by Gunicorn in production,
+pinned to the uvloop event loop and the httptools HTTP parser, along with a
+helper for sizing the worker pool to the CPUs available to the container.
+Settings that keep shared state inside each process limit the pool to one
+worker.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import math
+import os
+from typing import List, Optional
+
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker that always runs on uvloop with the httptools parser.
+
+    The stock worker uses "auto", which silently falls back to asyncio and h11
+    when the optional packages are missing; in production we would rather fail
+    at boot than run on the slower implementations.
+    """
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+# Where the container's CPU quota is found, under cgroup v2 and v1
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_DIR = "/sys/fs/cgroup/cpu"
+
+
+def _read_number(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[int]:
+    """
+    Get the number of CPUs the container's CPU quota allows, rounded up.
+
+    Reads ``cpu.max`` under cgroup v2, or ``cpu.cfs_quota_us`` and
+    ``cpu.cfs_period_us`` under cgroup v1.
+
+    Returns:
+        Optional[int]: The CPU limit, or None if there is no quota.
+    """
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()
+        if quota == "max":
+            return None
+        return max(math.ceil(int(quota) / int(period)), 1)
+    except (OSError, ValueError):
+        pass
+    quota = _read_number(os.path.join(CGROUP_V1_CPU_DIR, "cpu.cfs_quota_us"))
+    period = _read_number(os.path.join(CGROUP_V1_CPU_DIR, "cpu.cfs_period_us"))
+    # A quota of -1 means none is set
+    if not quota or quota < 0 or not period:
+        return None
+    return max(math.ceil(quota / period), 1)
+
+
+def default_worker_count() -> int:
+    """
+    Get the default number of worker processes.
+
+    Uses the CPUs this process is allowed to run on (which respects container
+    CPU sets), capped by the container's CPU quota (e.g. a Kubernetes CPU
+    limit, which leaves every host CPU in the affinity mask), rather than the
+    host's total CPU count.
+
+    Returns:
+        int: The number of worker processes to start, at least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity is not available on macOS or Windows
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(cpus, 1)
+
+
+def process_local_settings(settings) -> List[str]:
+    """
+    Get the settings that keep state only one worker process can see.
+
+    With more than one worker, each would have its own events (clients miss
+    writes handled by the other workers), jobs (status requests 404 on the
+    other workers) or players.
+
+    Returns:
+        List[str]: The offending settings, e.g. ``EVENT_SOURCE=local``.
+    """
+    local = []
+    if settings.EVENT_SOURCE == "local":
+        local.append("EVENT_SOURCE=local")
+    if settings.JOB_STORE == "memory":
+        local.append("JOB_STORE=memory")
+    if settings.PLAYER_REPOSITORY == "memory":
+        local.append("PLAYER_REPOSITORY=memory")
+    return local
+
+
+def configured_worker_count(settings) -> int:
+    """
+    Get the number of worker processes to start.
+
+    WEB_CONCURRENCY if set, otherwise one per available CPU; but only one
+    while any process-local setting is in use.
+
+    Returns:
+        int: The number of worker processes to start.
+
+    Raises:
+        ValueError: If WEB_CONCURRENCY asks for several workers while a
+            process-local setting is in use.
+    """
+    local = process_local_settings(settings)
+    if settings.WEB_CONCURRENCY:
+        if settings.WEB_CONCURRENCY > 1 and local:
+            raise ValueError(
+                f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} needs state shared between workers; "
+                f"unset {', '.join(local)} (use EVENT_SOURCE=change_stream and JOB_STORE=mongo)"
+            )
+        return settings.WEB_CONCURRENCY
+    if local:
+        print(f"Starting one worker: {', '.join(local)} keeps state in process memory")
+        return 1
+    return default_worker_count()
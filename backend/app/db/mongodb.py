@@ -4,32 +4,160 @@ MongoDB database connection module for the Baseball Stats Dashboard.
 This module provides functions for connecting to MongoDB, closing connections,
 and retrieving the database collection for player data.
 
+Writes, and reads that must see them (read-modify-write and single-player
+lookups), use the primary with the configured write concern. Read-heavy
+endpoints use separate read handles that may be served by secondaries, so
+read throughput grows as members are added to the replica set.
+
+Beyond one replica set, the players collection can be sharded on a hashed
+key (see ``app.db.sharding``), so reads and writes grow with the shards.
+
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
 import os
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import WriteConcern, monitoring, read_preferences
+from pymongo.errors import OperationFailure
 from app.core.config import settings
+from app.db.sharding import get_targeting_monitor, shard_key, shard_key_includes_year, shard_players_collection
 
 # MongoDB client instance
 client = None
 db = None
 collection = None
 
+# Handles for reads that may be served by secondaries
+read_db = None
+read_collection = None
+
+READ_PREFERENCES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+
+def build_read_preference(mode: str, max_staleness: int):
+    """
+    Build the read preference for secondary-eligible reads
+    
+    Args:
+        mode: The read preference mode name, e.g. ``secondaryPreferred``.
+        max_staleness: Skip secondaries lagging more than this many seconds
+            behind the primary (-1 for no limit). Ignored for ``primary``.
+    """
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if mode == "primary":
+        return read_preferences.Primary()
+    return READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+
+def build_write_concern(w: str, wtimeout: int) -> WriteConcern:
+    """
+    Build the write concern for writes
+    
+    Args:
+        w: ``majority`` (or another tag set name), or a number of members.
+        wtimeout: How long to wait for the members to acknowledge, in milliseconds.
+    """
+    return WriteConcern(w=int(w) if w.isdigit() else w, wtimeout=wtimeout)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that tracks how many connections are checked out.
+    
+    The driver keeps one pool per server, so usage is tracked per address.
+    Events are delivered from driver threads, hence the lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_use: Dict[Any, int] = {}
+    
+    @property
+    def in_use(self) -> int:
+        """Connections checked out from the busiest server pool"""
+        with self._lock:
+            return max(self._in_use.values(), default=0)
+    
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._in_use[event.address] = self._in_use.get(event.address, 0) + 1
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._in_use[event.address] = max(self._in_use.get(event.address, 0) - 1, 0)
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        with self._lock:
+            self._in_use.pop(event.address, None)
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def connection_created(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        pass
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def connection_check_out_failed(self, event):
+        pass
+
+
+pool_monitor = PoolMonitor()
+
 async def connect_to_mongo():
     """
     Connect to MongoDB and initialize database and collection
     """
-    global client, db, collection
+    global client, db, collection, read_db, read_collection
     
     # Skip actual connection in testing environment
     if os.environ.get("TESTING") == "true":
         print("Running in test mode, skipping actual MongoDB connection")
         return
     
+    listeners = [pool_monitor]
+    targeting_monitor = get_targeting_monitor()
+    if targeting_monitor is not None:
+        listeners.append(targeting_monitor)
+    
     try:
-        client = AsyncIOMotorClient(settings.MONGO_URI)
-        db = client[settings.DATABASE_NAME]
+        client = AsyncIOMotorClient(
+            settings.MONGO_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            event_listeners=listeners,
+        )
+        db = client.get_database(
+            settings.DATABASE_NAME,
+            write_concern=build_write_concern(settings.MONGO_WRITE_CONCERN, settings.MONGO_WRITE_TIMEOUT_MS),
+        )
         collection = db[settings.COLLECTION_NAME]
+        read_db = client.get_database(
+            settings.DATABASE_NAME,
+            read_preference=build_read_preference(settings.MONGO_READ_PREFERENCE, settings.MONGO_MAX_STALENESS_SECONDS),
+        )
+        read_collection = read_db[settings.COLLECTION_NAME]
         
         # Verify connection
         await client.admin.command('ping')
@@ -38,6 +166,66 @@ async def connect_to_mongo():
         print(f"Error connecting to MongoDB: {e}")
         raise
 
+async def create_unique_index(target, keys, **kwargs):
+    """
+    Create a unique index, explaining the failure if documents already break it
+    
+    Raises:
+        RuntimeError: If existing documents have duplicate values for the keys.
+    """
+    try:
+        await target.create_index(keys, unique=True, **kwargs)
+    except OperationFailure as e:
+        if e.code != 11000:
+            raise
+        raise RuntimeError(
+            f"Cannot create the unique {keys} index on {target.name}: existing documents "
+            f"have duplicate values. Remove the duplicates (see \"Upgrading an Existing "
+            f"Database\" in the deployment docs). {e}"
+        ) from e
+
+async def ensure_indexes():
+    """
+    Create the indexes the API relies on, if they do not already exist, and
+    stamp players written before change tracking with change sequence values
+    
+    Raises:
+        RuntimeError: If existing players have duplicate IDs.
+    """
+    # Skip index creation in testing environment
+    if os.environ.get("TESTING") == "true":
+        return
+    
+    if shard_key() is not None:
+        await shard_players_collection(client, collection)
+    
+    # Every route looks players up by their application-level id. A unique
+    # index must start with the shard key, so with a (Year, id) key IDs are
+    # only unique per season here; the API checks for existing players instead.
+    if shard_key_includes_year():
+        await collection.create_index("id")
+        await create_unique_index(collection, [("Year", 1), ("id", 1)])
+    else:
+        await create_unique_index(collection, "id")
+    
+    # Change tracking for incremental sync, including players written
+    # before it existed
+    from app.services.changes import stamp_unsequenced_players
+    await collection.create_index("_seq")
+    await get_tombstones_collection().create_index("id", unique=True)
+    await get_tombstones_collection().create_index("_seq")
+    stamped = await stamp_unsequenced_players(collection)
+    if stamped:
+        print(f"Stamped {stamped} players with change sequence values")
+    
+    if settings.PLAYER_REPOSITORY == "partitioned":
+        from app.services.partitions import ensure_partition_indexes
+        await ensure_partition_indexes()
+    
+    if settings.JOB_STORE == "mongo":
+        await get_jobs_collection().create_index("id", unique=True)
+    print("MongoDB indexes ready")
+
 async def close_mongo_connection():
     """
     Close MongoDB connection
@@ -47,8 +235,103 @@ async def close_mongo_connection():
         client.close()
         print("MongoDB connection closed")
 
+async def ping_mongo() -> bool:
+    """
+    Check whether MongoDB is reachable
+    
+    Returns:
+        bool: True if the server answered a ping within HEALTH_CHECK_TIMEOUT.
+    """
+    if client is None:
+        return False
+    try:
+        await asyncio.wait_for(
+            client.admin.command('ping'),
+            timeout=settings.HEALTH_CHECK_TIMEOUT,
+        )
+        return True
+    except Exception:
+        return False
+
+def get_pool_stats() -> Dict[str, int]:
+    """
+    Get connection pool usage
+    
+    Returns:
+        dict: The pool size limit, connections in use and remaining headroom.
+    """
+    in_use = pool_monitor.in_use
+    return {
+        "max_size": settings.MONGO_MAX_POOL_SIZE,
+        "in_use": in_use,
+        "headroom": settings.MONGO_MAX_POOL_SIZE - in_use,
+    }
+
+def get_sharding_stats() -> Optional[Dict[str, Any]]:
+    """
+    Get targeted and scatter-gather query counts
+    
+    Returns:
+        dict: The counts (see ``QueryTargetingMonitor.stats``), or None if
+        the players collection is not sharded.
+    """
+    targeting_monitor = get_targeting_monitor()
+    return targeting_monitor.stats() if targeting_monitor is not None else None
+
 def get_collection():
     """
-    Get the MongoDB collection
+    Get the MongoDB collection for writes and reads that must see them
     """
     return collection
+
+def get_read_collection(name: Optional[str] = None):
+    """
+    Get a MongoDB collection for reads that may be served by a secondary
+    
+    Args:
+        name: The collection name; the players collection if omitted.
+    """
+    if name is None:
+        return read_collection
+    if read_db is None:
+        return None
+    return read_db[name]
+
+@asynccontextmanager
+async def read_session():
+    """
+    Start a causally consistent session for a group of related reads
+    
+    Reads in the session never see older data than earlier reads in it,
+    even when they are served by different members of the replica set.
+    Yields None when there is no connection.
+    """
+    if client is None:
+        yield None
+        return
+    async with await client.start_session(causal_consistency=True) as session:
+        yield session
+
+def get_jobs_collection():
+    """
+    Get the MongoDB collection used to persist background jobs
+    """
+    if db is None:
+        return None
+    return db[settings.JOBS_COLLECTION_NAME]
+
+def get_counters_collection():
+    """
+    Get the MongoDB collection holding sequence counters
+    """
+    if db is None:
+        return None
+    return db[settings.COUNTERS_COLLECTION_NAME]
+
+def get_tombstones_collection():
+    """
+    Get the MongoDB collection recording deleted players
+    """
+    if db is None:
+        return None
+    return db[settings.TOMBSTONES_COLLECTION_NAME]
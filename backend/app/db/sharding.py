@@ -0,0 +1,250 @@
+"""
+Sharding support for the players collection.
+
+With SHARD_KEY set and MONGO_URI pointing at a ``mongos`` router, the
+players collection is sharded on a hashed key when indexes are created:
+
+- ``id``: the hashed player ID. Lookups and writes by ID go to one shard,
+  and writes are spread evenly across shards.
+- ``year_id``: the season, then the hashed player ID. Lookups and writes by
+  ID and season go to one shard, and queries for a season or a range of
+  seasons only go to the shards holding those seasons.
+
+Routes pass the shard key fields they know with every query (see
+``player_filter``). Queries that cannot be routed to particular shards are
+sent to every shard and their results gathered by ``mongos``; the
+``QueryTargetingMonitor`` counts them by operation and query shape so they
+can be found and reported on ``/healthz``.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+# Shard key specifications by SHARD_KEY setting
+SHARD_KEYS: Dict[str, Dict[str, Any]] = {
+    "id": {"id": "hashed"},
+    "year_id": {"Year": 1, "id": "hashed"},
+}
+
+# Query operators that limit a field to known values or ranges
+EQUALITY_OPERATORS = {"$eq", "$in"}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+# Commands that read or modify documents matching a filter
+FILTERED_COMMANDS = ("find", "count", "distinct", "aggregate", "findAndModify", "update", "delete")
+
+
+def shard_key(name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get the shard key specification for a SHARD_KEY setting
+    
+    Args:
+        name: The setting value; SHARD_KEY if omitted (and PLAYER_REPOSITORY
+            is ``mongo``, as partitioned storage is not sharded).
+    
+    Returns:
+        dict: The shard key, or None if the collection is not sharded.
+    
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name is None:
+        # Only the single players collection is sharded
+        if settings.PLAYER_REPOSITORY != "mongo":
+            return None
+        name = settings.SHARD_KEY
+    if not name:
+        return None
+    if name not in SHARD_KEYS:
+        raise ValueError(f"Unknown shard key: {name}")
+    return SHARD_KEYS[name]
+
+
+def shard_key_includes_year() -> bool:
+    """
+    Check whether the configured shard key includes the season
+    """
+    return "Year" in (shard_key() or {})
+
+
+def player_filter(id: int, year: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build the filter matching a player, with the shard key fields that are known
+    
+    Args:
+        id: The player ID.
+        year: The player's season, if known. Only added to the filter when
+            the shard key includes the season, so it is a routing hint: a
+            wrong season may miss the player on such a collection.
+    
+    Example:
+        ```
+        await collection.find_one(player_filter(1, year=2004))
+        ```
+    """
+    if year is not None and shard_key_includes_year():
+        return {"Year": year, "id": id}
+    return {"id": id}
+
+
+def is_targeted(query: Dict[str, Any], key: Dict[str, Any]) -> bool:
+    """
+    Check whether ``mongos`` can route a query to the shards holding its documents
+    
+    A query is targeted when it limits the first shard key field to known
+    values, or to a range of values if that field is not hashed.
+    """
+    field, kind = next(iter(key.items()))
+    condition = query.get(field)
+    if condition is None:
+        return any(is_targeted(clause, key) for clause in query.get("$and", []))
+    if not isinstance(condition, dict) or not any(operator.startswith("$") for operator in condition):
+        return True
+    if EQUALITY_OPERATORS.intersection(condition):
+        return True
+    return kind != "hashed" and bool(RANGE_OPERATORS.intersection(condition))
+
+
+def command_filters(command_name: str, command: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Get the filters of a command, one per statement for batched updates and deletes
+    """
+    if command_name == "find":
+        return [command.get("filter") or {}]
+    if command_name in ("count", "distinct", "findAndModify"):
+        return [command.get("query") or {}]
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return [pipeline[0].get("$match", {})]
+    if command_name == "update":
+        return [statement.get("q") or {} for statement in command.get("updates", [])]
+    if command_name == "delete":
+        return [statement.get("q") or {} for statement in command.get("deletes", [])]
+    return []
+
+
+def query_shape(command_name: str, query: Dict[str, Any]) -> str:
+    """
+    Describe a query by its command and filtered fields, e.g. ``find {Year, _seq}``
+    """
+    return f"{command_name} {{{', '.join(sorted(query))}}}"
+
+
+class QueryTargetingMonitor(monitoring.CommandListener):
+    """
+    Command listener counting targeted and scatter-gather queries on the players collection.
+    
+    Scatter-gather queries are also counted by query shape (up to
+    ``max_shapes`` shapes), and each new shape is logged once. Events are
+    delivered from driver threads, hence the lock.
+    """
+    def __init__(self, collection_name: str, key: Dict[str, Any], max_shapes: int = 100):
+        self.collection_name = collection_name
+        self.key = key
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._targeted: Dict[str, int] = {}
+        self._scatter_gather: Dict[str, int] = {}
+        self._shapes: Dict[str, int] = {}
+    
+    def record(self, command_name: str, queries: Iterable[Dict[str, Any]]):
+        """
+        Count the statements of a command on the players collection
+        """
+        new_shapes: List[str] = []
+        with self._lock:
+            for query in queries:
+                if is_targeted(query, self.key):
+                    self._targeted[command_name] = self._targeted.get(command_name, 0) + 1
+                    continue
+                self._scatter_gather[command_name] = self._scatter_gather.get(command_name, 0) + 1
+                shape = query_shape(command_name, query)
+                if shape in self._shapes:
+                    self._shapes[shape] += 1
+                elif len(self._shapes) < self.max_shapes:
+                    self._shapes[shape] = 1
+                    new_shapes.append(shape)
+        for shape in new_shapes:
+            print(f"Scatter-gather query on {self.collection_name}: {shape}")
+    
+    def started(self, event):
+        command_name = event.command_name
+        if command_name in FILTERED_COMMANDS and event.command.get(command_name) == self.collection_name:
+            self.record(command_name, command_filters(command_name, event.command))
+    
+    def succeeded(self, event):
+        pass
+    
+    def failed(self, event):
+        pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the query counts
+        
+        Returns:
+            dict: The shard key, targeted and scatter-gather statement counts
+            by command, and scatter-gather counts by query shape, most frequent first.
+        """
+        with self._lock:
+            shapes: List[Tuple[str, int]] = sorted(self._shapes.items(), key=lambda item: -item[1])
+            return {
+                "shard_key": settings.SHARD_KEY,
+                "targeted": dict(self._targeted),
+                "scatter_gather": dict(self._scatter_gather),
+                "scatter_gather_shapes": dict(shapes),
+            }
+
+
+# Query targeting monitor, created when connecting to a sharded cluster
+targeting_monitor: Optional[QueryTargetingMonitor] = None
+
+
+def get_targeting_monitor() -> Optional[QueryTargetingMonitor]:
+    """
+    Get the query targeting monitor, creating it if a shard key is configured
+    
+    Returns:
+        QueryTargetingMonitor: The monitor, or None if the collection is not sharded.
+    """
+    global targeting_monitor
+    key = shard_key()
+    if key is None:
+        return None
+    if targeting_monitor is None:
+        targeting_monitor = QueryTargetingMonitor(settings.COLLECTION_NAME, key, settings.SHARD_MAX_REPORTED_SHAPES)
+    return targeting_monitor
+
+
+async def shard_players_collection(client, collection):
+    """
+    Shard the players collection on the configured key, if it is not sharded already
+    
+    Creates the shard key index first, so collections that already hold
+    players can be sharded too.
+    
+    Args:
+        client: The client connected to ``mongos``.
+        collection: The players collection.
+    
+    Raises:
+        pymongo.errors.OperationFailure: If the cluster cannot shard the
+            collection, e.g. when MONGO_URI is not a ``mongos``.
+    """
+    key = shard_key()
+    namespace = f"{collection.database.name}.{collection.name}"
+    existing = await client["config"]["collections"].find_one({"_id": namespace, "dropped": {"$ne": True}})
+    if existing is not None:
+        if dict(existing["key"]) != key:
+            print(f"{namespace} is already sharded on {dict(existing['key'])}, not {key}")
+        return
+    
+    await collection.create_index(list(key.items()))
+    await client.admin.command("enableSharding", collection.database.name)
+    await client.admin.command("shardCollection", namespace, key=key)
+    print(f"Sharded {namespace} on {key}")
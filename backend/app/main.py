@@ -7,28 +7,116 @@ and includes API routers.
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.api.routes import players
+from app.core.admission import AdmissionController, AdmissionControlMiddleware
+from app.api.routes import players, health, jobs, stats
+from app.core.http_client import start_http_client, close_http_client
+from app.services.jobs import start_job_runner, stop_job_runner
+from app.services.shared_cache import start_shared_cache, stop_shared_cache
+from app.services.static_views import start_static_views, stop_static_views
 
 # Check if we're in a testing environment
 TESTING = os.environ.get("TESTING", "").lower() == "true"
 
-# Define lifespan context manager for database connections
+async def bootstrap(app: FastAPI):
+    """
+    Create the MongoDB indexes and mark the application ready
+    
+    Index creation is retried with exponential backoff until it succeeds
+    (e.g. once duplicate player IDs have been removed); until then /readyz
+    reports the last error.
+    """
+    from app.db.mongodb import ensure_indexes
+    delay = settings.BOOTSTRAP_RETRY_INITIAL
+    while True:
+        try:
+            await ensure_indexes()
+            break
+        except Exception as e:
+            app.state.bootstrap_error = str(e)
+            print(f"Error creating MongoDB indexes, retrying in {delay:g}s: {e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.BOOTSTRAP_RETRY_MAX)
+    app.state.bootstrap_error = None
+    app.state.ready = True
+
+async def warm_player_indexes():
+    """
+    Load the similar player index and the season statistics sketches
+    """
+    from app.services.repository import create_player_repository
+    from app.services.similarity import get_similarity_index
+    from app.services.sketches import get_season_stats
+    repository = create_player_repository()
+    try:
+        await get_similarity_index().refresh(repository)
+    except Exception as e:
+        print(f"Error loading the similar player index: {e}")
+    try:
+        await get_season_stats().refresh(repository)
+    except Exception as e:
+        print(f"Error loading the season statistics sketches: {e}")
+
+# Define lifespan context manager for database connections.
+# This runs once per worker process, so under Gunicorn each worker creates
+# its own Motor client after the fork (see gunicorn.conf.py).
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Connect to MongoDB only if not in testing mode
-    if not TESTING:
-        from app.db.mongodb import connect_to_mongo, close_mongo_connection
+    # Not ready to serve traffic until MongoDB and its indexes are available
+    app.state.ready = False
+    app.state.bootstrap_error = None
+    bootstrap_task = None
+    change_stream_tasks = []
+    
+    # Connect to MongoDB only if not in testing mode, and only if player
+    # data or jobs are stored there
+    uses_mongo = settings.PLAYER_REPOSITORY in ("mongo", "partitioned") or settings.JOB_STORE == "mongo"
+    if not TESTING and uses_mongo:
+        from app.db.mongodb import connect_to_mongo
         await connect_to_mongo()
         
-    yield
+        # Build indexes in the background so the server starts listening
+        # right away; /readyz reports ready once this finishes
+        bootstrap_task = asyncio.create_task(bootstrap(app))
+        
+        if settings.EVENT_SOURCE == "change_stream":
+            from app.services.events import start_change_stream_feed
+            change_stream_tasks = start_change_stream_feed()
+    else:
+        app.state.ready = True
+    
+    await start_http_client()
+    await start_shared_cache()
+    await start_job_runner()
+    await start_static_views()
     
-    # Close MongoDB connection only if not in testing mode
+    # Load the similar player index and the season statistics sketches in
+    # the background; until they are loaded, the first request using them waits
+    indexes_task = None
     if not TESTING:
+        indexes_task = asyncio.create_task(warm_player_indexes())
+    
+    yield
+    
+    app.state.ready = False
+    if bootstrap_task is not None and not bootstrap_task.done():
+        bootstrap_task.cancel()
+    for task in change_stream_tasks:
+        task.cancel()
+    if indexes_task is not None and not indexes_task.done():
+        indexes_task.cancel()
+    await stop_static_views()
+    await stop_job_runner()
+    await stop_shared_cache()
+    await close_http_client()
+    
+    # Close MongoDB connection only if it was opened
+    if not TESTING and uses_mongo:
         from app.db.mongodb import close_mongo_connection
         await close_mongo_connection()
 
@@ -42,7 +130,29 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Configure CORS
+# Shed load once too many requests are in flight. AI descriptions get their
+# own smaller budget since each one holds a slow OpenAI call open, live
+# update streams get theirs since each one stays open indefinitely, and bulk
+# imports and exports get theirs since each one keeps the database busy for a
+# long time.
+admission = AdmissionController(
+    default_limit=settings.MAX_CONCURRENT_REQUESTS,
+    prefix_limits={
+        f"{settings.API_V1_STR}/players/description/": settings.MAX_CONCURRENT_AI_REQUESTS,
+        f"{settings.API_V1_STR}/players/events": settings.MAX_EVENT_SUBSCRIBERS,
+        f"{settings.API_V1_STR}/players/export": settings.MAX_CONCURRENT_EXPORTS,
+        f"{settings.API_V1_STR}/players/import": settings.MAX_CONCURRENT_IMPORTS,
+    },
+    exempt_paths={"/healthz", "/readyz"},
+)
+app.state.admission = admission
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=admission,
+    retry_after=settings.SHED_RETRY_AFTER,
+)
+
+# Configure CORS (added last so it also wraps load-shedding responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -53,6 +163,9 @@ app.add_middleware(
 
 # Include API routers
 app.include_router(players.router, prefix=settings.API_V1_STR)
+app.include_router(jobs.router, prefix=settings.API_V1_STR)
+app.include_router(stats.router, prefix=settings.API_V1_STR)
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
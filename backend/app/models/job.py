@@ -0,0 +1,70 @@
+"""
+Background job models for the Baseball Stats Dashboard.
+
+This module defines the Pydantic models used to submit long-running work
+(such as data ingest) and to report its progress.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+
+class JobType(str, Enum):
+    """
+    Kinds of work that can be run as a background job
+    """
+    INGEST = "ingest"
+    DESCRIPTION_BACKFILL = "description_backfill"
+    PARTITION_COMPACTION = "partition_compaction"
+
+
+class JobStatus(str, Enum):
+    """
+    Lifecycle states of a background job
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobProgress(BaseModel):
+    """
+    Progress of a running job, in job-specific units (e.g. players)
+    """
+    done: int = 0
+    total: Optional[int] = None
+
+
+class JobCreate(BaseModel):
+    """
+    Model for submitting a new job
+    """
+    type: JobType
+    params: Dict[str, Any] = {}
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "type": "description_backfill",
+                "params": {"limit": 100}
+            }
+        }
+
+
+class Job(BaseModel):
+    """
+    Job model reporting the state of a background job
+    """
+    id: str
+    type: JobType
+    params: Dict[str, Any] = {}
+    status: JobStatus
+    progress: JobProgress = JobProgress()
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
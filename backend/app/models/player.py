@@ -7,7 +7,8 @@ of baseball player data throughout the application.
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from typing_extensions import NotRequired, TypedDict
 
 class Player(BaseModel):
     """
@@ -34,6 +35,31 @@ class Player(BaseModel):
             }
         }
 
+class PlayerDocument(TypedDict):
+    """
+    Player fields as stored, for validating bulk writes straight into
+    documents without building a model per player (see app.services.validation)
+    """
+    id: int
+    Player: str
+    AgeThatYear: str
+    Hits: int
+    Year: int
+    Bats: str
+    Rank: str
+
+class SourcePlayerDocument(TypedDict):
+    """
+    Player fields as received from the external baseball API, where the rank may be missing
+    """
+    id: int
+    Player: str
+    AgeThatYear: str
+    Hits: int
+    Year: int
+    Bats: str
+    Rank: NotRequired[str]
+
 class PlayerWithDescription(Player):
     """
     Extended Player model that includes an AI-generated description
@@ -87,3 +113,91 @@ class PlayerUpdate(BaseModel):
     Year: Optional[int] = None
     Bats: Optional[str] = None
     Rank: Optional[str] = None
+
+class SimilarPlayer(Player):
+    """
+    Player model for a similar player-season, with its distance from the one compared against
+    """
+    distance: float
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "id": 7,
+                "Player": "Wade Boggs",
+                "AgeThatYear": "27",
+                "Hits": 240,
+                "Year": 1985,
+                "Bats": "653",
+                "Rank": "4",
+                "distance": 0.42
+            }
+        }
+
+class PlayerChanges(BaseModel):
+    """
+    Model for the players changed since a given change sequence value
+    """
+    seq: int
+    upserted: List[Player]
+    deleted: List[int]
+    has_more: bool
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "seq": 42,
+                "upserted": [
+                    {
+                        "id": 1,
+                        "Player": "Ichiro Suzuki",
+                        "AgeThatYear": "30",
+                        "Hits": 262,
+                        "Year": 2004,
+                        "Bats": "318",
+                        "Rank": "1"
+                    }
+                ],
+                "deleted": [7],
+                "has_more": False
+            }
+        }
+
+class ImportFieldError(BaseModel):
+    """
+    Model for a single problem with an imported row
+    """
+    field: str
+    message: str
+
+class ImportRowError(BaseModel):
+    """
+    Model for an imported row that was not written
+    """
+    row: int
+    errors: List[ImportFieldError]
+
+class PlayerImportResult(BaseModel):
+    """
+    Model for the outcome of a bulk player import
+    """
+    processed: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "processed": 3,
+                "inserted": 1,
+                "updated": 1,
+                "failed": 1,
+                "errors": [
+                    {"row": 2, "errors": [{"field": "Hits", "message": "Input should be a valid integer, unable to parse string as an integer"}]}
+                ],
+                "errors_truncated": False
+            }
+        }
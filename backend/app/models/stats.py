@@ -0,0 +1,33 @@
+"""
+Statistics models for the Baseball Stats Dashboard.
+
+This module defines the Pydantic models used to serialize approximate season
+statistics computed from sketches.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class SeasonQuantiles(BaseModel):
+    """
+    Model for the approximate distribution of a field over a season, or over a range of seasons
+    """
+    year: Optional[int] = None
+    start_year: int
+    end_year: int
+    count: int
+    distinct_players: int
+    quantiles: Dict[str, Optional[float]]
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "year": 2004,
+                "start_year": 2004,
+                "end_year": 2004,
+                "count": 150,
+                "distinct_players": 149,
+                "quantiles": {"0.5": 161.7, "0.9": 199.4, "0.99": 239.6}
+            }
+        }
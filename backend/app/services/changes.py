@@ -0,0 +1,264 @@
+"""
+Change tracking for the Baseball Stats Dashboard.
+
+Every write to the players collection is stamped with a value from a single,
+monotonically increasing change sequence (stored in the ``_seq`` field).
+Deleted players leave a tombstone carrying the sequence of the deletion.
+Together these let clients load the full player list once and then ask only
+for the players inserted, updated or deleted since the last sequence they saw.
+
+Sequence values are reserved before the write that uses them commits, so
+concurrent writes can commit out of sequence order. Each reservation is
+recorded as pending on the counter document until its write has finished,
+and the sequence values handed to clients (the ``seq`` of snapshots and
+change sets) stay below the oldest pending reservation. A client resuming
+from such a value therefore never skips a write that commits later. Each
+written player and tombstone also records ``_resume_seq``, the value every
+earlier reservation had committed by when its own was made, which live
+events send as their ID.
+
+Change reads may be served by secondaries. Each group of related reads runs
+in one causally consistent session, so a sequence value is never newer than
+the player data read alongside it.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import get_counters_collection, get_read_collection, get_tombstones_collection, read_session
+
+# Counter document holding the player change sequence
+PLAYERS_SEQUENCE = "players"
+
+
+class Reservation(NamedTuple):
+    """
+    A block of reserved change sequence values, ``[first, last]``.
+    
+    ``resume_seq`` is the committed change sequence value when the block was
+    reserved: every write with a value up to it had finished by then.
+    """
+    first: int
+    last: int
+    resume_seq: int
+
+
+def committed_change_seq(counter: Optional[Dict[str, Any]]) -> int:
+    """
+    Get the highest change sequence value up to which every write has finished.
+    
+    Reservations pending for longer than CHANGE_SEQ_RESERVATION_TIMEOUT are
+    assumed to belong to a process that died mid-write, and no longer hold
+    the value back.
+    
+    Args:
+        counter: The counter document, or None if nothing was reserved yet.
+    """
+    if counter is None:
+        return 0
+    cutoff = time.time() - settings.CHANGE_SEQ_RESERVATION_TIMEOUT
+    pending = [reservation["first"] for reservation in counter.get("pending", []) if reservation["at"] >= cutoff]
+    return min(pending, default=counter["seq"] + 1) - 1
+
+
+async def reserve_change_seq(count: int = 1) -> Reservation:
+    """
+    Reserve the next ``count`` values of the change sequence, recording them
+    as pending until ``release_change_seq`` is called.
+    
+    Args:
+        count: How many sequence values to reserve (e.g. one per inserted player).
+    """
+    now = time.time()
+    before = await get_counters_collection().find_one_and_update(
+        {"_id": PLAYERS_SEQUENCE},
+        [
+            # Record the block as pending, dropping reservations abandoned by dead processes
+            {"$set": {"pending": {"$concatArrays": [
+                {"$filter": {
+                    "input": {"$ifNull": ["$pending", []]},
+                    "cond": {"$gte": ["$$this.at", now - settings.CHANGE_SEQ_RESERVATION_TIMEOUT]},
+                }},
+                [{"first": {"$add": [{"$ifNull": ["$seq", 0]}, 1]}, "at": now}],
+            ]}}},
+            {"$set": {"seq": {"$add": [{"$ifNull": ["$seq", 0]}, count]}}},
+        ],
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    last = (before["seq"] if before else 0) + count
+    return Reservation(last - count + 1, last, committed_change_seq(before))
+        
+
+async def release_change_seq(reservation: Reservation):
+    """
+    Mark a reserved block as finished, whether or not its write succeeded.
+    """
+    await get_counters_collection().update_one(
+        {"_id": PLAYERS_SEQUENCE},
+        {"$pull": {"pending": {"first": reservation.first}}},
+    )
+
+
+@asynccontextmanager
+async def reserved_change_seq(count: int = 1) -> AsyncIterator[Reservation]:
+    """
+    Reserve ``count`` change sequence values for the writes made in the block.
+    
+    Example:
+        ```
+        async with reserved_change_seq() as reservation:
+            await collection.insert_one(dict(player, _seq=reservation.last))
+        ```
+    """
+    reservation = await reserve_change_seq(count)
+    try:
+        yield reservation
+    finally:
+        await release_change_seq(reservation)
+
+
+def resume_seq(document: Dict[str, Any]) -> int:
+    """
+    Get the change sequence value a client that received a change may resume from.
+    """
+    # Documents written before resume values were recorded
+    return document.get("_resume_seq", document["_seq"] - 1)
+
+
+async def current_change_seq(session=None) -> int:
+    """
+    Get the committed change sequence value (see ``committed_change_seq``).
+    
+    The value is read from the same members as the player list, so read it
+    in the session used for the list, before the list.
+    
+    Args:
+        session: The read session the list is read in (optional).
+    """
+    counters = get_read_collection(settings.COUNTERS_COLLECTION_NAME)
+    return committed_change_seq(await counters.find_one({"_id": PLAYERS_SEQUENCE}, session=session))
+
+
+async def stamp_unsequenced_players(collection, batch_size: int = 1000) -> int:
+    """
+    Stamp players written before change tracking existed with change sequence values.
+    
+    Players without a ``_seq`` are invisible to change reads, and so to
+    delta clients and to everything built from the change sequence (the
+    similarity index, season sketches and static views). Each batch gets a
+    block of reserved values, as if its players had just been written.
+    Workers running this at the same time only stamp each player once; the
+    values another worker reserved for it are simply left unused.
+    
+    Args:
+        collection: The players collection (or a partition of it).
+        batch_size: How many players to stamp per reservation.
+    
+    Returns:
+        int: The number of players stamped.
+    """
+    stamped = 0
+    while True:
+        unsequenced = {"_seq": {"$exists": False}}
+        batch = await collection.find(unsequenced, {"_id": 1}).to_list(batch_size)
+        if not batch:
+            return stamped
+        async with reserved_change_seq(len(batch)) as reservation:
+            result = await collection.bulk_write([
+                UpdateOne(
+                    dict(unsequenced, _id=document["_id"]),
+                    {"$set": {"_seq": reservation.first + offset, "_resume_seq": reservation.resume_seq}},
+                )
+                for offset, document in enumerate(batch)
+            ], ordered=False)
+        stamped += result.modified_count
+
+
+async def record_deletion(tombstone: Dict[str, Any]):
+    """
+    Leave a tombstone (``id``, ``_seq`` and ``_resume_seq``) for a deleted player.
+    """
+    await get_tombstones_collection().update_one(
+        {"id": tombstone["id"]},
+        {"$set": tombstone},
+        upsert=True,
+    )
+
+
+def changes_query(since: int, seq: int) -> Dict[str, Any]:
+    """
+    Build the filter for changes after ``since``, up to the committed value ``seq``.
+    """
+    return {"_seq": {"$gt": since, "$lte": seq}}
+
+
+def merge_changes(upserted: List[Dict[str, Any]], deleted: List[Dict[str, Any]], since: int, limit: int) -> Dict[str, Any]:
+    """
+    Merge changed players and tombstones, each in sequence order, into a change set.
+    
+    Args:
+        upserted: Up to ``limit`` players changed after ``since``.
+        deleted: Up to ``limit`` tombstones recorded after ``since``.
+        since: The last sequence value the client has applied.
+        limit: The maximum number of changes to return.
+    """
+    changes = sorted(
+        [(player["_seq"], "upserted", player) for player in upserted]
+        + [(tombstone["_seq"], "deleted", tombstone) for tombstone in deleted],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit or len(upserted) == limit or len(deleted) == limit
+    changes = changes[:limit]
+    
+    return {
+        "seq": changes[-1][0] if changes else since,
+        "upserted": [doc for _, kind, doc in changes if kind == "upserted"],
+        "deleted": [doc["id"] for _, kind, doc in changes if kind == "deleted"],
+        "has_more": has_more,
+    }
+
+
+async def get_changes_since(since: int, limit: int, session=None) -> Dict[str, Any]:
+    """
+    Get the players changed after a given sequence value.
+    
+    Changes are returned in sequence order, at most ``limit`` at a time, and
+    only up to the committed change sequence value, so a write that commits
+    after a later one is not skipped. A player deleted and re-added in the
+    same window appears in both lists; clients apply ``deleted`` before
+    ``upserted``.
+    
+    Args:
+        since: The last sequence value the client has applied.
+        limit: The maximum number of changes to return.
+        session: The read session to use; a new one is started if omitted.
+        
+    Returns:
+        dict: ``upserted`` players, ``deleted`` player IDs, the ``seq`` to pass
+        as ``since`` next time, and whether more changes are waiting (``has_more``).
+    """
+    if session is None:
+        async with read_session() as new_session:
+            return await _read_changes(since, limit, new_session)
+    return await _read_changes(since, limit, session)
+
+
+async def _read_changes(since: int, limit: int, session) -> Dict[str, Any]:
+    seq = await current_change_seq(session)
+    if seq <= since:
+        return merge_changes([], [], since, limit)
+    query = changes_query(since, seq)
+    upserted: List[Dict[str, Any]] = await get_read_collection().find(
+        query, {"_id": 0}, session=session
+    ).sort("_seq", 1).to_list(limit)
+    deleted: List[Dict[str, Any]] = await get_read_collection(settings.TOMBSTONES_COLLECTION_NAME).find(
+        query, {"_id": 0}, session=session
+    ).sort("_seq", 1).to_list(limit)
+    
+    return merge_changes(upserted, deleted, since, limit)
@@ -0,0 +1,297 @@
+"""
+Player change events for the Baseball Stats Dashboard.
+
+This module fans player change events out to live subscribers (the
+server-sent events endpoint). Each event is serialized to its wire format
+once, when it is published, and the same bytes are handed to every matching
+subscriber, so the cost of an event does not grow with the subscriber count
+beyond a queue append.
+
+Every subscriber has a bounded buffer. A subscriber that falls too far behind
+is not allowed to hold up the others: its buffer is dropped and replaced by a
+single ``resync`` event, telling the client to catch up through
+``GET /api/players/changes``.
+
+Events are published either by the write endpoints of this process
+(EVENT_SOURCE=local) or from a MongoDB change stream
+(EVENT_SOURCE=change_stream), which also sees writes made by other worker
+processes and pods but requires a replica set.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.services.changes import resume_seq
+from app.services.query_cache import get_query_cache
+
+# Player fields included in upsert events
+PLAYER_FIELDS = ("id", "Player", "AgeThatYear", "Hits", "Year", "Bats", "Rank")
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """
+    Serialize an event as a server-sent events frame.
+    """
+    frame = ""
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    frame += f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return frame.encode()
+
+
+class Subscription:
+    """
+    A live subscriber to player change events.
+    
+    Args:
+        years: Only receive events for players in these seasons.
+        ids: Only receive events for these players.
+        buffer_size: Maximum number of undelivered events held for the subscriber.
+        
+    A subscription with neither filter receives every event; otherwise it
+    receives events matching either filter.
+    """
+    def __init__(self, years: Iterable[int] = (), ids: Iterable[int] = (), buffer_size: int = 100, last_seq: int = 0):
+        self.years: Set[int] = set(years)
+        self.ids: Set[int] = set(ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.last_seq = last_seq
+        self.lagged = 0
+    
+    def deliver(self, frame: bytes, seq: Optional[int]):
+        """
+        Queue an event frame, replacing the backlog with a resync event on overflow.
+        """
+        try:
+            self.queue.put_nowait((frame, seq))
+        except asyncio.QueueFull:
+            self.lagged += 1
+            self.resync()
+    
+    def resync(self):
+        """
+        Drop any undelivered events and tell the client to catch up from the
+        last event it received.
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((format_event("resync", {"since": self.last_seq}), None))
+    
+    async def next_frame(self) -> bytes:
+        """
+        Wait for the next event frame.
+        """
+        frame, seq = await self.queue.get()
+        if seq is not None:
+            self.last_seq = seq
+        return frame
+
+
+class EventBus:
+    """
+    In-process fan-out of player change events to subscriptions.
+    
+    Subscriptions are indexed by their filters, so publishing only touches the
+    subscribers an event is relevant to.
+    """
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._unfiltered: Set[Subscription] = set()
+        self._by_year: Dict[int, Set[Subscription]] = {}
+        self._by_id: Dict[int, Set[Subscription]] = {}
+        self._year_filtered: Set[Subscription] = set()
+    
+    @property
+    def subscriber_count(self) -> int:
+        subscriptions = set(self._unfiltered) | self._year_filtered
+        for subs in self._by_id.values():
+            subscriptions |= subs
+        return len(subscriptions)
+    
+    def subscribe(self, years: Iterable[int] = (), ids: Iterable[int] = (), last_seq: int = 0) -> Subscription:
+        """
+        Register a new subscription.
+        
+        Args:
+            years: Seasons to filter on.
+            ids: Player IDs to filter on.
+            last_seq: The last change sequence value the client has applied.
+        """
+        subscription = Subscription(years, ids, self.buffer_size, last_seq)
+        if not subscription.years and not subscription.ids:
+            self._unfiltered.add(subscription)
+        for year in subscription.years:
+            self._by_year.setdefault(year, set()).add(subscription)
+            self._year_filtered.add(subscription)
+        for id in subscription.ids:
+            self._by_id.setdefault(id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Remove a subscription.
+        """
+        self._unfiltered.discard(subscription)
+        self._year_filtered.discard(subscription)
+        for year in subscription.years:
+            subs = self._by_year.get(year)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._by_year[year]
+        for id in subscription.ids:
+            subs = self._by_id.get(id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._by_id[id]
+    
+    def _publish(self, frame: bytes, seq: Optional[int], targets: Set[Subscription]):
+        for subscription in targets:
+            subscription.deliver(frame, seq)
+    
+    def publish_upsert(self, player: Dict[str, Any], seq: int):
+        """
+        Publish that a player was inserted or updated.
+        """
+        data = {field: player.get(field) for field in PLAYER_FIELDS}
+        frame = format_event("upserted", data, seq)
+        targets = self._unfiltered | self._by_year.get(player.get("Year"), set()) | self._by_id.get(player.get("id"), set())
+        self._publish(frame, seq, targets)
+    
+    def publish_delete(self, id: int, seq: int):
+        """
+        Publish that a player was deleted.
+        
+        The season of a deleted player is not known, so the event goes to every
+        season subscriber as well; removing an unknown ID is a no-op for clients.
+        """
+        frame = format_event("deleted", {"id": id}, seq)
+        targets = self._unfiltered | self._year_filtered | self._by_id.get(id, set())
+        self._publish(frame, seq, targets)
+    
+    def publish_resync(self):
+        """
+        Tell every subscriber to catch up through the changes endpoint, e.g.
+        after an ingest changed too many players to send one by one.
+        """
+        targets = set(self._unfiltered) | self._year_filtered
+        for subs in self._by_id.values():
+            targets |= subs
+        for subscription in targets:
+            subscription.resync()
+
+
+# Event bus instance, one per worker process
+event_bus = EventBus(buffer_size=settings.EVENT_BUFFER_SIZE)
+
+
+def get_event_bus() -> EventBus:
+    """
+    Get the event bus
+    """
+    return event_bus
+
+
+def publishes_locally() -> bool:
+    """
+    Whether write endpoints should publish their own events
+    """
+    return settings.EVENT_SOURCE == "local"
+
+
+async def event_stream(subscription: Subscription):
+    """
+    Stream a subscription's events as server-sent events.
+    
+    Sends a comment every EVENT_KEEPALIVE_INTERVAL seconds without events so
+    that proxies do not close the idle connection. The subscription is removed
+    when the client disconnects.
+    """
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                yield await asyncio.wait_for(
+                    subscription.next_frame(),
+                    timeout=settings.EVENT_KEEPALIVE_INTERVAL,
+                )
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+async def _watch(collection, on_change, match: Optional[Dict[str, Any]] = None):
+    """
+    Follow a collection's (or database's) change stream, resuming after errors.
+    """
+    # Skip updates that only cache a generated description
+    conditions = {"updateDescription.updatedFields.description": {"$exists": False}}
+    conditions.update(match or {})
+    pipeline = [{"$match": conditions}]
+    resume_token = None
+    while True:
+        try:
+            async with collection.watch(
+                pipeline,
+                full_document="updateLookup",
+                resume_after=resume_token,
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    document = change.get("fullDocument")
+                    if document is not None and "_seq" in document:
+                        on_change(document)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Change stream error, retrying: {e}")
+            await asyncio.sleep(1)
+
+
+def _on_upsert(doc: Dict[str, Any]):
+    # Writes from any process make cached query results stale
+    get_query_cache().invalidate()
+    event_bus.publish_upsert(doc, resume_seq(doc))
+
+
+def _on_delete(doc: Dict[str, Any]):
+    get_query_cache().invalidate()
+    event_bus.publish_delete(doc["id"], resume_seq(doc))
+
+
+def start_change_stream_feed() -> list:
+    """
+    Start publishing events from MongoDB change streams.
+    
+    Returns:
+        list: The watcher tasks, to be cancelled on shutdown.
+    """
+    from app.db import mongodb
+    from app.db.mongodb import get_collection, get_tombstones_collection
+    
+    if settings.PLAYER_REPOSITORY == "partitioned":
+        # Follow every decade partition, including ones created later
+        from app.services.partitions import PARTITION_NAME_PATTERN
+        players = _watch(
+            mongodb.db,
+            _on_upsert,
+            match={"ns.coll": {"$regex": PARTITION_NAME_PATTERN}},
+        )
+    else:
+        players = _watch(
+            get_collection(),
+            _on_upsert,
+        )
+    
+    return [
+        asyncio.create_task(players),
+        asyncio.create_task(_watch(
+            get_tombstones_collection(),
+            _on_delete,
+        )),
+    ]
@@ -0,0 +1,162 @@
+"""
+Bulk export of player data for the Baseball Stats Dashboard.
+
+This module streams players from a MongoDB cursor as CSV, Apache Parquet or
+Apache Arrow (IPC stream format). Rows are read from the cursor in batches,
+converted column by column and written out batch by batch (one Arrow record
+batch or Parquet row group per cursor batch), so memory use stays constant
+no matter how many players are exported.
+
+pyarrow is only imported when a Parquet or Arrow export is requested.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Exported columns and their types
+EXPORT_FIELDS = ("id", "Player", "AgeThatYear", "Hits", "Year", "Bats", "Rank")
+INTEGER_FIELDS = {"id", "Hits", "Year"}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "players.csv"),
+    "parquet": ("application/vnd.apache.parquet", "players.parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "players.arrow"),
+}
+
+
+def build_player_filter(
+    year: Optional[int] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    min_hits: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Build a MongoDB filter for players from optional query parameters.
+    """
+    query: Dict[str, Any] = {}
+    if year is not None:
+        query["Year"] = year
+    elif year_min is not None or year_max is not None:
+        query["Year"] = {}
+        if year_min is not None:
+            query["Year"]["$gte"] = year_min
+        if year_max is not None:
+            query["Year"]["$lte"] = year_max
+    if min_hits is not None:
+        query["Hits"] = {"$gte": min_hits}
+    return query
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting written bytes until they are drained.
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _row_batches(cursor, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _columns(rows: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Convert a batch of documents to typed columns.
+    """
+    columns = {}
+    for field in EXPORT_FIELDS:
+        values = [row.get(field) for row in rows]
+        if field not in INTEGER_FIELDS:
+            values = [None if value is None else str(value) for value in values]
+        columns[field] = values
+    return columns
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        (field, pa.int64() if field in INTEGER_FIELDS else pa.string())
+        for field in EXPORT_FIELDS
+    ])
+
+
+async def export_csv(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for rows in _row_batches(cursor, batch_size):
+        writer.writerows([row.get(field) for field in EXPORT_FIELDS] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def export_arrow(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for rows in _row_batches(cursor, batch_size):
+            writer.write_batch(pa.RecordBatch.from_pydict(_columns(rows), schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def export_parquet(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        async for rows in _row_batches(cursor, batch_size):
+            writer.write_table(pa.Table.from_pydict(_columns(rows), schema=schema))
+            yield sink.drain()
+    # The footer is written when the writer closes
+    yield sink.drain()
+
+
+def export_players(cursor, format: str, batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Stream the players from a cursor in the given format.
+    
+    Args:
+        cursor: An async cursor over player documents.
+        format: One of ``csv``, ``parquet`` or ``arrow``.
+        batch_size: Rows per output batch (Arrow record batch / Parquet row group).
+        
+    Returns:
+        AsyncIterator[bytes]: The encoded output, chunk by chunk.
+    """
+    exporters = {"csv": export_csv, "parquet": export_parquet, "arrow": export_arrow}
+    return exporters[format](cursor, batch_size)
@@ -0,0 +1,223 @@
+"""
+Bulk import of player data for the Baseball Stats Dashboard.
+
+This module reads uploaded CSV, NDJSON or Apache Parquet files chunk by chunk,
+validates each chunk straight into player documents in a single call (see
+app.services.validation) and writes the valid players with one
+unordered bulk upsert per chunk through the player repository. Rows that cannot be parsed, fail validation
+or fail to write are reported individually instead of failing the import.
+
+Parsing and validation are CPU-bound, so each chunk is prepared in a worker
+thread to keep the event loop responsive during large imports.
+
+pyarrow is only imported when a Parquet file is imported.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import csv
+import io
+import json
+from collections import defaultdict
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.services.validation import error_report, validate_players
+
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+}
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+}
+
+
+class ImportFormatError(Exception):
+    """
+    Raised when an uploaded file cannot be read in the requested format
+    """
+
+
+class _BadRow:
+    """
+    Placeholder for a row that could not be parsed.
+    """
+    def __init__(self, message: str):
+        self.message = message
+
+
+def detect_import_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Work out the format of an upload from its file name or content type.
+    """
+    if filename:
+        for extension, format in IMPORT_FORMATS.items():
+            if filename.lower().endswith(extension):
+                return format
+    if content_type:
+        return IMPORT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def _batched(rows, batch_size: int) -> Iterator[List[Any]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_rows(file: BinaryIO) -> Iterator[Any]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # Leave the upload open for its owner to close
+        text.detach()
+
+
+def _ndjson_rows(file: BinaryIO) -> Iterator[Any]:
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield _BadRow(f"Invalid JSON: {e}")
+            continue
+        yield row if isinstance(row, dict) else _BadRow("Expected a JSON object")
+
+
+def _parquet_batches(file: BinaryIO, batch_size: int) -> Iterator[List[Any]]:
+    import pyarrow.parquet as pq
+    
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+
+def read_chunks(file: BinaryIO, format: str, batch_size: int) -> Iterator[List[Any]]:
+    """
+    Read an uploaded file as lists of at most ``batch_size`` raw rows.
+    
+    Args:
+        file: The uploaded file, opened in binary mode.
+        format: One of ``csv``, ``ndjson`` or ``parquet``.
+        batch_size: The maximum number of rows per chunk.
+    
+    Returns:
+        Iterator[List[Any]]: Chunks of row dictionaries; rows that could not
+        be parsed are represented by placeholders carrying the reason.
+    """
+    if format == "parquet":
+        return _parquet_batches(file, batch_size)
+    rows = _csv_rows(file) if format == "csv" else _ndjson_rows(file)
+    return _batched(rows, batch_size)
+
+
+def validate_chunk(rows: List[Any], first_row: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validate a chunk of raw rows against the ``Player`` schema.
+    
+    The whole chunk is validated in one call, producing the documents to
+    write directly.
+    
+    Args:
+        rows: Raw rows as returned by ``read_chunks``.
+        first_row: The (1-based) row number of the first row in the chunk.
+    
+    Returns:
+        Tuple: The player documents for the valid rows, and an error report
+        (row number and field errors) for each invalid row.
+    """
+    errors: Dict[int, List[Dict[str, str]]] = defaultdict(list)
+    candidates = []
+    offsets = []
+    for offset, row in enumerate(rows):
+        if isinstance(row, _BadRow):
+            errors[offset].append({"field": "", "message": row.message})
+        else:
+            candidates.append(row)
+            offsets.append(offset)
+    
+    documents, invalid = validate_players(candidates)
+    for index, field_errors in invalid.items():
+        errors[offsets[index]].extend(field_errors)
+    return documents, error_report(errors, first_row)
+
+
+def _next_chunk(chunks: Iterator[List[Any]], first_row: int):
+    rows = next(chunks, None)
+    if rows is None:
+        return None
+    documents, errors = validate_chunk(rows, first_row)
+    return len(rows), documents, errors
+
+
+async def import_players(repository, file: BinaryIO, format: str, batch_size: int, max_errors: int) -> Dict[str, Any]:
+    """
+    Import players from an uploaded file, chunk by chunk.
+    
+    Args:
+        repository: The player repository to write to.
+        file: The uploaded file, opened in binary mode.
+        format: One of ``csv``, ``ndjson`` or ``parquet``.
+        batch_size: The number of rows to validate and write at a time.
+        max_errors: The maximum number of row errors to report.
+    
+    Returns:
+        Dict[str, Any]: Row counts and the per-row error report.
+    
+    Raises:
+        ImportFormatError: If the file cannot be read in the given format.
+    """
+    summary = {"processed": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    
+    def report(errors: List[Dict[str, Any]]):
+        summary["failed"] += len(errors)
+        room = max_errors - len(summary["errors"])
+        if len(errors) > room:
+            summary["errors_truncated"] = True
+        summary["errors"].extend(errors[:max(room, 0)])
+    
+    try:
+        chunks = read_chunks(file, format, batch_size)
+        while True:
+            chunk = await asyncio.to_thread(_next_chunk, chunks, summary["processed"] + 1)
+            if chunk is None:
+                break
+            count, documents, errors = chunk
+            
+            if documents:
+                # Map write errors back to the row numbers of the valid rows
+                invalid_rows = {error["row"] for error in errors}
+                valid_rows = [
+                    row for row in range(summary["processed"] + 1, summary["processed"] + count + 1)
+                    if row not in invalid_rows
+                ]
+                inserted, updated, write_errors = await repository.bulk_upsert(documents)
+                summary["inserted"] += inserted
+                summary["updated"] += updated
+                errors = errors + [
+                    {"row": valid_rows[error["index"]], "errors": [{"field": "", "message": error["message"]}]}
+                    for error in write_errors
+                ]
+                errors.sort(key=lambda error: error["row"])
+            
+            report(errors)
+            summary["processed"] += count
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Could not read {format} file after {summary['processed']} rows: {e}")
+    except Exception as e:
+        if format == "parquet" and type(e).__module__.startswith("pyarrow"):
+            raise ImportFormatError(f"Could not read parquet file after {summary['processed']} rows: {e}")
+        raise
+    
+    return summary
@@ -0,0 +1,360 @@
+"""
+Background job runner for the Baseball Stats Dashboard.
+
+This module runs long-running work (data ingest, description backfill) off
+the request path. Jobs are queued in-process and executed by a fixed number
+of worker tasks, so the amount of concurrent background work stays bounded
+and the API remains responsive while it runs.
+
+Job state is kept in a job store. The in-memory store is the default; the
+MongoDB store persists jobs so that any worker process can report on them
+and queued or interrupted jobs are picked up again after a restart.
+
+A running job is leased to the runner executing it, which renews the lease
+while the job runs. A job is only run again once its lease has expired,
+i.e. once the runner holding it has stopped renewing it. Every runner looks
+for expired leases (and queued jobs no runner holds) every half lease
+period, so a job left behind by a dead process is picked up even if no
+process restarts.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.models.job import JobStatus
+
+# Reports progress as (done, total)
+ProgressCallback = Callable[[int, Optional[int]], Awaitable[None]]
+
+# Runs a job given its params, returning the job result
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+
+# How long a running job without a lease may go without progress before it is run again
+UNLEASED_STALE_AFTER = timedelta(seconds=600)
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity
+    """
+
+
+class InMemoryJobStore:
+    """
+    Job store holding jobs in a dict, local to the worker process
+    """
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+    
+    async def create(self, job: Dict[str, Any]):
+        self._jobs[job["id"]] = dict(job)
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+    
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        self._jobs[job_id].update(fields)
+    
+    async def claim(self, job_id: str, owner: str, lease_until: datetime) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != JobStatus.QUEUED:
+            return None
+        job.update({
+            "status": JobStatus.RUNNING.value,
+            "lease_owner": owner,
+            "lease_until": lease_until,
+            "updated_at": _now(),
+        })
+        return dict(job)
+    
+    async def renew(self, job_id: str, owner: str, lease_until: datetime) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != JobStatus.RUNNING or job.get("lease_owner") != owner:
+            return False
+        job["lease_until"] = lease_until
+        return True
+    
+    async def recover(self, now: datetime) -> List[str]:
+        for job in self._jobs.values():
+            if job["status"] == JobStatus.RUNNING and job["lease_until"] < now:
+                job["status"] = JobStatus.QUEUED.value
+        return [job["id"] for job in self._jobs.values() if job["status"] == JobStatus.QUEUED]
+
+
+class MongoJobStore:
+    """
+    Job store persisting jobs to a MongoDB collection.
+    
+    Jobs are claimed with an atomic status transition, so when several worker
+    processes share the collection each job still runs only once.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+    
+    async def create(self, job: Dict[str, Any]):
+        await self.collection.insert_one(dict(job))
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+    
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        await self.collection.update_one({"id": job_id}, {"$set": fields})
+    
+    async def claim(self, job_id: str, owner: str, lease_until: datetime) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one_and_update(
+            {"id": job_id, "status": JobStatus.QUEUED.value},
+            {"$set": {
+                "status": JobStatus.RUNNING.value,
+                "lease_owner": owner,
+                "lease_until": lease_until,
+                "updated_at": _now(),
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+    
+    async def renew(self, job_id: str, owner: str, lease_until: datetime) -> bool:
+        result = await self.collection.update_one(
+            {"id": job_id, "status": JobStatus.RUNNING.value, "lease_owner": owner},
+            {"$set": {"lease_until": lease_until}},
+        )
+        return result.matched_count > 0
+    
+    async def recover(self, now: datetime) -> List[str]:
+        # Jobs claimed before leases were introduced have none; they are
+        # reclaimed once they made no progress for the old staleness window
+        await self.collection.update_many(
+            {"status": JobStatus.RUNNING.value, "$or": [
+                {"lease_until": {"$lt": now}},
+                {"lease_until": {"$exists": False}, "updated_at": {"$lt": now - UNLEASED_STALE_AFTER}},
+            ]},
+            {"$set": {"status": JobStatus.QUEUED.value}},
+        )
+        cursor = self.collection.find({"status": JobStatus.QUEUED.value}, {"id": 1, "_id": 0})
+        return [job["id"] for job in await cursor.sort("created_at", 1).to_list(None)]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobRunner:
+    """
+    Runs submitted jobs on a fixed pool of worker tasks.
+    
+    Args:
+        store: Where job state is kept.
+        handlers: The handler to run for each job type.
+        workers: Number of jobs that may run at the same time.
+        queue_size: Maximum number of jobs waiting to run.
+        lease_duration: Seconds a running job stays leased to this runner
+            without being renewed. The lease is renewed three times per
+            period while the job runs; once it expires, the job is assumed
+            to belong to a dead process and may be run again. Expired
+            leases are looked for every half period.
+    """
+    def __init__(
+        self,
+        store,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        queue_size: int = 100,
+        lease_duration: float = 60,
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.lease_duration = lease_duration
+        # Identifies this runner as the holder of its jobs' leases
+        self.owner = uuid.uuid4().hex
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Jobs in the local queue, so recovery does not queue them twice
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self):
+        """
+        Start the worker tasks, and the task requeueing jobs left unfinished
+        by this or any other process (starting with those of a previous run).
+        """
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover()))
+    
+    async def stop(self):
+        """
+        Stop the worker tasks. Jobs that were running stay marked as running,
+        so a persistent store will pick them up again once their lease expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a new job.
+        
+        Returns:
+            dict: The created job.
+            
+        Raises:
+            ValueError: If there is no handler for the job type.
+            JobQueueFull: If the queue is at capacity.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if self._queue.full():
+            raise JobQueueFull("Job queue is full")
+        
+        now = _now()
+        job = {
+            "id": uuid.uuid4().hex,
+            "type": job_type,
+            "params": params,
+            "status": JobStatus.QUEUED.value,
+            "progress": {"done": 0, "total": None},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.store.create(job)
+        self._queue.put_nowait(job["id"])
+        self._queued.add(job["id"])
+        return job
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job by ID, or None if it does not exist.
+        """
+        return await self.store.get(job_id)
+    
+    async def join(self):
+        """
+        Wait until every queued job has finished.
+        """
+        await self._queue.join()
+    
+    async def _recover(self):
+        while True:
+            try:
+                for job_id in await self.store.recover(_now()):
+                    if job_id not in self._queued:
+                        # Waits for room when the queue is full, rather than
+                        # leaving the remaining jobs to no one
+                        await self._queue.put(job_id)
+                        self._queued.add(job_id)
+            except Exception as e:
+                print(f"Error recovering jobs: {e}")
+            await asyncio.sleep(self.lease_duration / 2)
+    
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # e.g. the store timed out; recovery queues the job again if it
+                # was not claimed, or once its lease expires
+                print(f"Error running job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def _lease_until(self) -> datetime:
+        return _now() + timedelta(seconds=self.lease_duration)
+    
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_duration / 3)
+            try:
+                renewed = await self.store.renew(job_id, self.owner, self._lease_until())
+            except Exception as e:
+                print(f"Error renewing the lease of job {job_id}: {e}")
+                continue
+            if not renewed:
+                print(f"Job {job_id} lost its lease and may be run again elsewhere")
+                return
+    
+    async def _run(self, job_id: str):
+        # Another worker process may already have claimed this job
+        job = await self.store.claim(job_id, self.owner, self._lease_until())
+        if job is None:
+            return
+        
+        async def report(done: int, total: Optional[int] = None):
+            await self.store.update(job_id, {
+                "progress": {"done": done, "total": total},
+                "updated_at": _now(),
+            })
+        
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await self.handlers[job["type"]](job["params"], report)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            await self.store.update(job_id, {
+                "status": JobStatus.FAILED.value,
+                "error": str(e),
+                "updated_at": _now(),
+            })
+            return
+        finally:
+            heartbeat.cancel()
+        
+        await self.store.update(job_id, {
+            "status": JobStatus.SUCCEEDED.value,
+            "result": result,
+            "updated_at": _now(),
+        })
+
+
+# Job runner instance, one per worker process
+job_runner: Optional[JobRunner] = None
+
+
+async def start_job_runner():
+    """
+    Create and start the job runner with the configured store
+    """
+    global job_runner
+    from app.db.mongodb import get_jobs_collection
+    from app.services.player_jobs import JOB_HANDLERS
+    
+    if settings.JOB_STORE == "mongo" and get_jobs_collection() is not None:
+        store = MongoJobStore(get_jobs_collection())
+    else:
+        store = InMemoryJobStore()
+    
+    job_runner = JobRunner(
+        store,
+        JOB_HANDLERS,
+        workers=settings.JOB_WORKERS,
+        queue_size=settings.JOB_QUEUE_SIZE,
+        lease_duration=settings.JOB_LEASE_DURATION,
+    )
+    await job_runner.start()
+
+async def stop_job_runner():
+    """
+    Stop the job runner
+    """
+    global job_runner
+    if job_runner:
+        await job_runner.stop()
+        job_runner = None
+
+def get_job_runner() -> Optional[JobRunner]:
+    """
+    Get the job runner
+    """
+    return job_runner
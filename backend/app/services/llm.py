@@ -0,0 +1,256 @@
+"""
+Language model backends for player descriptions.
+
+This module defines the interface used to generate player descriptions and
+its implementations:
+- OpenAIProvider: OpenAI's completions API, or any OpenAI-compatible server
+  (such as a local model server) when a base URL is configured
+- TemplateProvider: a deterministic offline generator, for development,
+  tests and benchmarks without network access
+
+Description requests are micro-batched: requests arriving within a few
+milliseconds of each other are sent as one multi-prompt completion, which
+cuts per-request overhead when many descriptions are needed at once (e.g.
+during a backfill).
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+
+def player_description_prompt(player: Dict[str, Any]) -> str:
+    """
+    Build the completion prompt asking for a player's description.
+    """
+    return f"Write a detailed description for the baseball player: {player['Player']}. Include information about their {player['Year']} season when they had {player['Hits']} hits at age {player['AgeThatYear']}."
+
+
+class DescriptionProvider:
+    """
+    Interface for backends that generate player descriptions.
+    """
+    async def describe_many(self, players: List[Dict[str, Any]]) -> List[str]:
+        """
+        Generate descriptions for several players in one call.
+        
+        Returns:
+            List[str]: One description per player, in the same order.
+        """
+        raise NotImplementedError
+    
+    async def stream_description(self, player: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Generate a player's description, yielding text as it is produced.
+        """
+        raise NotImplementedError
+        yield
+
+
+class OpenAIProvider(DescriptionProvider):
+    """
+    Provider using the OpenAI completions API.
+    
+    Args:
+        api_key: The API key.
+        base_url: Base URL of an OpenAI-compatible server, or None for OpenAI itself.
+        model: The completion model to use.
+        max_tokens: The maximum length of each description.
+        client: An existing client to use instead of creating one on first use.
+    """
+    def __init__(
+        self,
+        api_key: str = "",
+        base_url: Optional[str] = None,
+        model: str = "gpt-3.5-turbo-instruct",
+        max_tokens: int = 250,
+        client=None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_tokens = max_tokens
+        self._client = client
+    
+    @property
+    def client(self):
+        # openai (and httpx) are imported on first use to keep startup fast
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key or "unused", base_url=self.base_url)
+        return self._client
+    
+    async def describe_many(self, players: List[Dict[str, Any]]) -> List[str]:
+        response = await self.client.completions.create(
+            model=self.model,
+            prompt=[player_description_prompt(player) for player in players],
+            max_tokens=self.max_tokens
+        )
+        # Choices come back with the index of the prompt they answer
+        descriptions = [""] * len(players)
+        for choice in response.choices:
+            descriptions[choice.index] = choice.text.strip()
+        return descriptions
+    
+    async def stream_description(self, player: Dict[str, Any]) -> AsyncIterator[str]:
+        stream = await self.client.completions.create(
+            model=self.model,
+            prompt=player_description_prompt(player),
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].text:
+                yield chunk.choices[0].text
+
+
+class TemplateProvider(DescriptionProvider):
+    """
+    Offline provider building descriptions from a fixed template.
+    
+    Output depends only on the player, so it is stable across runs.
+    
+    Args:
+        latency: Seconds to wait per call, to simulate a remote model in benchmarks.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+    
+    def describe(self, player: Dict[str, Any]) -> str:
+        return (
+            f"{player['Player']} recorded {player['Hits']} hits in the {player['Year']} season "
+            f"at age {player['AgeThatYear']}, finishing ranked {player.get('Rank') or 'unranked'} "
+            f"among the season's hitters."
+        )
+    
+    async def describe_many(self, players: List[Dict[str, Any]]) -> List[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self.describe(player) for player in players]
+    
+    async def stream_description(self, player: Dict[str, Any]) -> AsyncIterator[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        words = self.describe(player).split(" ")
+        for i, word in enumerate(words):
+            yield word if i == 0 else f" {word}"
+
+
+class DescriptionBatcher:
+    """
+    Collects description requests into batches for a provider.
+    
+    A batch is sent once it holds ``max_batch_size`` requests or ``max_wait``
+    seconds after its first request arrived, whichever comes first.
+    
+    Args:
+        provider: The provider to send batches to.
+        max_batch_size: The maximum number of players per batch.
+        max_wait: Seconds to wait for more requests before sending a batch.
+    """
+    def __init__(self, provider: DescriptionProvider, max_batch_size: int = 16, max_wait: float = 0.005):
+        self.provider = provider
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Batches being sent, kept referenced until they finish
+        self._sending: Set[asyncio.Task] = set()
+    
+    async def describe(self, player: Dict[str, Any]) -> str:
+        """
+        Generate a player's description as part of the next batch.
+        
+        Raises:
+            Exception: If the provider fails for the batch, or returns no
+                description for this player.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((player, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+    
+    async def _send(self, batch: List[tuple]):
+        players = [player for player, _ in batch]
+        try:
+            descriptions = await self.provider.describe_many(players)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # Each caller gets its own result, so a missing or failed description
+        # only fails the request it belongs to
+        for i, (player, future) in enumerate(batch):
+            if future.done():
+                continue
+            description = descriptions[i] if i < len(descriptions) else None
+            if isinstance(description, Exception):
+                future.set_exception(description)
+            elif not isinstance(description, str) or not description:
+                future.set_exception(RuntimeError(f"No description returned for player {player.get('id')}"))
+            else:
+                future.set_result(description)
+
+
+def create_description_provider() -> DescriptionProvider:
+    """
+    Create the provider selected by the LLM_PROVIDER setting.
+    
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if settings.LLM_PROVIDER == "template":
+        return TemplateProvider()
+    if settings.LLM_PROVIDER in ("openai", "openai_compatible"):
+        return OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.LLM_BASE_URL or None,
+            model=settings.LLM_MODEL,
+            max_tokens=settings.LLM_MAX_TOKENS,
+        )
+    raise ValueError(f"Unknown LLM provider: {settings.LLM_PROVIDER}")
+
+
+# Provider and batcher instances, created on first use
+description_provider: Optional[DescriptionProvider] = None
+description_batcher: Optional[DescriptionBatcher] = None
+
+
+def get_description_provider() -> DescriptionProvider:
+    """
+    Get the configured description provider
+    """
+    global description_provider
+    if description_provider is None:
+        description_provider = create_description_provider()
+    return description_provider
+
+
+def get_description_batcher() -> DescriptionBatcher:
+    """
+    Get the batcher for the configured description provider
+    """
+    global description_batcher
+    if description_batcher is None:
+        description_batcher = DescriptionBatcher(
+            get_description_provider(),
+            max_batch_size=settings.LLM_BATCH_SIZE,
+            max_wait=settings.LLM_BATCH_WAIT_MS / 1000,
+        )
+    return description_batcher
@@ -0,0 +1,474 @@
+"""
+Time-partitioned player storage for the Baseball Stats Dashboard.
+
+Player-seasons are stored in one collection per decade of seasons
+(``Players_1990s``, ``Players_2000s``, ...). Queries filtered by ``Year`` are
+routed only to the partitions covering those seasons, so their latency does
+not grow as more history is loaded. A small directory collection maps each
+player ID to its partition for lookups by ID.
+
+Decades that ended more than PARTITION_SEAL_AFTER_YEARS ago are sealed: their
+data does not change in the normal course of things, so counts and small
+query results from them are cached in-process, and the
+``partition_compaction`` job compacts their collections on disk. Writes to a
+sealed partition are still allowed; they drop its cached results in this
+process, and other processes pick them up once their cached entries expire
+(PARTITION_CACHE_TTL, 30 seconds by default like the query cache's).
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import json
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db import mongodb
+from app.services.changes import changes_query, current_change_seq, merge_changes, stamp_unsequenced_players
+from app.services.repository import BulkResult, MotorPlayerRepository, PlayerRepository
+
+# Matches partition collection names, e.g. Players_1990s
+PARTITION_NAME_PATTERN = f"^{settings.COLLECTION_NAME}_[0-9]+s$"
+
+
+def decade_of(year: int) -> int:
+    """
+    Get the first season of the decade a season belongs to, e.g. 1990 for 1997.
+    """
+    return year - year % 10
+
+
+def partition_name(decade: int) -> str:
+    """
+    Get the collection name of a decade's partition.
+    """
+    return f"{settings.COLLECTION_NAME}_{decade}s"
+
+
+def parse_partition_name(name: str) -> Optional[int]:
+    """
+    Get the decade a partition collection holds, or None if the name is not a partition's.
+    """
+    prefix = f"{settings.COLLECTION_NAME}_"
+    if name.startswith(prefix) and name.endswith("s") and name[len(prefix):-1].isdigit():
+        return int(name[len(prefix):-1])
+    return None
+
+
+def year_range(query: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Get the (inclusive) range of seasons a player filter can match.
+    
+    Returns:
+        Tuple: The first and last season, either of which is None if unbounded.
+    """
+    condition = query.get("Year")
+    if condition is None:
+        return None, None
+    if not isinstance(condition, dict):
+        return condition, condition
+    
+    low = high = None
+    for operator, operand in condition.items():
+        if operator == "$gte":
+            low = operand
+        elif operator == "$gt":
+            low = operand + 1
+        elif operator == "$lte":
+            high = operand
+        elif operator == "$lt":
+            high = operand - 1
+        else:
+            # Can't route other operators, so search every partition
+            return None, None
+    return low, high
+
+
+class PartitionRouter:
+    """
+    Tracks the existing partitions and picks the ones a query needs.
+    
+    Partitions created by other worker processes are discovered when the
+    list is refreshed, every PARTITION_REFRESH_INTERVAL seconds.
+    """
+    def __init__(self, decades: Iterable[int] = (), refresh_interval: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.decades = set(decades)
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._refreshed_at: Optional[float] = None
+    
+    @property
+    def stale(self) -> bool:
+        return self._refreshed_at is None or self._clock() - self._refreshed_at >= self.refresh_interval
+    
+    async def refresh(self, database):
+        """
+        Reload the list of partitions from the database.
+        """
+        names = await database.list_collection_names()
+        self.decades = {decade for decade in map(parse_partition_name, names) if decade is not None}
+        self._refreshed_at = self._clock()
+    
+    def add(self, decade: int):
+        self.decades.add(decade)
+    
+    def route(self, query: Dict[str, Any]) -> List[int]:
+        """
+        Get the decades whose partitions can hold players matching a filter, in order.
+        """
+        low, high = year_range(query)
+        return sorted(
+            decade for decade in self.decades
+            if (low is None or decade + 9 >= low) and (high is None or decade <= high)
+        )
+
+
+def is_sealed(decade: int, current_year: Optional[int] = None) -> bool:
+    """
+    Check whether a decade ended more than PARTITION_SEAL_AFTER_YEARS ago.
+    """
+    if current_year is None:
+        current_year = datetime.now(timezone.utc).year
+    return decade + 9 + settings.PARTITION_SEAL_AFTER_YEARS < current_year
+
+
+class SealedPartitionCache:
+    """
+    Least-recently-used cache of query results from sealed partitions, with expiry.
+    """
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[int, int] = defaultdict(int)
+    
+    @staticmethod
+    def key(decade: int, *parts: Any) -> Tuple:
+        return (decade, json.dumps(parts, sort_keys=True, default=str))
+    
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+    
+    def generation(self, decade: int) -> int:
+        """
+        Get a counter that changes whenever a decade's entries are invalidated.
+        """
+        return self._generations[decade]
+    
+    def put(self, key: Tuple, value: Any, generation: Optional[int] = None):
+        """
+        Cache a value, unless its decade was invalidated since the given generation.
+        """
+        if generation is not None and generation != self._generations[key[0]]:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, decade: int):
+        self._generations[decade] += 1
+        for key in [key for key in self._entries if key[0] == decade]:
+            del self._entries[key]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PartitionedPlayerRepository(PlayerRepository):
+    """
+    Repository storing players in MongoDB, one collection per decade of seasons.
+    
+    Each partition is accessed through a ``MotorPlayerRepository``, so change
+    sequence stamping, tombstones and secondary reads work as they do for the
+    single collection. Lists, exports and backfills return players partition
+    by partition (in ID order within each decade). Players are located through
+    the directory, so season hints to lookups and writes by ID are not needed.
+    """
+    def __init__(self, database=None, read_database=None, router: Optional[PartitionRouter] = None,
+                 cache: Optional[SealedPartitionCache] = None, session=None):
+        self.database = database if database is not None else mongodb.db
+        self.read_database = read_database if read_database is not None else mongodb.read_db
+        self.router = router if router is not None else partition_router
+        self.cache = cache if cache is not None else partition_cache
+        self.session = session
+        self._options = {"session": session} if session is not None else {}
+        self.directory = self.database[settings.PARTITION_DIRECTORY_COLLECTION_NAME]
+    
+    def _partition(self, decade: int) -> MotorPlayerRepository:
+        name = partition_name(decade)
+        return MotorPlayerRepository(self.database[name], self.read_database[name], self.session)
+    
+    async def _route(self, query: Dict[str, Any], fresh: bool = False) -> List[int]:
+        # Reads that promise every write up to a sequence value list the
+        # partitions anew: a partition exists before any write to it commits,
+        # so listing after reading the value finds every one it covers
+        if fresh or self.router.stale:
+            await self.router.refresh(self.database)
+        return self.router.route(query)
+    
+    async def _ensure_partition(self, decade: int):
+        if decade in self.router.decades:
+            return
+        await create_partition_indexes(self.database[partition_name(decade)])
+        self.router.add(decade)
+    
+    async def _locate(self, id: int) -> Optional[int]:
+        entry = await self.directory.find_one({"id": id}, **self._options)
+        return entry["decade"] if entry else None
+    
+    async def _record_locations(self, players: List[Dict[str, Any]]):
+        if players:
+            await self.directory.bulk_write([
+                UpdateOne({"id": player["id"]}, {"$set": {"decade": decade_of(player["Year"])}}, upsert=True)
+                for player in players
+            ], ordered=False, **self._options)
+    
+    def _read_session(self):
+        return nullcontext(self.session) if self.session is not None else mongodb.read_session()
+    
+    async def get(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        decade = await self._locate(id)
+        if decade is None:
+            return None
+        return await self._partition(decade).get(id)
+    
+    async def snapshot(self, limit: int, year: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        query = {"Year": year} if year is not None else {}
+        async with self._read_session() as session:
+            # Read the committed sequence first, so any write the list misses comes after it
+            seq = await current_change_seq(session)
+            players: List[Dict[str, Any]] = []
+            for decade in await self._route(query, fresh=True):
+                if len(players) >= limit:
+                    break
+                collection = self.read_database[partition_name(decade)]
+                players += await collection.find(query, session=session).to_list(limit - len(players))
+        return seq, players
+    
+    async def change_seq(self) -> int:
+        return await current_change_seq(self.session)
+    
+    async def changes_since(self, since: int, limit: int) -> Dict[str, Any]:
+        upserted: List[Dict[str, Any]] = []
+        async with self._read_session() as session:
+            seq = await current_change_seq(session)
+            if seq <= since:
+                return merge_changes([], [], since, limit)
+            query = changes_query(since, seq)
+            # Sessions can't be shared by concurrent operations, so partitions are read in turn
+            for decade in await self._route({}, fresh=True):
+                upserted += await self.read_database[partition_name(decade)].find(
+                    query, {"_id": 0}, session=session
+                ).sort("_seq", 1).to_list(limit)
+            deleted = await self.read_database[settings.TOMBSTONES_COLLECTION_NAME].find(
+                query, {"_id": 0}, session=session
+            ).sort("_seq", 1).to_list(limit)
+        upserted = sorted(upserted, key=lambda player: player["_seq"])[:limit]
+        return merge_changes(upserted, deleted, since, limit)
+    
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        query = query or {}
+        total = 0
+        for decade in await self._route(query):
+            key = self.cache.key(decade, "count", query)
+            sealed = is_sealed(decade)
+            hit, count = self.cache.get(key) if sealed else (False, None)
+            if not hit:
+                generation = self.cache.generation(decade)
+                count = await self._partition(decade).count(query)
+                if sealed:
+                    self.cache.put(key, count, generation)
+            total += count
+        return total
+    
+    async def find(
+        self,
+        query: Dict[str, Any],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 0,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        returned = 0
+        for decade in await self._route(query):
+            remaining = limit - returned if limit else 0
+            if limit and remaining <= 0:
+                return
+            
+            sealed = is_sealed(decade)
+            key = self.cache.key(decade, "find", query, fields, remaining)
+            hit, rows = self.cache.get(key) if sealed else (False, None)
+            if hit:
+                for row in rows:
+                    yield dict(row)
+                returned += len(rows)
+                continue
+            
+            # Cache results from sealed partitions, unless there are too many or
+            # the partition was written to while they were being read
+            generation = self.cache.generation(decade)
+            rows = [] if sealed else None
+            async for row in self._partition(decade).find(query, fields, batch_size, remaining):
+                if rows is not None:
+                    rows.append(dict(row))
+                    if len(rows) > settings.PARTITION_CACHE_MAX_ROWS:
+                        rows = None
+                returned += 1
+                yield row
+            if rows is not None:
+                self.cache.put(key, rows, generation)
+    
+    async def insert(self, player: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        decade = decade_of(player["Year"])
+        await self._ensure_partition(decade)
+        document = await self._partition(decade).insert(player)
+        if document is not None:
+            await self._record_locations([document])
+            self.cache.invalidate(decade)
+        return document
+    
+    async def insert_many(self, players: List[Dict[str, Any]]) -> bool:
+        by_decade: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for player in players:
+            by_decade[decade_of(player["Year"])].append(player)
+        
+        acknowledged = True
+        for decade, group in by_decade.items():
+            await self._ensure_partition(decade)
+            acknowledged = await self._partition(decade).insert_many(group) and acknowledged
+            self.cache.invalidate(decade)
+        await self._record_locations(players)
+        return acknowledged
+    
+    async def replace(self, id: int, player: Dict[str, Any], year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        old_decade = await self._locate(id)
+        if old_decade is None:
+            return None
+        decade = decade_of(player["Year"])
+        if decade == old_decade:
+            document = await self._partition(decade).replace(id, player)
+        else:
+            # The season moved to another decade: add it there, then remove the old copy
+            await self._ensure_partition(decade)
+            document = await self._partition(decade).insert(player)
+            if document is not None:
+                await self.database[partition_name(old_decade)].delete_one({"id": id}, **self._options)
+                await self._record_locations([document])
+        self.cache.invalidate(old_decade)
+        self.cache.invalidate(decade)
+        return document
+    
+    async def bulk_upsert(self, players: List[Dict[str, Any]]) -> BulkResult:
+        ids = [player["id"] for player in players]
+        locations = {
+            entry["id"]: entry["decade"]
+            async for entry in self.directory.find({"id": {"$in": ids}}, **self._options)
+        }
+        
+        by_decade: Dict[int, List[int]] = defaultdict(list)
+        for index, player in enumerate(players):
+            by_decade[decade_of(player["Year"])].append(index)
+        
+        inserted = updated = 0
+        write_errors: List[Dict[str, Any]] = []
+        written: List[Dict[str, Any]] = []
+        moved: Dict[int, List[int]] = defaultdict(list)
+        for decade, indexes in by_decade.items():
+            await self._ensure_partition(decade)
+            group = [players[index] for index in indexes]
+            group_inserted, group_updated, group_errors = await self._partition(decade).bulk_upsert(group)
+            inserted += group_inserted
+            updated += group_updated
+            failed = {error["index"] for error in group_errors}
+            write_errors += [dict(error, index=indexes[error["index"]]) for error in group_errors]
+            for offset, player in enumerate(group):
+                if offset in failed:
+                    continue
+                written.append(player)
+                old_decade = locations.get(player["id"])
+                if old_decade is not None and old_decade != decade:
+                    moved[old_decade].append(player["id"])
+            self.cache.invalidate(decade)
+        
+        # Players that moved decade were inserted into their new partition; remove the old copies
+        for old_decade, moved_ids in moved.items():
+            await self.database[partition_name(old_decade)].delete_many({"id": {"$in": moved_ids}}, **self._options)
+            self.cache.invalidate(old_decade)
+            inserted -= len(moved_ids)
+            updated += len(moved_ids)
+        
+        await self._record_locations(written)
+        write_errors.sort(key=lambda error: error["index"])
+        return inserted, updated, write_errors
+    
+    async def delete(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        decade = await self._locate(id)
+        if decade is None:
+            return None
+        tombstone = await self._partition(decade).delete(id)
+        await self.directory.delete_one({"id": id}, **self._options)
+        self.cache.invalidate(decade)
+        return tombstone
+    
+    async def set_description(self, id: int, description: str, year: Optional[int] = None):
+        decade = await self._locate(id)
+        if decade is not None:
+            await self._partition(decade).set_description(id, description)
+            self.cache.invalidate(decade)
+
+
+async def create_partition_indexes(collection):
+    """
+    Create the indexes a partition collection needs.
+    """
+    await collection.create_index("id", unique=True)
+    await collection.create_index("_seq")
+    await collection.create_index("Year")
+
+
+async def ensure_partition_indexes():
+    """
+    Create the directory index and the indexes of every existing partition,
+    and stamp partitioned players that have no change sequence value yet.
+    """
+    database = mongodb.db
+    await database[settings.PARTITION_DIRECTORY_COLLECTION_NAME].create_index("id", unique=True)
+    await partition_router.refresh(database)
+    for decade in partition_router.decades:
+        await create_partition_indexes(database[partition_name(decade)])
+        await stamp_unsequenced_players(database[partition_name(decade)])
+
+
+async def run_partition_compaction(params: Dict[str, Any], report) -> Dict[str, Any]:
+    """
+    Job handler compacting the collections of sealed partitions.
+    """
+    if settings.PLAYER_REPOSITORY != "partitioned":
+        return {"message": "Player storage is not partitioned", "compacted": []}
+    
+    database = mongodb.db
+    await partition_router.refresh(database)
+    sealed = [decade for decade in sorted(partition_router.decades) if is_sealed(decade)]
+    await report(0, len(sealed))
+    for done, decade in enumerate(sealed, start=1):
+        await database.command("compact", partition_name(decade))
+        await report(done, len(sealed))
+    return {"compacted": [partition_name(decade) for decade in sealed]}
+
+
+# Partition list and sealed partition cache, shared by the worker's requests
+partition_router = PartitionRouter(refresh_interval=settings.PARTITION_REFRESH_INTERVAL)
+partition_cache = SealedPartitionCache(settings.PARTITION_CACHE_SIZE, settings.PARTITION_CACHE_TTL)
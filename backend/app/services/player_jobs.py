@@ -0,0 +1,168 @@
+"""
+Player data jobs for the Baseball Stats Dashboard.
+
+This module implements the long-running player data operations that are run
+by the background job runner:
+- Ingesting player data from the external baseball API
+- Backfilling AI-generated descriptions for players that do not have one
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.http_client import CircuitOpenError, get_with_retries
+from app.models.job import JobType
+from app.services.events import get_event_bus, publishes_locally
+from app.services.partitions import run_partition_compaction
+from app.services.query_cache import invalidate_queries
+from app.services.repository import PlayerRepository, create_player_repository
+from app.services.validation import error_report, source_documents_adapter, validate_players_json
+
+
+class IngestError(Exception):
+    """
+    Raised when player data cannot be fetched or is not in the expected format
+    """
+
+
+async def _no_progress(done: int, total: Optional[int] = None):
+    pass
+
+
+async def _no_errors(errors: List[Dict[str, Any]]):
+    pass
+
+
+async def ingest_players(repository: PlayerRepository, on_progress=_no_progress, on_errors=_no_errors) -> int:
+    """
+    Fetch player data from the external API and insert it into the database.
+    
+    The response is validated into player documents in one pass, off the
+    event loop. Invalid players are skipped and reported through
+    ``on_errors``; the rest are inserted in batches of INGEST_BATCH_SIZE,
+    reporting progress after each batch.
+    
+    Args:
+        repository: The player repository to insert into.
+        on_progress: Async callback receiving (done, total) player counts.
+        on_errors: Async callback receiving the error report of the skipped players, if any.
+    
+    Returns:
+        int: The number of players inserted.
+    
+    Raises:
+        IngestError: If the data cannot be fetched, is malformed or cannot be inserted.
+    """
+    import httpx
+    
+    try:
+        response = await get_with_retries(settings.BASEBALL_API_URL)
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        raise IngestError(f"Error fetching data: {str(e)}")
+    
+    try:
+        players_data, errors = await asyncio.to_thread(validate_players_json, response.content, source_documents_adapter)
+    except ValueError:
+        raise IngestError("Invalid data format received from API")
+    if errors:
+        await on_errors(error_report(errors))
+    if len(players_data) == 0:
+        raise IngestError("Invalid data format received from API")
+    
+    # Calculate missing ranks if needed
+    for player in players_data:
+        if not player.get("Rank"):
+            # Simple ranking based on hits (higher hits = better rank)
+            player["Rank"] = str(player["Hits"])
+    
+    total = len(players_data)
+    await on_progress(0, total)
+    for start in range(0, total, settings.INGEST_BATCH_SIZE):
+        batch = players_data[start:start + settings.INGEST_BATCH_SIZE]
+        if not await repository.insert_many(batch):
+            raise IngestError("Failed to insert players")
+        await on_progress(start + len(batch), total)
+    
+    await invalidate_queries()
+    if publishes_locally():
+        get_event_bus().publish_resync()
+    
+    return total
+
+
+async def run_ingest(params: Dict[str, Any], report) -> Dict[str, Any]:
+    """
+    Job handler loading player data, if the collection is empty.
+    """
+    repository = create_player_repository()
+    count = await repository.count()
+    if count > 0:
+        return {"message": f"Collection already contains {count} players", "loaded": 0}
+    
+    skipped: List[Dict[str, Any]] = []
+    
+    async def collect(errors: List[Dict[str, Any]]):
+        skipped.extend(errors)
+    
+    loaded = await ingest_players(repository, report, collect)
+    return {
+        "message": f"Successfully loaded {loaded} players",
+        "loaded": loaded,
+        "failed": len(skipped),
+        "errors": skipped[:settings.MAX_IMPORT_ERRORS],
+    }
+
+
+async def run_description_backfill(params: Dict[str, Any], report) -> Dict[str, Any]:
+    """
+    Job handler generating descriptions for players that do not have one.
+    
+    Params:
+        limit: Maximum number of players to describe (optional).
+    """
+    from app.api.routes.players import generate_player_description
+    
+    repository = create_player_repository()
+    query = {"description": {"$exists": False}}
+    limit = params.get("limit") or 0
+    
+    total = await repository.count(query)
+    if limit:
+        total = min(total, limit)
+    await report(0, total)
+    
+    semaphore = asyncio.Semaphore(settings.BACKFILL_CONCURRENCY)
+    described = 0
+    failed = 0
+    
+    async def describe(player: Dict[str, Any]):
+        nonlocal described, failed
+        async with semaphore:
+            try:
+                description = await generate_player_description(player, fallback=False)
+            except Exception:
+                failed += 1
+                return
+            await repository.set_description(player["id"], description, year=player.get("Year"))
+            described += 1
+    
+    batch = []
+    async for player in repository.find(query, limit=limit):
+        batch.append(player)
+        if len(batch) == settings.BACKFILL_CONCURRENCY * 4:
+            await asyncio.gather(*(describe(p) for p in batch))
+            batch = []
+            await report(described + failed, total)
+    await asyncio.gather(*(describe(p) for p in batch))
+    await report(described + failed, total)
+    
+    return {"described": described, "failed": failed}
+
+
+JOB_HANDLERS = {
+    JobType.INGEST.value: run_ingest,
+    JobType.DESCRIPTION_BACKFILL.value: run_description_backfill,
+    JobType.PARTITION_COMPACTION.value: run_partition_compaction,
+}
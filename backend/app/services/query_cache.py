@@ -0,0 +1,231 @@
+"""
+Query result cache for the Baseball Stats Dashboard.
+
+Dashboard views request the same player queries over and over between
+edits. This module keeps the serialized response of each query in memory,
+keyed by the endpoint and its normalized parameters, so repeated requests
+are answered without touching the database or serializing again.
+
+Entries are tied to a write version of the player collection. Every player
+write made through this process bumps the version (as do writes reported by
+the change stream, with EVENT_SOURCE=change_stream), which drops every cached
+entry at once. Entries also record the committed change sequence value they
+were computed at, and a lookup made at a later value misses, so writes made
+by any other worker are seen on the next request whatever the EVENT_SOURCE;
+QUERY_CACHE_TTL only bounds how long an entry is kept. Cached lists carry the
+change sequence value they were read at, so clients that sync through
+``GET /api/players/changes`` catch up either way.
+
+The cache is bounded by the total size of the cached responses and evicts
+the least recently used entries first. With the shared cache tier enabled
+(REDIS_URL), it acts as the near-cache in front of it: misses are looked up
+in Redis before being computed, and writes bump the shared write version so
+every pod drops its entries, whatever the EVENT_SOURCE.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.services.shared_cache import get_shared_cache
+from app.services.static_views import get_static_views
+
+# Approximate bookkeeping overhead of an entry, in bytes
+ENTRY_OVERHEAD = 200
+
+
+class CachedResponse(NamedTuple):
+    """
+    A serialized response body and its headers.
+    """
+    body: bytes
+    headers: Dict[str, str]
+    expires_at: float
+    size: int
+    seq: int = 0
+
+
+class QueryCache:
+    """
+    Size-bounded least-recently-used cache of serialized query responses.
+    
+    Args:
+        max_bytes: Total size of cached entries to keep; 0 disables caching.
+        ttl: Seconds an entry may be served for.
+        clock: Monotonic time source, replaceable in tests.
+    """
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(name: str, **params: Any) -> str:
+        """
+        Build a cache key from an endpoint name and its parameters.
+        
+        Parameters that are None are left out and the rest are sorted, so
+        equivalent requests share an entry.
+        """
+        params = {param: value for param, value in params.items() if value is not None}
+        return json.dumps([name, params], sort_keys=True, separators=(",", ":"), default=str)
+    
+    def get(self, key: str, seq: int = 0) -> Optional[CachedResponse]:
+        """
+        Get a cached response, or None on a miss.
+        
+        Args:
+            key: The cache key.
+            seq: The current committed change sequence value; entries computed
+                before it are out of date.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and (self._clock() >= entry.expires_at or entry.seq < seq):
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key: str, body: bytes, headers: Dict[str, str], version: int, seq: int = 0) -> CachedResponse:
+        """
+        Cache a response computed while the write version was ``version`` and
+        the committed change sequence value was ``seq``.
+        
+        Responses computed across a write, and responses larger than a
+        quarter of the cache, are returned without being cached.
+        
+        Returns:
+            CachedResponse: The response, for the caller to send.
+        """
+        size = len(body) + len(key) + sum(len(k) + len(v) for k, v in headers.items()) + ENTRY_OVERHEAD
+        entry = CachedResponse(body, headers, self._clock() + self.ttl, size, seq)
+        if version != self.version or size > self.max_bytes // 4:
+            return entry
+        
+        self._remove(key)
+        self._entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+    
+    def invalidate(self):
+        """
+        Bump the write version, dropping every cached response.
+        """
+        self.version += 1
+        self._entries.clear()
+        self.bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache usage for monitoring.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "version": self.version,
+        }
+
+
+# Query cache instance, one per worker process
+query_cache = QueryCache(settings.QUERY_CACHE_MAX_BYTES, settings.QUERY_CACHE_TTL)
+
+
+def get_query_cache() -> QueryCache:
+    """
+    Get the query cache
+    """
+    return query_cache
+
+
+async def cached_query(
+    name: str,
+    compute: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+    seq: int = 0,
+    **params: Any,
+) -> CachedResponse:
+    """
+    Get a query's serialized response from the cache tiers, computing it on a miss.
+    
+    Args:
+        name: The endpoint name.
+        compute: Coroutine function running the query and returning the
+            serialized body and its headers.
+        seq: The committed change sequence value, read before the lookup
+            (e.g. from ``PlayerRepository.change_seq``); responses cached
+            before a later value are recomputed.
+        params: The query parameters.
+    
+    Example:
+        ```
+        seq = await repository.change_seq()
+        cached = await cached_query("players", list_players, seq=seq, limit=1000)
+        return Response(content=cached.body, headers=cached.headers)
+        ```
+    """
+    cache = get_query_cache()
+    key = cache.key(name, **params)
+    cached = cache.get(key, seq)
+    if cached is not None:
+        return cached
+    
+    version = cache.version
+    shared = get_shared_cache()
+    if shared is None:
+        body, headers = await compute()
+    else:
+        async def compute_payload() -> bytes:
+            body, headers = await compute()
+            return json.dumps(headers).encode() + b"\n" + body
+        
+        # Shared entries are keyed by the sequence value too, so a pod never
+        # picks up a response another pod computed before a write
+        shared_key = shared.query_key(cache.key(name, seq=seq, **params))
+        payload = await shared.get_or_compute(shared_key, compute_payload, settings.SHARED_CACHE_TTL)
+        encoded_headers, body = payload.split(b"\n", 1)
+        headers = json.loads(encoded_headers)
+    return cache.put(key, body, headers, version, seq)
+
+
+async def invalidate_queries():
+    """
+    Drop cached query results after a player write, in this process and, with
+    the shared cache tier, in every pod, and re-render the static views.
+    """
+    get_query_cache().invalidate()
+    views = get_static_views()
+    if views is not None:
+        views.wake()
+    shared = get_shared_cache()
+    if shared is not None:
+        try:
+            await shared.bump_version()
+        except Exception:
+            # Other pods still see the write through the change sequence value
+            shared.record_error()
@@ -0,0 +1,507 @@
+"""
+Player repository for the Baseball Stats Dashboard.
+
+This module defines the storage interface the API uses for player data, so
+routes and jobs do not depend on MongoDB directly. Routes receive a
+repository per request through the ``get_player_repository`` dependency.
+
+The MongoDB repository is the default. It stamps every write with a change
+sequence value and leaves tombstones for deleted players (see
+``app.services.changes``), and can run all of a request's operations in one
+causally consistent session. Lookups and writes by ID take the player's
+season when it is known, so a collection sharded on (Year, id) can route
+them to a single shard (see ``app.db.sharding``). The in-memory repository keeps players in a
+dict, local to the worker process, for load tests and benchmarks that should
+not be limited by a database.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.db import mongodb
+from app.db.sharding import player_filter, shard_key_includes_year
+from app.services.changes import (
+    Reservation,
+    current_change_seq,
+    get_changes_since,
+    merge_changes,
+    record_deletion,
+    reserved_change_seq,
+)
+
+# Bulk write results: (inserted, updated, [{"index": ..., "message": ...}])
+BulkResult = Tuple[int, int, List[Dict[str, Any]]]
+
+
+class PlayerRepository(ABC):
+    """
+    Interface for player storage backends.
+    
+    Documents returned by a repository may carry internal fields (``_id``,
+    ``_seq``, ``_resume_seq``); responses filter them out through their
+    response models.
+    """
+    @abstractmethod
+    async def get(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a player by ID, or None if there is no such player.
+        
+        Args:
+            id: The player ID.
+            year: The player's season, if known, to route the lookup to one
+                shard. On a collection sharded on (Year, id), a wrong season
+                misses the player.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def snapshot(self, limit: int, year: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Get up to ``limit`` players, only from one season if ``year`` is given,
+        and the change sequence value they are current as of.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def change_seq(self) -> int:
+        """
+        Get the committed change sequence value, which moves with every player
+        write made by any worker.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def changes_since(self, since: int, limit: int) -> Dict[str, Any]:
+        """
+        Get the players changed and deleted after a change sequence value.
+        
+        See ``app.services.changes.get_changes_since`` for the result format.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Count the players matching a MongoDB-style filter.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    def find(
+        self,
+        query: Dict[str, Any],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 0,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over the players matching a MongoDB-style filter, in ID order.
+        
+        Args:
+            query: The filter, e.g. from ``build_player_filter``.
+            fields: Only return these fields (all fields if omitted).
+            batch_size: How many players to fetch from storage at a time.
+            limit: The maximum number of players to return (0 for no limit).
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def insert(self, player: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Insert a new player, stamped with the next change sequence value.
+        
+        Returns:
+            The stored document, or None if the write was not acknowledged.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def insert_many(self, players: List[Dict[str, Any]]) -> bool:
+        """
+        Insert new players, each stamped with its own change sequence value.
+        
+        Returns:
+            bool: Whether the write was acknowledged.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def replace(self, id: int, player: Dict[str, Any], year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Replace a player, dropping its cached description.
+        
+        Args:
+            id: The player ID.
+            player: The new player document.
+            year: The stored player's season, if known (see ``get``).
+        
+        Returns:
+            The stored document, or None if no player was modified.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def bulk_upsert(self, players: List[Dict[str, Any]]) -> BulkResult:
+        """
+        Insert or replace players by ID, continuing past failed writes.
+        
+        Returns:
+            The number of players inserted, the number replaced, and the write
+            errors, where ``index`` is the position in ``players``.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def delete(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Delete a player, leaving a tombstone.
+        
+        Args:
+            id: The player ID.
+            year: The player's season, if known (see ``get``).
+        
+        Returns:
+            The tombstone (``id``, ``_seq`` and ``_resume_seq``), or None if there was no such player.
+        """
+        raise NotImplementedError
+    
+    @abstractmethod
+    async def set_description(self, id: int, description: str, year: Optional[int] = None):
+        """
+        Cache a generated description on a player, given its season if known (see ``get``).
+        """
+        raise NotImplementedError
+
+
+class MotorPlayerRepository(PlayerRepository):
+    """
+    Repository storing players in MongoDB through Motor.
+    
+    Reads that may be served by secondaries (lists, changes, exports) use the
+    read handles; everything else uses the primary.
+    """
+    def __init__(self, collection=None, read_collection=None, session=None):
+        self.collection = collection if collection is not None else mongodb.get_collection()
+        self.read_collection = read_collection if read_collection is not None else mongodb.get_read_collection()
+        self.session = session
+        # Only pass a session when there is one, so calls match the plain driver API
+        self._options = {"session": session} if session is not None else {}
+    
+    async def _write_filter(self, id: int, year: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        Build the filter for a single-player write, or None if there is no such player.
+        
+        Single-document writes to a sharded collection must include the whole
+        shard key, so a season that is not known is looked up first.
+        """
+        if year is None and shard_key_includes_year():
+            current = await self.collection.find_one({"id": id}, {"Year": 1}, **self._options)
+            if current is None:
+                return None
+            year = current["Year"]
+        return player_filter(id, year)
+    
+    async def get(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one(player_filter(id, year), **self._options)
+    
+    async def snapshot(self, limit: int, year: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        if self.session is not None:
+            return await self._snapshot(limit, year, self.session)
+        async with mongodb.read_session() as session:
+            return await self._snapshot(limit, year, session)
+    
+    async def _snapshot(self, limit: int, year: Optional[int], session) -> Tuple[int, List[Dict[str, Any]]]:
+        # Read the committed sequence first: every write up to it has finished,
+        # so the list includes it, and any write the list misses comes after it
+        seq = await current_change_seq(session)
+        query = {"Year": year} if year is not None else {}
+        players = await self.read_collection.find(query, session=session).to_list(limit)
+        return seq, players
+    
+    async def change_seq(self) -> int:
+        return await current_change_seq(self.session)
+    
+    async def changes_since(self, since: int, limit: int) -> Dict[str, Any]:
+        return await get_changes_since(since, limit, self.session)
+    
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return await self.collection.count_documents(query or {}, **self._options)
+    
+    def find(
+        self,
+        query: Dict[str, Any],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 0,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        projection = {"_id": 0}
+        if fields is not None:
+            projection = {field: 1 for field in fields}
+            projection["_id"] = 0
+        cursor = self.read_collection.find(query, projection, **self._options).sort("id", 1)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+    
+    async def insert(self, player: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        document = dict(player)
+        async with reserved_change_seq() as reservation:
+            _stamp([document], reservation)
+            result = await self.collection.insert_one(document, **self._options)
+        return document if result.acknowledged else None
+    
+    async def insert_many(self, players: List[Dict[str, Any]]) -> bool:
+        async with reserved_change_seq(len(players)) as reservation:
+            _stamp(players, reservation)
+            result = await self.collection.insert_many(players, **self._options)
+        return result.acknowledged
+    
+    async def replace(self, id: int, player: Dict[str, Any], year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        query = await self._write_filter(id, year)
+        if query is None:
+            return None
+        document = dict(player)
+        async with reserved_change_seq() as reservation:
+            _stamp([document], reservation)
+            result = await self.collection.replace_one(query, document, **self._options)
+        return document if result.modified_count else None
+    
+    async def bulk_upsert(self, players: List[Dict[str, Any]]) -> BulkResult:
+        # Replace each player in the season it is stored under, which may
+        # differ from the new one, so its filter has the whole shard key
+        years: Dict[int, int] = {}
+        if shard_key_includes_year():
+            ids = [player["id"] for player in players]
+            years = {
+                document["id"]: document["Year"]
+                async for document in self.collection.find({"id": {"$in": ids}}, {"id": 1, "Year": 1}, **self._options)
+            }
+        async with reserved_change_seq(len(players)) as reservation:
+            _stamp(players, reservation)
+            requests = [
+                ReplaceOne(player_filter(player["id"], years.get(player["id"], player.get("Year"))), player, upsert=True)
+                for player in players
+            ]
+            try:
+                result = await self.collection.bulk_write(requests, ordered=False, **self._options)
+                return result.upserted_count, result.modified_count, []
+            except BulkWriteError as e:
+                details = e.details
+                write_errors = [
+                    {"index": error["index"], "message": error.get("errmsg", "Write failed")}
+                    for error in details.get("writeErrors", [])
+                ]
+                return details.get("nUpserted", 0), details.get("nModified", 0), write_errors
+    
+    async def delete(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        query = await self._write_filter(id, year)
+        if query is None:
+            return None
+        async with reserved_change_seq() as reservation:
+            result = await self.collection.delete_one(query, **self._options)
+            if result.deleted_count == 0:
+                return None
+            tombstone = {"id": id, "_seq": reservation.last, "_resume_seq": reservation.resume_seq}
+            await record_deletion(tombstone)
+        return tombstone
+    
+    async def set_description(self, id: int, description: str, year: Optional[int] = None):
+        query = await self._write_filter(id, year)
+        if query is not None:
+            await self.collection.update_one(query, {"$set": {"description": description}}, **self._options)
+
+
+class InMemoryPlayerRepository(PlayerRepository):
+    """
+    Repository holding players in a dict, local to the worker process.
+    
+    Supports the subset of MongoDB filters built by the API (equality,
+    ``$gt``, ``$gte``, ``$lt``, ``$lte`` and ``$exists``).
+    """
+    def __init__(self, players: Optional[List[Dict[str, Any]]] = None):
+        self._players: Dict[int, Dict[str, Any]] = {}
+        self._tombstones: Dict[int, int] = {}
+        self._seq = 0
+        if players:
+            for player in players:
+                self._players[player["id"]] = dict(player, _seq=self._next_seq())
+    
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+    
+    def _reserve(self, count: int = 1) -> Reservation:
+        # Writes finish in the order they are made, so every earlier value is committed
+        first = self._seq + 1
+        self._seq += count
+        return Reservation(first, self._seq, first - 1)
+    
+    async def get(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        player = self._players.get(id)
+        return dict(player) if player is not None else None
+    
+    async def snapshot(self, limit: int, year: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        matches = (player for player in self._players.values() if year is None or player["Year"] == year)
+        players = [dict(player) for _, player in zip(range(limit), matches)]
+        return self._seq, players
+    
+    async def change_seq(self) -> int:
+        return self._seq
+    
+    async def changes_since(self, since: int, limit: int) -> Dict[str, Any]:
+        upserted = sorted(
+            (dict(player) for player in self._players.values() if player["_seq"] > since),
+            key=lambda player: player["_seq"],
+        )[:limit]
+        deleted = sorted(
+            ({"id": id, "_seq": seq} for id, seq in self._tombstones.items() if seq > since),
+            key=lambda tombstone: tombstone["_seq"],
+        )[:limit]
+        return merge_changes(upserted, deleted, since, limit)
+    
+    async def count(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return sum(1 for player in self._players.values() if _matches(player, query or {}))
+    
+    async def find(
+        self,
+        query: Dict[str, Any],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 0,
+        limit: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        matches = sorted(
+            (player for player in self._players.values() if _matches(player, query)),
+            key=lambda player: player["id"],
+        )
+        for player in matches[:limit or None]:
+            if fields is not None:
+                yield {field: player[field] for field in fields if field in player}
+            else:
+                yield dict(player)
+    
+    async def insert(self, player: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        document = dict(player)
+        _stamp([document], self._reserve())
+        self._players[document["id"]] = document
+        return dict(document)
+    
+    async def insert_many(self, players: List[Dict[str, Any]]) -> bool:
+        _stamp(players, self._reserve(len(players)))
+        for player in players:
+            self._players[player["id"]] = dict(player)
+        return True
+    
+    async def replace(self, id: int, player: Dict[str, Any], year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if id not in self._players:
+            return None
+        document = dict(player)
+        _stamp([document], self._reserve())
+        self._players[id] = document
+        return dict(document)
+    
+    async def bulk_upsert(self, players: List[Dict[str, Any]]) -> BulkResult:
+        inserted = 0
+        _stamp(players, self._reserve(len(players)))
+        for player in players:
+            inserted += player["id"] not in self._players
+            self._players[player["id"]] = dict(player)
+        return inserted, len(players) - inserted, []
+    
+    async def delete(self, id: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if self._players.pop(id, None) is None:
+            return None
+        reservation = self._reserve()
+        self._tombstones[id] = reservation.last
+        return {"id": id, "_seq": reservation.last, "_resume_seq": reservation.resume_seq}
+    
+    async def set_description(self, id: int, description: str, year: Optional[int] = None):
+        if id in self._players:
+            self._players[id]["description"] = description
+
+
+def _stamp(players: List[Dict[str, Any]], reservation: Reservation):
+    """
+    Stamp each player with its own value from a reserved block of change
+    sequence values, and the value to resume from after it.
+    """
+    for offset, player in enumerate(players):
+        player["_seq"] = reservation.first + offset
+        player["_resume_seq"] = reservation.resume_seq
+
+
+def _matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$exists":
+                if (field in document) != operand:
+                    return False
+            elif operator == "$in":
+                if value not in operand:
+                    return False
+            elif value is None:
+                return False
+            elif operator == "$gt" and not value > operand:
+                return False
+            elif operator == "$gte" and not value >= operand:
+                return False
+            elif operator == "$lt" and not value < operand:
+                return False
+            elif operator == "$lte" and not value <= operand:
+                return False
+            elif operator not in ("$in", "$gt", "$gte", "$lt", "$lte"):
+                raise ValueError(f"Unsupported filter operator: {operator}")
+    return True
+
+
+# Shared in-memory repository, created on first use
+memory_repository: Optional[InMemoryPlayerRepository] = None
+
+
+def create_player_repository(session=None) -> PlayerRepository:
+    """
+    Create a repository for the backend selected by the PLAYER_REPOSITORY setting.
+    
+    Args:
+        session: The MongoDB session to run operations in (optional).
+    
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    global memory_repository
+    if settings.PLAYER_REPOSITORY == "memory":
+        if memory_repository is None:
+            memory_repository = InMemoryPlayerRepository()
+        return memory_repository
+    if settings.PLAYER_REPOSITORY == "mongo":
+        return MotorPlayerRepository(session=session)
+    if settings.PLAYER_REPOSITORY == "partitioned":
+        from app.services.partitions import PartitionedPlayerRepository
+        return PartitionedPlayerRepository(session=session)
+    raise ValueError(f"Unknown player repository: {settings.PLAYER_REPOSITORY}")
+
+
+async def get_player_repository() -> AsyncIterator[PlayerRepository]:
+    """
+    FastAPI dependency providing the player repository for a request.
+    
+    With MONGO_CAUSAL_SESSIONS enabled, each request's operations run in one
+    causally consistent session, so a request reads its own writes even when
+    its reads are served by secondaries.
+    """
+    if settings.PLAYER_REPOSITORY in ("mongo", "partitioned") and settings.MONGO_CAUSAL_SESSIONS:
+        async with mongodb.read_session() as session:
+            yield create_player_repository(session)
+    else:
+        yield create_player_repository()
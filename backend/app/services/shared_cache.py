@@ -0,0 +1,339 @@
+"""
+Shared cache tier for the Baseball Stats Dashboard.
+
+With several backend replicas, a cache local to each process starts cold on
+every new pod and holds a copy per pod. When REDIS_URL is set, cached query
+results and generated descriptions are also kept in Redis (or any server
+speaking its protocol), so a new pod is served from what the others already
+computed.
+
+- A small in-process near-cache sits in front of Redis for the hottest keys.
+- Query results are keyed by a shared player write version. A write
+  increments it and announces the new version over pub/sub, so every pod
+  drops its local cached results at once and stops using the old entries,
+  which then expire in Redis.
+- A miss is computed by one caller at a time across all pods: the first takes
+  a short-lived lock and the others wait for its result, so a popular entry
+  expiring (or an undescribed player being requested everywhere at once)
+  does not set off a stampede of identical database queries or OpenAI calls.
+- Redis calls time out quickly (SHARED_CACHE_SOCKET_TIMEOUT), and after an
+  error the shared tier is skipped for SHARED_CACHE_RETRY_AFTER seconds, so
+  an unreachable or slow Redis costs at most one short wait every so often
+  instead of holding up every request and write.
+
+Without REDIS_URL the shared tier is disabled and callers use only their
+in-process caches.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Seconds the subscription waits for an announcement before waiting again
+LISTEN_POLL_INTERVAL = 1.0
+
+
+class SharedCache:
+    """
+    Redis-backed cache with a near-cache, pub/sub invalidation and stampede protection.
+    
+    Args:
+        redis: A ``redis.asyncio`` client (or compatible, e.g. fakeredis).
+        prefix: Prefix of every key this cache uses.
+        near_size: Maximum number of entries kept in the near-cache.
+        near_ttl: Seconds a near-cache entry may be served for.
+        lock_timeout: Seconds a miss may be computed for before others stop waiting.
+        retry_after: Seconds to skip Redis for after an error.
+    """
+    def __init__(self, redis, prefix: str = "bsd:", near_size: int = 1024, near_ttl: float = 5,
+                 lock_timeout: float = 10, retry_after: float = 5, clock: Callable[[], float] = time.monotonic):
+        self.redis = redis
+        self.prefix = prefix
+        self.near_size = near_size
+        self.near_ttl = near_ttl
+        self.lock_timeout = lock_timeout
+        self.retry_after = retry_after
+        self.channel = f"{prefix}invalidate"
+        self.version = 0
+        self._clock = clock
+        self._near: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._listeners: List[Callable[[], Any]] = []
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.computed = 0
+        self.errors = 0
+        self.skipped = 0
+        self._down_until = 0.0
+    
+    def key(self, *parts: Any) -> str:
+        """
+        Build a key in this cache's namespace.
+        """
+        return self.prefix + ":".join(str(part) for part in parts)
+    
+    def query_key(self, key: str) -> str:
+        """
+        Build the key of a query result at the current write version.
+        """
+        return self.key("query", self.version, key)
+    
+    @property
+    def available(self) -> bool:
+        """
+        Whether Redis is being used, i.e. no error happened in the last ``retry_after`` seconds.
+        """
+        return self._clock() >= self._down_until
+    
+    def record_error(self):
+        """
+        Count a Redis error and skip Redis for the next ``retry_after`` seconds.
+        """
+        self.errors += 1
+        self._down_until = self._clock() + self.retry_after
+    
+    def on_invalidate(self, listener: Callable[[], Any]):
+        """
+        Register a callback run when another pod (or this one) bumps the write version.
+        """
+        self._listeners.append(listener)
+    
+    def _near_get(self, key: str) -> Optional[bytes]:
+        entry = self._near.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if self._clock() >= expires_at:
+            del self._near[key]
+            return None
+        self._near.move_to_end(key)
+        return value
+    
+    def _near_put(self, key: str, value: bytes):
+        self._near[key] = (self._clock() + self.near_ttl, value)
+        self._near.move_to_end(key)
+        while len(self._near) > self.near_size:
+            self._near.popitem(last=False)
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a value from the near-cache or Redis, or None on a miss.
+        """
+        value = self._near_get(key)
+        if value is not None:
+            self.near_hits += 1
+            return value
+        value = await self.redis.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._near_put(key, value)
+        return value
+    
+    async def set(self, key: str, value: bytes, ttl: float):
+        """
+        Store a value in Redis and the near-cache.
+        """
+        await self.redis.set(key, value, px=int(ttl * 1000))
+        self._near_put(key, value)
+    
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[bytes]], ttl: float) -> bytes:
+        """
+        Get a value, computing and storing it on a miss.
+        
+        Only the caller holding the key's lock computes it; others poll for
+        its result, and compute it themselves if it has not appeared once the
+        lock times out. If Redis cannot be reached, or failed recently, the
+        value is computed without the shared tier.
+        
+        Args:
+            key: The cache key.
+            compute: Coroutine function producing the value.
+            ttl: Seconds to keep the value in Redis.
+        """
+        if not self.available:
+            self.skipped += 1
+            return await compute()
+        lock = f"{key}:lock"
+        token = None
+        try:
+            value = await self.get(key)
+            if value is None:
+                token, value = await self._lock(key, lock)
+        except Exception:
+            self.record_error()
+            return await compute()
+        if value is not None:
+            return value
+        
+        try:
+            value = await compute()
+            self.computed += 1
+            try:
+                await self.set(key, value, ttl)
+            except Exception:
+                self.record_error()
+            return value
+        finally:
+            await self._unlock(lock, token)
+    
+    async def _lock(self, key: str, lock: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """
+        Wait until this caller holds a key's lock, or its value appears.
+        
+        Returns:
+            Tuple: The lock token (None if the wait timed out) and the value, if it appeared.
+        """
+        token = uuid.uuid4().hex
+        deadline = self._clock() + self.lock_timeout
+        while not await self.redis.set(lock, token, nx=True, px=int(self.lock_timeout * 1000)):
+            await asyncio.sleep(settings.SHARED_CACHE_LOCK_POLL_INTERVAL)
+            value = await self.get(key)
+            if value is not None:
+                return None, value
+            if self._clock() >= deadline:
+                return None, None
+        return token, None
+    
+    async def _unlock(self, lock: str, token: Optional[str]):
+        if token is None:
+            return
+        try:
+            # Leave the lock alone if it expired and another caller took it
+            if await self.redis.get(lock) == token.encode():
+                await self.redis.delete(lock)
+        except Exception:
+            self.record_error()
+    
+    async def sync_version(self):
+        """
+        Load the current write version from Redis.
+        """
+        version = int(await self.redis.get(self.key("version")) or 0)
+        self._apply_version(version)
+    
+    async def bump_version(self):
+        """
+        Increment the shared write version and tell every pod about it.
+        
+        Skipped while Redis is down; other pods' entries then expire after
+        SHARED_CACHE_TTL, and query results are keyed by the change sequence
+        value anyway.
+        
+        Raises:
+            Exception: If Redis cannot be reached.
+        """
+        if not self.available:
+            self.skipped += 1
+            return
+        version = await self.redis.incr(self.key("version"))
+        self._apply_version(version)
+        await self.redis.publish(self.channel, json.dumps({"version": version}))
+    
+    def _apply_version(self, version: int):
+        if version <= self.version:
+            return
+        self.version = version
+        self._near.clear()
+        for listener in self._listeners:
+            listener()
+    
+    async def listen(self):
+        """
+        Follow version announcements from other pods, resubscribing after errors.
+        """
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                # Catch up on any announcement missed while not subscribed
+                await self.sync_version()
+                while True:
+                    # Wait with an explicit timeout, as the client's short
+                    # socket timeout would otherwise break an idle subscription
+                    message = await pubsub.get_message(timeout=LISTEN_POLL_INTERVAL)
+                    if message is not None and message["type"] == "message":
+                        self._apply_version(json.loads(message["data"])["version"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Shared cache subscription error: {e}")
+                await asyncio.sleep(1)
+    
+    def stats(self) -> dict:
+        """
+        Get cache usage for monitoring.
+        """
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "near_entries": len(self._near),
+            "near_hits": self.near_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            "computed": self.computed,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "available": self.available,
+            "version": self.version,
+        }
+
+
+# Shared cache, when REDIS_URL is set, and its subscription task
+shared_cache: Optional[SharedCache] = None
+_listener_task: Optional[asyncio.Task] = None
+
+
+async def start_shared_cache():
+    """
+    Connect to Redis and follow invalidations, if a shared cache is configured
+    """
+    global shared_cache, _listener_task
+    if not settings.REDIS_URL:
+        return
+    import redis.asyncio as redis
+    from app.services.query_cache import get_query_cache
+    
+    shared_cache = SharedCache(
+        redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.SHARED_CACHE_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.SHARED_CACHE_CONNECT_TIMEOUT,
+        ),
+        prefix=settings.SHARED_CACHE_PREFIX,
+        near_size=settings.NEAR_CACHE_SIZE,
+        near_ttl=settings.NEAR_CACHE_TTL,
+        lock_timeout=settings.SHARED_CACHE_LOCK_TIMEOUT,
+        retry_after=settings.SHARED_CACHE_RETRY_AFTER,
+    )
+    shared_cache.on_invalidate(get_query_cache().invalidate)
+    # The listener loads the current write version once subscribed, and
+    # keeps retrying if Redis is not reachable yet
+    _listener_task = asyncio.create_task(shared_cache.listen())
+
+
+async def stop_shared_cache():
+    """
+    Stop following invalidations and close the Redis connection
+    """
+    global shared_cache, _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        _listener_task = None
+    if shared_cache is not None:
+        await shared_cache.redis.aclose()
+        shared_cache = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """
+    Get the shared cache, or None if it is disabled
+    """
+    return shared_cache
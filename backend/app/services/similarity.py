@@ -0,0 +1,635 @@
+"""
+Player similarity search for the Baseball Stats Dashboard.
+
+This module finds the player-seasons most statistically similar to a given
+one. Each player-season is reduced to a feature vector (hits, age, season,
+at-bats and rank), standardized so that every feature counts equally, and
+kept in NumPy arrays in each worker process.
+
+Rows are grouped into the cells of a grid, with boundaries at quantiles of
+each feature so that cells hold similar numbers of rows. A query visits
+cells in order of how close they could possibly be to the player and stops
+once no unvisited cell can beat the neighbours found so far, so the answer
+is exact but only a few cells are usually read. Writes are appended to a
+small unsorted tail that every query scans in full; the grid is rebuilt, off
+the event loop, when the tail grows or the number of players changes a lot.
+
+The index follows the player change sequence: it is loaded by reading every
+change since sequence 0 and kept current by applying the changes made since
+the sequence it last saw, so writes made by other worker processes are
+picked up too.
+
+With SIMILARITY_SNAPSHOT_DIR set, the grid is written to a snapshot file
+whenever it is rebuilt (and rebuilt for one at most every
+SIMILARITY_SNAPSHOT_INTERVAL seconds while players change). The file holds
+the index arrays back to back behind a small header with their offsets, so
+a starting process maps them into memory instead of reading every player,
+and only replays the changes made since the snapshot's sequence value.
+Only one process per snapshot file writes it, chosen with a file lock (as
+for the static views); the others load it and stand by in case it exits.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import fcntl
+import json
+import math
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.repository import PlayerRepository
+
+# Player fields compared, in feature vector order
+SIMILARITY_FEATURES = ("Hits", "AgeThatYear", "Year", "Bats", "Rank")
+
+# Average number of rows per grid cell to aim for
+CELL_SIZE = 2048
+
+# Rows to compute distances for at a time while visiting cells
+SCAN_BATCH_SIZE = 16384
+
+# Largest tail (and number of deleted rows) tolerated before a rebuild
+MIN_TAIL_SIZE = 1024
+MAX_TAIL_FRACTION = 0.05
+
+# Snapshot file layout: magic, header length, JSON header, then each array
+# starting at a multiple of SNAPSHOT_ALIGNMENT bytes
+SNAPSHOT_MAGIC = b"BSDSIM01"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_ALIGNMENT = 64
+SNAPSHOT_ARRAYS = ("raw", "vectors", "ids", "alive", "starts", "cell_bins", "base_ids", "base_rows")
+
+
+def feature_vector(player: Dict[str, Any]) -> List[float]:
+    """
+    Get a player's raw features, with NaN for values that are not numbers.
+    """
+    features = []
+    for field in SIMILARITY_FEATURES:
+        try:
+            value = float(player.get(field))
+        except (TypeError, ValueError):
+            value = math.nan
+        features.append(value if math.isfinite(value) else math.nan)
+    return features
+
+
+def standardize(raw: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Standardize raw features, storing missing ones as the mean (zero).
+    """
+    return np.nan_to_num((raw - mean) / scale).astype(np.float32)
+
+
+def build_grid(raw: np.ndarray, ids: np.ndarray, alive: np.ndarray, mean: np.ndarray, scale: np.ndarray, capacity: int) -> Dict[str, Any]:
+    """
+    Lay out live rows sorted by grid cell.
+    
+    Args:
+        raw: Raw features of the rows.
+        ids: Player IDs of the rows.
+        alive: Which rows are live; the others are left out.
+        mean: Feature means to standardize with.
+        scale: Feature standard deviations to standardize with.
+        capacity: Number of rows to allocate, leaving room for appends.
+    
+    Returns:
+        dict: The new arrays and grid, to be installed by ``SimilarityIndex``.
+    """
+    raw, ids = raw[alive], ids[alive]
+    count, dimensions = raw.shape
+    vectors = standardize(raw, mean, scale)
+    
+    # Inner cell boundaries of each feature, at quantiles of a sample of rows
+    bins = max(1, min(16, round((count / CELL_SIZE) ** (1 / dimensions))))
+    sample = vectors[:: max(1, count // 100000)]
+    edges = []
+    for j in range(dimensions):
+        if bins > 1 and len(sample):
+            edges.append(np.unique(np.quantile(sample[:, j], np.linspace(0, 1, bins + 1)[1:-1])))
+        else:
+            edges.append(np.zeros(0))
+    
+    # Cell of each row: its bin in every feature, in mixed radix
+    cells = np.zeros(count, dtype=np.int64)
+    radix = 1
+    for j in range(dimensions):
+        cells += np.searchsorted(edges[j], vectors[:, j], side="right") * radix
+        radix *= len(edges[j]) + 1
+    order = np.argsort(cells, kind="stable")
+    starts = np.zeros(radix + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=radix), out=starts[1:])
+    
+    # Bin of every cell in each feature, for the cell distance bounds
+    cell_bins = np.zeros((radix, dimensions), dtype=np.int64)
+    remaining = np.arange(radix)
+    for j in range(dimensions):
+        cell_bins[:, j] = remaining % (len(edges[j]) + 1)
+        remaining //= len(edges[j]) + 1
+    
+    capacity = max(capacity, count)
+    layout = {
+        "raw": np.zeros((capacity, dimensions), dtype=np.float32),
+        "vectors": np.zeros((capacity, dimensions), dtype=np.float32),
+        "ids": np.zeros(capacity, dtype=np.int64),
+        "alive": np.zeros(capacity, dtype=bool),
+        "edges": edges,
+        "starts": starts,
+        "cell_bins": cell_bins,
+    }
+    layout["raw"][:count] = raw[order]
+    layout["vectors"][:count] = vectors[order]
+    layout["ids"][:count] = ids[order]
+    layout["alive"][:count] = True
+    
+    # Row of each player, looked up by binary search over the sorted IDs
+    layout["base_rows"] = np.argsort(layout["ids"][:count], kind="stable")
+    layout["base_ids"] = layout["ids"][layout["base_rows"]]
+    layout["count"] = count
+    return layout
+
+
+def snapshot_path() -> Optional[str]:
+    """
+    Get the path of this database's snapshot file, or None if snapshots are disabled.
+    """
+    if not settings.SIMILARITY_SNAPSHOT_DIR:
+        return None
+    name = f"similarity-{settings.DATABASE_NAME}-{settings.COLLECTION_NAME}.snap"
+    return os.path.join(settings.SIMILARITY_SNAPSHOT_DIR, name)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+def write_snapshot(path: str, layout: Dict[str, Any], state: Dict[str, Any]):
+    """
+    Write a grid layout to a snapshot file.
+    
+    The file is written under a unique temporary name and renamed over the
+    previous snapshot, so readers (including processes on other hosts sharing
+    the volume) only ever see a complete file.
+    
+    Args:
+        path: The snapshot file path.
+        layout: A layout from ``build_grid``.
+        state: The index state it was built from: sequence value, scaling and running totals.
+    """
+    # Row arrays are written with their spare capacity, so that the tail
+    # can grow in the mapping without copying it into memory
+    arrays = {name: np.ascontiguousarray(layout[name]) for name in SNAPSHOT_ARRAYS}
+    
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        specs[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(dict(
+        state,
+        count=layout["count"],
+        format=SNAPSHOT_FORMAT,
+        database=settings.DATABASE_NAME,
+        collection=settings.COLLECTION_NAME,
+        features=list(SIMILARITY_FEATURES),
+        edges=[edges.tolist() for edges in layout["edges"]],
+        arrays=specs,
+    )).encode()
+    
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Process IDs repeat across pods, so the temporary name comes from mkstemp
+    fd, temporary = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Readable by other processes, as a file created with open() would be
+            os.fchmod(f.fileno(), 0o644)
+            f.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(header)) + header)
+            start = _aligned(f.tell())
+            for name, array in arrays.items():
+                f.write(b"\0" * (start + specs[name]["offset"] - f.tell()))
+                f.write(array.data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Map a snapshot file's arrays into memory.
+    
+    Arrays are mapped copy-on-write: pages are read from the file as they
+    are first used, and changes made to them stay private to this process.
+    
+    Returns:
+        Tuple: The snapshot header and its arrays.
+    
+    Raises:
+        ValueError: If the file is not a snapshot in this format.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a similarity index snapshot")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {header.get('format')}")
+    
+    start = _aligned(len(SNAPSHOT_MAGIC) + 8 + length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            # Empty arrays cannot be mapped
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec["dtype"], mode="c", offset=start + spec["offset"], shape=shape)
+    return header, arrays
+
+
+class SimilarityIndex:
+    """
+    In-memory exact nearest neighbour index over standardized player features.
+    
+    Rows are stored in preallocated arrays. Rows ``[0, sorted_end)`` are
+    sorted by grid cell; later rows form the tail of writes made since the
+    last rebuild. Updating a player marks their old row dead and appends a
+    new one, so writes cost O(1). Players are found in the sorted rows by
+    binary search over their IDs, and in the tail through a dictionary.
+    """
+    def __init__(self, initial_capacity: int = 1024, clock: Callable[[], float] = time.monotonic):
+        dimensions = len(SIMILARITY_FEATURES)
+        self.seq = 0
+        self.raw = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self.vectors = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self.ids = np.zeros(initial_capacity, dtype=np.int64)
+        self.alive = np.zeros(initial_capacity, dtype=bool)
+        self.size = 0
+        self.sorted_end = 0
+        self.count = 0
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._base_rows = np.zeros(0, dtype=np.int64)
+        self._tail_rows: Dict[int, int] = {}
+        
+        # An empty grid: a single cell
+        self._edges = [np.zeros(0)] * dimensions
+        self._starts = np.zeros(2, dtype=np.int64)
+        self._cell_bins = np.zeros((1, dimensions), dtype=np.int64)
+        
+        # Running totals of the raw features of live rows, for the mean and
+        # standard deviation; the mean and scale in use are those of the last rebuild
+        self._sums = np.zeros(dimensions)
+        self._squares = np.zeros(dimensions)
+        self._counts = np.zeros(dimensions)
+        self._mean = np.zeros(dimensions)
+        self._scale = np.ones(dimensions)
+        self._built_size = 0
+        
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._refreshed_at: Optional[float] = None
+        self._snapshot_seq: Optional[int] = None
+        self._snapshot_at: Optional[float] = None
+        self._snapshot_lock = None
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __contains__(self, id: int) -> bool:
+        return self.row_of(id) is not None
+    
+    def row_of(self, id: int) -> Optional[int]:
+        """
+        Get the live row of a player, or None if they are not in the index.
+        """
+        row = self._tail_rows.get(id)
+        if row is not None:
+            return row
+        i = int(np.searchsorted(self._base_ids, id))
+        if i < len(self._base_ids) and self._base_ids[i] == id:
+            row = int(self._base_rows[i])
+            if self.alive[row]:
+                return row
+        return None
+    
+    @property
+    def needs_rebuild(self) -> bool:
+        """
+        Whether the tail or dead rows have grown too large, or the number of
+        players changed enough to shift the feature scaling.
+        """
+        live = self.count
+        if live and not self._built_size * 0.5 <= live <= self._built_size * 2:
+            return True
+        waste = (self.size - self.sorted_end) + (self.size - live)
+        return waste > max(MIN_TAIL_SIZE, MAX_TAIL_FRACTION * live)
+    
+    def _track(self, raw: np.ndarray, sign: int):
+        present = ~np.isnan(raw)
+        values = np.where(present, raw, 0).astype(np.float64)
+        self._sums += sign * values
+        self._squares += sign * values * values
+        self._counts += sign * present
+    
+    def _grow(self):
+        # Also moves arrays mapped from a snapshot into memory
+        capacity = max(len(self.ids) * 2, MIN_TAIL_SIZE)
+        for name in ("raw", "vectors", "ids", "alive"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+    
+    def upsert(self, player: Dict[str, Any]):
+        """
+        Add a player to the index, or update their features.
+        """
+        id = player["id"]
+        self.remove(id)
+        if self.size == len(self.ids):
+            self._grow()
+        row = self.size
+        self.size += 1
+        
+        raw = np.array(feature_vector(player), dtype=np.float32)
+        self.raw[row] = raw
+        self.vectors[row] = standardize(raw, self._mean, self._scale)
+        self.ids[row] = id
+        self.alive[row] = True
+        self._tail_rows[id] = row
+        self.count += 1
+        self._track(raw, 1)
+    
+    def remove(self, id: int):
+        """
+        Remove a player from the index, if present.
+        """
+        row = self.row_of(id)
+        if row is not None:
+            self._tail_rows.pop(id, None)
+            self.alive[row] = False
+            self.count -= 1
+            self._track(self.raw[row], -1)
+    
+    def apply(self, changes: Dict[str, Any]):
+        """
+        Apply a change set from ``PlayerRepository.changes_since``.
+        """
+        for id in changes["deleted"]:
+            self.remove(id)
+        for player in changes["upserted"]:
+            self.upsert(player)
+        self.seq = changes["seq"]
+    
+    def _prepare_rebuild(self) -> Tuple:
+        counts = np.maximum(self._counts, 1)
+        mean = self._sums / counts
+        variance = np.maximum(self._squares / counts - mean ** 2, 0)
+        scale = np.where(variance > 0, np.sqrt(variance), 1)
+        # Leave room for the tail to grow to its limit before reallocating
+        capacity = int(self.count * (1 + MAX_TAIL_FRACTION)) + MIN_TAIL_SIZE
+        return self.raw[:self.size], self.ids[:self.size], self.alive[:self.size], mean, scale, capacity
+    
+    def _install(self, layout: Dict[str, Any], mean: np.ndarray, scale: np.ndarray):
+        self.raw = layout["raw"]
+        self.vectors = layout["vectors"]
+        self.ids = layout["ids"]
+        self.alive = layout["alive"]
+        self._base_ids = layout["base_ids"]
+        self._base_rows = layout["base_rows"]
+        self._tail_rows = {}
+        self.size = self.sorted_end = self.count = layout["count"]
+        self._edges = layout["edges"]
+        self._starts = layout["starts"]
+        self._cell_bins = layout["cell_bins"]
+        self._mean = mean
+        self._scale = scale
+        self._built_size = self.size
+    
+    def rebuild(self):
+        """
+        Rescale the features and sort every live row into the grid.
+        """
+        raw, ids, alive, mean, scale, capacity = self._prepare_rebuild()
+        self._install(build_grid(raw, ids, alive, mean, scale, capacity), mean, scale)
+    
+    def _state(self, mean: np.ndarray, scale: np.ndarray) -> Dict[str, Any]:
+        """
+        Get what a snapshot needs besides the layout, as JSON-serializable values.
+        """
+        return {
+            "seq": self.seq,
+            "mean": mean.tolist(),
+            "scale": scale.tolist(),
+            "sums": self._sums.tolist(),
+            "squares": self._squares.tolist(),
+            "counts": self._counts.tolist(),
+        }
+    
+    def load_snapshot(self, path: str) -> bool:
+        """
+        Replace the index with a snapshot, mapped from disk.
+        
+        Snapshots of another database or collection, or of different features,
+        are ignored.
+        
+        Args:
+            path: The snapshot file path.
+        
+        Returns:
+            bool: Whether the snapshot was loaded.
+        
+        Raises:
+            ValueError: If the file is not a snapshot in this format.
+        """
+        header, arrays = read_snapshot(path)
+        if (header["database"], header["collection"], tuple(header["features"])) != \
+                (settings.DATABASE_NAME, settings.COLLECTION_NAME, SIMILARITY_FEATURES):
+            return False
+        layout = dict(arrays, count=header["count"], edges=[np.array(edges) for edges in header["edges"]])
+        self._install(layout, np.array(header["mean"]), np.array(header["scale"]))
+        self._sums = np.array(header["sums"])
+        self._squares = np.array(header["squares"])
+        self._counts = np.array(header["counts"])
+        self.seq = self._snapshot_seq = header["seq"]
+        self._snapshot_at = self._clock()
+        return True
+    
+    def _acquire_snapshot_lock(self, path: str) -> bool:
+        """
+        Take the snapshot file's writer lock, if no other process holds it.
+        """
+        if self._snapshot_lock is not None:
+            return True
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        lock_file = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._snapshot_lock = lock_file
+        return True
+    
+    @property
+    def snapshot_due(self) -> bool:
+        """
+        Whether snapshots are enabled, this process writes them, and the
+        index changed since the last one, at least
+        SIMILARITY_SNAPSHOT_INTERVAL seconds ago.
+        """
+        path = snapshot_path()
+        if path is None or self.seq == self._snapshot_seq:
+            return False
+        if self._snapshot_at is not None and self._clock() - self._snapshot_at < settings.SIMILARITY_SNAPSHOT_INTERVAL:
+            return False
+        return self._acquire_snapshot_lock(path)
+    
+    async def refresh(self, repository: PlayerRepository, max_age: float = 0):
+        """
+        Apply the changes made since the index was last refreshed, rebuilding
+        the grid if needed.
+        
+        Once the index has been loaded, a caller that finds another refresh
+        in progress returns right away and uses the index as it is. The first
+        refresh starts from the snapshot file, if there is one.
+        
+        Args:
+            repository: The repository to read changes from.
+            max_age: Skip the refresh if the last one was this many seconds ago or less.
+        """
+        if self._lock.locked() and self._refreshed_at is not None:
+            return
+        async with self._lock:
+            if self._refreshed_at is not None and self._clock() - self._refreshed_at < max_age:
+                return
+            path = snapshot_path()
+            if self._refreshed_at is None and path is not None and os.path.exists(path):
+                try:
+                    self.load_snapshot(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error loading similarity index snapshot {path}: {e}")
+            
+            while True:
+                changes = await repository.changes_since(self.seq, settings.SIMILARITY_SYNC_BATCH_SIZE)
+                self.apply(changes)
+                if not changes["has_more"]:
+                    break
+            
+            if self.needs_rebuild or self.snapshot_due:
+                # Rows are only changed under the lock, so the grid can be
+                # built from them in a thread while queries keep reading them
+                raw, ids, alive, mean, scale, capacity = self._prepare_rebuild()
+                state = self._state(mean, scale)
+                layout = await asyncio.to_thread(build_grid, raw, ids, alive, mean, scale, capacity)
+                self._install(layout, mean, scale)
+                if path is not None and self._acquire_snapshot_lock(path):
+                    self._snapshot_at = self._clock()
+                    try:
+                        await asyncio.to_thread(write_snapshot, path, layout, state)
+                        self._snapshot_seq = state["seq"]
+                    except OSError as e:
+                        print(f"Error writing similarity index snapshot {path}: {e}")
+            self._refreshed_at = self._clock()
+    
+    def _cell_bounds(self, query: np.ndarray) -> np.ndarray:
+        """
+        Get the smallest squared distance from a vector to any point of each cell.
+        """
+        bounds = np.zeros(len(self._cell_bins))
+        for j, edges in enumerate(self._edges):
+            low = np.concatenate(([-np.inf], edges))
+            high = np.concatenate((edges, [np.inf]))
+            gap = np.maximum(np.maximum(low - query[j], query[j] - high), 0)
+            bounds += (gap ** 2)[self._cell_bins[:, j]]
+        return bounds
+    
+    def _distances(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        difference = self.vectors[rows] - query
+        distances = np.einsum("ij,ij->i", difference, difference)
+        distances[~self.alive[rows]] = np.inf
+        return distances
+    
+    def nearest(self, id: int, k: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        Find the player-seasons closest to a player.
+        
+        Args:
+            id: The player to compare against.
+            k: The number of neighbours to return.
+        
+        Returns:
+            list: ``(id, distance)`` pairs, closest first, not including the
+            player itself; None if the player is not in the index.
+        """
+        row = self.row_of(id)
+        if row is None:
+            return None
+        k = min(k, self.count - 1)
+        if k <= 0:
+            return []
+        query = self.vectors[row].copy()
+        
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_distances = np.zeros(0, dtype=np.float32)
+        
+        def merge(rows: np.ndarray):
+            nonlocal best_rows, best_distances
+            distances = self._distances(rows, query)
+            distances[rows == row] = np.inf
+            best_rows = np.concatenate((best_rows, rows))
+            best_distances = np.concatenate((best_distances, distances))
+            if len(best_rows) > k:
+                keep = np.argpartition(best_distances, k - 1)[:k]
+                best_rows, best_distances = best_rows[keep], best_distances[keep]
+        
+        # Every query reads the tail of recent writes
+        if self.size > self.sorted_end:
+            merge(np.arange(self.sorted_end, self.size))
+        
+        # Visit cells closest first, until no cell can hold a closer row
+        bounds = self._cell_bounds(query)
+        ranges = []
+        pending = 0
+        for cell in np.argsort(bounds, kind="stable"):
+            if len(best_rows) == k and bounds[cell] > best_distances.max():
+                break
+            start, end = self._starts[cell], self._starts[cell + 1]
+            if start == end:
+                continue
+            ranges.append(np.arange(start, end))
+            pending += end - start
+            if pending >= SCAN_BATCH_SIZE:
+                merge(np.concatenate(ranges))
+                ranges, pending = [], 0
+        if ranges:
+            merge(np.concatenate(ranges))
+        
+        found = np.isfinite(best_distances)
+        best_rows, best_distances = best_rows[found], best_distances[found]
+        order = np.argsort(best_distances, kind="stable")
+        return [
+            (int(self.ids[i]), math.sqrt(max(float(d), 0.0)))
+            for i, d in zip(best_rows[order], best_distances[order])
+        ]
+
+
+# Similarity index, one per worker process
+similarity_index = SimilarityIndex()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """
+    Get the similarity index
+    """
+    return similarity_index
@@ -0,0 +1,481 @@
+"""
+Season statistics sketches for the Baseball Stats Dashboard.
+
+Percentile and distribution charts need the hits and ages of every player in
+a season. This module keeps small sketches per season instead, so those
+questions are answered in microseconds whatever the number of players:
+
+- Quantiles of hits and age, in logarithmic buckets in the style of
+  DDSketch: any quantile is answered within SKETCH_RELATIVE_ACCURACY of the
+  true value. Unlike t-digest or KLL, bucket counts are exact, so a value
+  can be removed again when a player is edited or deleted.
+- Distinct player names, in a HyperLogLog with a standard error of about
+  ``1.04 / sqrt(2 ** SKETCH_HLL_PRECISION)`` (1.6% by default).
+
+Sketches merge by adding bucket counts and taking the largest HyperLogLog
+registers, so seasons can be combined into a range, and sketches built by
+other processes (or from other partitions) can be combined with
+``SeasonSketches.merge`` after a round trip through ``to_dict``.
+
+Like the similarity index, the sketches follow the player change sequence:
+each change since the sequence value last seen is applied in O(1), so writes
+made through any endpoint, import or ingest job, in any worker process, are
+counted. HyperLogLog registers cannot forget a player, so after enough
+deletions (or players moving to another season) the distinct counts are
+recomputed from the players' recorded contributions.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.repository import PlayerRepository
+
+# Player fields with quantile sketches
+QUANTILE_FIELDS = ("Hits", "AgeThatYear")
+
+# Removals tolerated before the distinct player counts are recomputed
+MIN_STALE_REMOVALS = 1024
+MAX_STALE_FRACTION = 0.05
+
+
+def number(value: Any) -> Optional[float]:
+    """
+    Read a field as a number, or None if it is not one.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def name_hash(name: Any) -> int:
+    """
+    Hash a player name to 64 bits, for the HyperLogLog.
+    """
+    return int.from_bytes(hashlib.blake2b(str(name).encode(), digest_size=8).digest(), "big")
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees.
+    
+    Positive values are counted in buckets ``(gamma ** (i - 1), gamma ** i]``
+    with ``gamma = (1 + a) / (1 - a)``, negative values in mirrored buckets,
+    and zeros on their own.
+    
+    Args:
+        relative_accuracy: The relative error ``a`` of returned quantiles.
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+    
+    def _bucket(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+    
+    def _value(self, bucket: int) -> float:
+        # The point of the bucket within the relative accuracy of all of it
+        return 2 * self._gamma ** bucket / (self._gamma + 1)
+    
+    @staticmethod
+    def _count(buckets: Dict[int, int], bucket: int, weight: int):
+        count = buckets.get(bucket, 0) + weight
+        if count:
+            buckets[bucket] = count
+        else:
+            del buckets[bucket]
+    
+    def add(self, value: float, weight: int = 1):
+        """
+        Count a value, or remove it again with a negative weight.
+        """
+        if value > 0:
+            self._count(self.positive, self._bucket(value), weight)
+        elif value < 0:
+            self._count(self.negative, self._bucket(-value), weight)
+        else:
+            self.zeros += weight
+        self.count += weight
+    
+    def remove(self, value: float):
+        """
+        Remove a value counted before.
+        """
+        self.add(value, -1)
+    
+    def merge(self, other: "QuantileSketch"):
+        """
+        Add another sketch's values to this one.
+        
+        Raises:
+            ValueError: If the sketches have different accuracies.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracies")
+        for bucket, count in other.positive.items():
+            self._count(self.positive, bucket, count)
+        for bucket, count in other.negative.items():
+            self._count(self.negative, bucket, count)
+        self.zeros += other.zeros
+        self.count += other.count
+    
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """
+        Get approximate quantiles, in a single pass over the buckets.
+        
+        Args:
+            qs: Quantiles between 0 and 1.
+        
+        Returns:
+            list: The value at each quantile, or None if the sketch is empty.
+        """
+        qs = list(qs)
+        if self.count <= 0:
+            return [None] * len(qs)
+        
+        # Buckets in value order: negative (largest magnitude first), zero, positive
+        buckets = [(-self._value(bucket), self.negative[bucket]) for bucket in sorted(self.negative, reverse=True)]
+        buckets.append((0.0, self.zeros))
+        buckets += [(self._value(bucket), self.positive[bucket]) for bucket in sorted(self.positive)]
+        
+        results: List[Optional[float]] = [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        seen = 0
+        position = 0
+        for value, count in buckets:
+            seen += count
+            while position < len(order) and qs[order[position]] * (self.count - 1) < seen:
+                results[order[position]] = value
+                position += 1
+        for i in order[position:]:
+            results[i] = buckets[-1][0]
+        return results
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the sketch, for merging elsewhere.
+        """
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(bucket): count for bucket, count in self.positive.items()},
+            "negative": {str(bucket): count for bucket, count in self.negative.items()},
+            "zeros": self.zeros,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        """
+        Deserialize a sketch from ``to_dict``.
+        """
+        sketch = cls(data["relative_accuracy"])
+        sketch.positive = {int(bucket): count for bucket, count in data["positive"].items()}
+        sketch.negative = {int(bucket): count for bucket, count in data["negative"].items()}
+        sketch.zeros = data["zeros"]
+        sketch.count = sum(sketch.positive.values()) + sum(sketch.negative.values()) + sketch.zeros
+        return sketch
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct count estimate.
+    
+    Args:
+        precision: Log2 of the number of registers, from 4 to 16.
+    """
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def add(self, hashed: int):
+        """
+        Count a 64-bit hash, e.g. from ``name_hash``.
+        """
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: "HyperLogLog"):
+        """
+        Add another estimate's values to this one.
+        
+        Raises:
+            ValueError: If the estimates have different precisions.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precisions")
+        np.maximum(self.registers, other.registers, out=self.registers)
+    
+    def count(self) -> int:
+        """
+        Estimate the number of distinct values counted.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small counts
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the estimate, for merging elsewhere.
+        """
+        return {"precision": self.precision, "registers": self.registers.tobytes().hex()}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        """
+        Deserialize an estimate from ``to_dict``.
+        """
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(bytes.fromhex(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+class SeasonSketches:
+    """
+    Quantile sketches and a distinct player count for each season.
+    
+    Args:
+        relative_accuracy: Relative error of the quantile sketches.
+        precision: Precision of the HyperLogLogs.
+    """
+    def __init__(self, relative_accuracy: float = 0.01, precision: int = 12):
+        self.relative_accuracy = relative_accuracy
+        self.precision = precision
+        self.quantile_sketches: Dict[int, Dict[str, QuantileSketch]] = {}
+        self.players: Dict[int, HyperLogLog] = {}
+        self.counts: Dict[int, int] = {}
+    
+    def _season(self, year: int) -> Dict[str, QuantileSketch]:
+        season = self.quantile_sketches.get(year)
+        if season is None:
+            season = self.quantile_sketches[year] = {field: QuantileSketch(self.relative_accuracy) for field in QUANTILE_FIELDS}
+            self.players[year] = HyperLogLog(self.precision)
+            self.counts[year] = 0
+        return season
+    
+    def add(self, year: int, values: Tuple[Optional[float], ...], hashed: int):
+        """
+        Count a player-season.
+        
+        Args:
+            year: The season.
+            values: The player's value of each of ``QUANTILE_FIELDS``, None if missing.
+            hashed: The player's ``name_hash``.
+        """
+        season = self._season(year)
+        for field, value in zip(QUANTILE_FIELDS, values):
+            if value is not None:
+                season[field].add(value)
+        self.players[year].add(hashed)
+        self.counts[year] += 1
+    
+    def remove(self, year: int, values: Tuple[Optional[float], ...]):
+        """
+        Remove a player-season from the quantiles and counts; the distinct
+        player count keeps them until it is recomputed.
+        """
+        season = self._season(year)
+        for field, value in zip(QUANTILE_FIELDS, values):
+            if value is not None:
+                season[field].remove(value)
+        self.counts[year] -= 1
+        if not self.counts[year]:
+            del self.quantile_sketches[year], self.players[year], self.counts[year]
+    
+    def merge(self, other: "SeasonSketches"):
+        """
+        Add another set of sketches to this one, e.g. from another partition or process.
+        """
+        for year, season in other.quantile_sketches.items():
+            own = self._season(year)
+            for field, sketch in season.items():
+                own[field].merge(sketch)
+            self.players[year].merge(other.players[year])
+            self.counts[year] += other.counts[year]
+    
+    def years(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> List[int]:
+        """
+        Get the seasons with players, in order, optionally within a range.
+        """
+        return sorted(
+            year for year in self.quantile_sketches
+            if (start_year is None or year >= start_year) and (end_year is None or year <= end_year)
+        )
+    
+    def combined(self, years: Iterable[int]) -> "SeasonSketches":
+        """
+        Merge several seasons into one, stored under season 0.
+        """
+        combined = SeasonSketches(self.relative_accuracy, self.precision)
+        season = combined._season(0)
+        for year in years:
+            for field, sketch in self.quantile_sketches[year].items():
+                season[field].merge(sketch)
+            combined.players[0].merge(self.players[year])
+            combined.counts[0] += self.counts[year]
+        return combined
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the sketches, for merging elsewhere.
+        """
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "precision": self.precision,
+            "seasons": {
+                str(year): {
+                    "count": self.counts[year],
+                    "players": self.players[year].to_dict(),
+                    **{field: sketch.to_dict() for field, sketch in season.items()},
+                }
+                for year, season in self.quantile_sketches.items()
+            },
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SeasonSketches":
+        """
+        Deserialize sketches from ``to_dict``.
+        """
+        sketches = cls(data["relative_accuracy"], data["precision"])
+        for year, season in data["seasons"].items():
+            year = int(year)
+            sketches.quantile_sketches[year] = {field: QuantileSketch.from_dict(season[field]) for field in QUANTILE_FIELDS}
+            sketches.players[year] = HyperLogLog.from_dict(season["players"])
+            sketches.counts[year] = season["count"]
+        return sketches
+
+
+class SeasonStats:
+    """
+    Season sketches kept current by following the player change sequence.
+    
+    The season, values and name hash each player contributed are recorded,
+    so they can be taken back out when the player changes or is deleted.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.seq = 0
+        self.sketches = SeasonSketches(settings.SKETCH_RELATIVE_ACCURACY, settings.SKETCH_HLL_PRECISION)
+        self._contributions: Dict[int, Tuple[int, Tuple[Optional[float], ...], int]] = {}
+        self._stale_removals = 0
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._refreshed_at: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self._contributions)
+    
+    def upsert(self, player: Dict[str, Any]):
+        """
+        Count a player, or update their contribution.
+        """
+        previous = self._retract(player["id"])
+        year = number(player.get("Year"))
+        contribution = None
+        if year is not None:
+            contribution = (int(year), tuple(number(player.get(field)) for field in QUANTILE_FIELDS), name_hash(player.get("Player")))
+            self._contributions[player["id"]] = contribution
+            self.sketches.add(*contribution)
+        # Edits that keep the player's name and season leave the distinct counts right
+        if previous is not None and (contribution is None or (previous[0], previous[2]) != (contribution[0], contribution[2])):
+            self._stale_removals += 1
+    
+    def remove(self, id: int):
+        """
+        Remove a player's contribution, if any.
+        """
+        if self._retract(id) is not None:
+            self._stale_removals += 1
+    
+    def _retract(self, id: int) -> Optional[Tuple[int, Tuple[Optional[float], ...], int]]:
+        contribution = self._contributions.pop(id, None)
+        if contribution is not None:
+            year, values, _ = contribution
+            self.sketches.remove(year, values)
+        return contribution
+    
+    def apply(self, changes: Dict[str, Any]):
+        """
+        Apply a change set from ``PlayerRepository.changes_since``.
+        """
+        for id in changes["deleted"]:
+            self.remove(id)
+        for player in changes["upserted"]:
+            self.upsert(player)
+        self.seq = changes["seq"]
+    
+    @property
+    def needs_recount(self) -> bool:
+        """
+        Whether enough players were removed to skew the distinct player counts.
+        """
+        return self._stale_removals > max(MIN_STALE_REMOVALS, MAX_STALE_FRACTION * len(self._contributions))
+    
+    def recount(self):
+        """
+        Recompute the distinct player counts from the recorded contributions.
+        """
+        for players in self.sketches.players.values():
+            players.registers[:] = 0
+        for year, _, hashed in self._contributions.values():
+            self.sketches.players[year].add(hashed)
+        self._stale_removals = 0
+    
+    async def refresh(self, repository: PlayerRepository, max_age: float = 0):
+        """
+        Apply the changes made since the sketches were last refreshed.
+        
+        Once the sketches have been loaded, a caller that finds another
+        refresh in progress returns right away and uses them as they are.
+        
+        Args:
+            repository: The repository to read changes from.
+            max_age: Skip the refresh if the last one was this many seconds ago or less.
+        """
+        if self._lock.locked() and self._refreshed_at is not None:
+            return
+        async with self._lock:
+            if self._refreshed_at is not None and self._clock() - self._refreshed_at < max_age:
+                return
+            while True:
+                changes = await repository.changes_since(self.seq, settings.SKETCH_SYNC_BATCH_SIZE)
+                self.apply(changes)
+                if not changes["has_more"]:
+                    break
+            if self.needs_recount:
+                self.recount()
+            self._refreshed_at = self._clock()
+
+
+# Season statistics, one per worker process
+season_stats = SeasonStats()
+
+
+def get_season_stats() -> SeasonStats:
+    """
+    Get the season statistics
+    """
+    return season_stats
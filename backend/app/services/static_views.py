@@ -0,0 +1,292 @@
+"""
+Pre-rendered static views for the Baseball Stats Dashboard.
+
+The dashboard's player list, and the player list of each season, are read on
+every dashboard load but only change when a player is written. With
+STATIC_VIEWS_DIR set, the backend renders them to JSON files, each with a
+gzip-compressed copy, which nginx serves straight from disk (see
+``frontend/nginx/nginx.conf``). Requests only reach the API for views that
+have not been rendered.
+
+The renderer follows the player change sequence, like the similarity index,
+and re-renders only the views the changed players belong to. Writes handled
+by this process wake it after STATIC_VIEWS_DEBOUNCE seconds, so a burst of
+writes is rendered once; writes made elsewhere are picked up within
+STATIC_VIEWS_POLL_INTERVAL seconds. Files are replaced atomically, so nginx
+never serves a partly written view, and a file is only rewritten when its
+content changes. ``manifest.json`` records the ETag of each view (the same
+ETag the API sends for it) and the change sequence value they are current as of.
+
+Only one worker process per directory renders the views, chosen with a file
+lock; the others stand by in case it exits.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.models.player import Player
+from app.services.repository import PlayerRepository, create_player_repository
+from app.services.sketches import get_season_stats
+
+# Maximum number of players in a list view, as for GET /api/players
+VIEW_LIMIT = 1000
+
+PLAYERS_VIEW = "players.json"
+MANIFEST = "manifest.json"
+LOCK_FILE = ".lock"
+
+# Serializes player lists, leaving out internal fields
+players_adapter = TypeAdapter(List[Player])
+
+
+def render_players(players: List[Dict[str, Any]]) -> bytes:
+    """
+    Serialize a player list as the player list endpoints return it.
+    """
+    return players_adapter.dump_json(players_adapter.validate_python(players))
+
+
+def etag_of(body: bytes) -> str:
+    """
+    Get the (strong) ETag of a response body.
+    """
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def season_view(year: int) -> str:
+    """
+    Get the file name of a season's player list view, relative to the views directory.
+    """
+    return f"seasons/{year}.json"
+
+
+def _replace(path: str, data: bytes):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_view(directory: str, name: str, body: bytes):
+    """
+    Atomically write a view and its gzip-compressed copy.
+    
+    The compressed copy is written first, so it is never older than the
+    plain file once both are written.
+    """
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _replace(f"{path}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+    _replace(path, body)
+
+
+def remove_view(directory: str, name: str):
+    """
+    Remove a view and its compressed copy, so requests for it go to the API.
+    """
+    path = os.path.join(directory, name)
+    for file in (path, f"{path}.gz"):
+        if os.path.exists(file):
+            os.remove(file)
+
+
+class StaticViews:
+    """
+    Renders the player list views to a directory and keeps them current.
+    
+    Args:
+        directory: Where to write the views; nginx serves them from there.
+        debounce: Seconds to wait after a write wakes the renderer, so writes
+            made together are rendered once.
+        poll_interval: Seconds between checks for writes made by other processes.
+    """
+    def __init__(self, directory: str, debounce: float = 1, poll_interval: float = 5):
+        self.directory = directory
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.seq = 0
+        self.etags: Dict[str, str] = {}
+        # Players in each rendered season view, to find the views of deleted players
+        self._season_players: Dict[int, Set[int]] = {}
+        self._player_seasons: Dict[int, int] = {}
+        self._rendered = False
+        self._wake = asyncio.Event()
+        self._lock_file = None
+    
+    def wake(self):
+        """
+        Re-render the views changed by a write made in this process.
+        """
+        self._wake.set()
+    
+    async def _render(self, name: str, players: List[Dict[str, Any]]) -> bool:
+        if not players and name != PLAYERS_VIEW:
+            if name in self.etags:
+                await asyncio.to_thread(remove_view, self.directory, name)
+                del self.etags[name]
+                return True
+            return False
+        body = render_players(players)
+        etag = etag_of(body)
+        if self.etags.get(name) == etag:
+            return False
+        await asyncio.to_thread(write_view, self.directory, name, body)
+        self.etags[name] = etag
+        return True
+    
+    async def _render_season(self, repository: PlayerRepository, year: int) -> bool:
+        _, players = await repository.snapshot(VIEW_LIMIT, year=year)
+        for id in self._season_players.pop(year, ()):
+            if self._player_seasons.get(id) == year:
+                del self._player_seasons[id]
+        if players:
+            self._season_players[year] = {player["id"] for player in players}
+            self._player_seasons.update((player["id"], year) for player in players)
+        return await self._render(season_view(year), players)
+    
+    async def render(self, repository: PlayerRepository, years: Iterable[int]) -> Tuple[int, bool]:
+        """
+        Render the player list view and the given seasons' views.
+        
+        Returns:
+            Tuple: The change sequence value the views are at least current
+            as of, and whether any view changed.
+        """
+        seq, players = await repository.snapshot(VIEW_LIMIT)
+        changed = await self._render(PLAYERS_VIEW, players)
+        for year in sorted(set(years)):
+            changed = await self._render_season(repository, year) or changed
+        return seq, changed
+    
+    async def refresh(self, repository: PlayerRepository):
+        """
+        Render the views, or re-render those changed since the last refresh.
+        
+        The first refresh renders every season with players, using the
+        season statistics sketches to find them.
+        """
+        if not self._rendered:
+            stats = get_season_stats()
+            await stats.refresh(repository)
+            self.seq, changed = await self.render(repository, stats.sketches.years())
+            self._rendered = True
+        else:
+            dirty: Set[int] = set()
+            seq = self.seq
+            while True:
+                changes = await repository.changes_since(seq, settings.STATIC_VIEWS_SYNC_BATCH_SIZE)
+                for player in changes["upserted"]:
+                    dirty.add(player["Year"])
+                    if player["id"] in self._player_seasons:
+                        dirty.add(self._player_seasons[player["id"]])
+                for id in changes["deleted"]:
+                    if id in self._player_seasons:
+                        dirty.add(self._player_seasons[id])
+                seq = changes["seq"]
+                if not changes["has_more"]:
+                    break
+            if seq == self.seq:
+                return
+            _, changed = await self.render(repository, dirty)
+            self.seq = seq
+        if changed:
+            await asyncio.to_thread(self._write_manifest)
+    
+    def _write_manifest(self):
+        manifest = {"seq": self.seq, "views": dict(sorted(self.etags.items()))}
+        _replace(os.path.join(self.directory, MANIFEST), json.dumps(manifest, indent=2).encode())
+    
+    def _acquire(self) -> bool:
+        """
+        Take the directory's render lock, if no other process holds it.
+        """
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+    
+    def release(self):
+        """
+        Release the render lock, letting another process take over.
+        """
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    async def run(self, repository_factory: Callable[[], PlayerRepository] = create_player_repository):
+        """
+        Keep the views current until cancelled.
+        """
+        while True:
+            if self._acquire():
+                try:
+                    await self.refresh(repository_factory())
+                except Exception as e:
+                    print(f"Error rendering static views: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                await asyncio.sleep(self.debounce)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Static view renderer, when STATIC_VIEWS_DIR is set, and its task
+static_views: Optional[StaticViews] = None
+_render_task: Optional[asyncio.Task] = None
+
+
+async def start_static_views():
+    """
+    Start rendering the static views, if a views directory is configured
+    """
+    global static_views, _render_task
+    if not settings.STATIC_VIEWS_DIR:
+        return
+    static_views = StaticViews(
+        settings.STATIC_VIEWS_DIR,
+        debounce=settings.STATIC_VIEWS_DEBOUNCE,
+        poll_interval=settings.STATIC_VIEWS_POLL_INTERVAL,
+    )
+    _render_task = asyncio.create_task(static_views.run())
+
+
+async def stop_static_views():
+    """
+    Stop rendering the static views
+    """
+    global static_views, _render_task
+    if _render_task is not None:
+        _render_task.cancel()
+        _render_task = None
+    if static_views is not None:
+        static_views.release()
+        static_views = None
+
+
+def get_static_views() -> Optional[StaticViews]:
+    """
+    Get the static view renderer, or None if it is disabled
+    """
+    return static_views
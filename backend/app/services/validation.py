@@ -0,0 +1,135 @@
+"""
+Batch validation of player documents for the Baseball Stats Dashboard.
+
+Bulk writes (imports and ingest) validate whole batches of rows against the
+player schema in a single call. Rows are validated into ``PlayerDocument``
+typed dicts, so the result is the list of documents to insert, without
+building a ``Player`` model for each row and dumping it back to a dict.
+
+If any rows are invalid, their errors are collected by row and only the
+remaining rows are validated again, so a bad row costs one extra pass over
+its batch rather than a model per row.
+
+Raw JSON is parsed with the standard library before validation: with the
+pinned pydantic-core that is faster than ``validate_json`` (compare them with
+``python -m benchmarks.bench_validation``).
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.player import PlayerDocument, SourcePlayerDocument
+
+# Field errors of each invalid row, by the row's index in its batch
+RowErrors = Dict[int, List[Dict[str, str]]]
+
+documents_adapter = TypeAdapter(List[PlayerDocument])
+source_documents_adapter = TypeAdapter(List[SourcePlayerDocument])
+
+
+def _add_row_errors(errors: RowErrors, e: ValidationError, indexes: Sequence[int]) -> bool:
+    """
+    Add the field errors of a failed validation by row.
+    
+    Args:
+        errors: The row errors to add to.
+        e: The error from validating the rows at ``indexes``.
+        indexes: The index in the batch of each validated row.
+    
+    Returns:
+        bool: False if an error is not about a single row (e.g. raised by a
+        validator of the whole list), in which case nothing is added.
+    """
+    row_errors = []
+    for error in e.errors(include_url=False):
+        loc = error["loc"]
+        if loc and isinstance(loc[0], int):
+            position, field = loc[0], loc[1:]
+        elif len(indexes) == 1:
+            position, field = 0, loc
+        else:
+            return False
+        row_errors.append((indexes[position], {
+            "field": ".".join(str(part) for part in field),
+            "message": error["msg"],
+        }))
+    for index, row_error in row_errors:
+        errors[index].append(row_error)
+    return True
+
+
+def validate_players(rows: List[Any], adapter: TypeAdapter = documents_adapter) -> Tuple[List[Dict[str, Any]], RowErrors]:
+    """
+    Validate a batch of raw rows into player documents.
+    
+    If the remaining rows still fail once the invalid ones are left out (with
+    an adapter validating the list as a whole), rows are validated one at a
+    time instead.
+    
+    Args:
+        rows: Raw rows, e.g. parsed JSON objects.
+        adapter: The adapter to validate with; ``source_documents_adapter``
+            for data from the external API.
+    
+    Returns:
+        Tuple: The documents for the valid rows, in order, and the field
+        errors of each invalid row.
+    
+    Example:
+        ```
+        documents, errors = validate_players([{"id": 1, "Player": "Ichiro Suzuki", ...}])
+        ```
+    """
+    errors: RowErrors = defaultdict(list)
+    indexes = range(len(rows))
+    try:
+        return adapter.validate_python(rows), {}
+    except ValidationError as e:
+        if _add_row_errors(errors, e, indexes):
+            indexes = [index for index in indexes if index not in errors]
+            try:
+                return adapter.validate_python([rows[index] for index in indexes]), dict(errors)
+            except ValidationError:
+                pass
+    
+    documents: List[Dict[str, Any]] = []
+    for index in indexes:
+        try:
+            documents += adapter.validate_python([rows[index]])
+        except ValidationError as e:
+            _add_row_errors(errors, e, [index])
+    return documents, dict(errors)
+
+
+def validate_players_json(data: bytes, adapter: TypeAdapter = documents_adapter) -> Tuple[List[Dict[str, Any]], RowErrors]:
+    """
+    Validate a JSON array of players into player documents.
+    
+    Args:
+        data: The raw JSON.
+        adapter: The adapter to validate with.
+    
+    Returns:
+        Tuple: The documents for the valid rows and the field errors of each invalid row.
+    
+    Raises:
+        ValueError: If the data is not a JSON array.
+    """
+    rows = json.loads(data)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of players")
+    return validate_players(rows, adapter)
+
+
+def error_report(errors: RowErrors, first_row: int = 1) -> List[Dict[str, Any]]:
+    """
+    Turn row errors into a report by (1-based) row number, in row order.
+    """
+    return [
+        {"row": first_row + index, "errors": field_errors}
+        for index, field_errors in sorted(errors.items())
+    ]
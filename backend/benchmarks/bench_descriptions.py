@@ -0,0 +1,66 @@
+"""
+Benchmark for batched player description generation.
+
+Generates descriptions for a backfill-sized set of players through the
+offline template provider, once with batching disabled and once with
+micro-batching. The provider simulates a model server that takes a fixed
+time per call and serves a limited number of calls at once, as a local model
+server or a rate-limited API would. No network access is needed.
+
+Usage:
+    python -m benchmarks.bench_descriptions [players] [latency_ms]
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import sys
+import time
+
+from app.services.llm import DescriptionBatcher, TemplateProvider
+
+
+class SimulatedServerProvider(TemplateProvider):
+    """
+    Template provider serving at most ``slots`` calls at once, counting calls.
+    """
+    def __init__(self, latency: float, slots: int = 2):
+        super().__init__(latency=latency)
+        self.slots = asyncio.Semaphore(slots)
+        self.calls = 0
+    
+    async def describe_many(self, players):
+        self.calls += 1
+        async with self.slots:
+            return await super().describe_many(players)
+
+
+async def run(players: int, latency: float, batch_size: int, concurrency: int):
+    provider = SimulatedServerProvider(latency=latency)
+    batcher = DescriptionBatcher(provider, max_batch_size=batch_size, max_wait=0.005)
+    semaphore = asyncio.Semaphore(concurrency)
+    player_rows = [
+        {"id": i, "Player": f"Player {i}", "AgeThatYear": "27", "Hits": 150, "Year": 2021, "Rank": str(i)}
+        for i in range(players)
+    ]
+    
+    async def describe(player):
+        async with semaphore:
+            return await batcher.describe(player)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(describe(player) for player in player_rows))
+    elapsed = time.perf_counter() - start
+    print(f"batch_size={batch_size:>3}  calls={provider.calls:>5}  "
+          f"elapsed={elapsed:6.2f}s  descriptions/s={players / elapsed:8.1f}")
+
+
+async def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    print(f"{players} players, {latency * 1000:.0f} ms per call, 2 server slots, 16 concurrent requests")
+    await run(players, latency, batch_size=1, concurrency=16)
+    await run(players, latency, batch_size=16, concurrency=16)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark for player lookups and writes on a sharded cluster.
+
+Loads players into the configured collection (sharding it on SHARD_KEY when
+set), then runs concurrent lookups by ID with and without the player's
+season, and concurrent replacements, printing operations per second and
+how many of the queries were targeted or scatter-gather. Run it against one
+replica set and against a ``mongos`` with more shards to compare (see
+``docker-compose.sharded.yml``). Needs a running MongoDB, and writes to the
+configured database, so point DATABASE_NAME at a scratch database.
+
+Usage:
+    DATABASE_NAME=Bench SHARD_KEY=id python -m benchmarks.bench_sharding [players] [concurrency] [seconds]
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app.db import mongodb
+from app.services.repository import MotorPlayerRepository
+
+
+def make_player(id: int):
+    return {
+        "id": id, "Player": f"Player {id}", "AgeThatYear": str(20 + id % 20), "Hits": id % 262,
+        "Year": 1900 + id % 125, "Bats": str(300 + id % 400), "Rank": str(id),
+    }
+
+
+async def load(repository: MotorPlayerRepository, players: int, batch_size: int = 5000):
+    if await repository.count() >= players:
+        return
+    for start in range(1, players + 1, batch_size):
+        await repository.bulk_upsert([make_player(id) for id in range(start, min(start + batch_size, players + 1))])
+
+
+async def run(name: str, operation, players: int, concurrency: int, seconds: float):
+    done = 0
+    deadline = time.perf_counter() + seconds
+    
+    async def worker(seed: int):
+        nonlocal done
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            await operation(rng.randint(1, players))
+            done += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    print(f"{name:<28} ops={done:>8}  ops/s={done / (time.perf_counter() - start):10.0f}")
+
+
+async def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    
+    await mongodb.connect_to_mongo()
+    await mongodb.ensure_indexes()
+    repository = MotorPlayerRepository()
+    await load(repository, players)
+    
+    async def get_with_season(id: int):
+        await repository.get(id, year=make_player(id)["Year"])
+    
+    async def get_without_season(id: int):
+        await repository.get(id)
+    
+    async def replace(id: int):
+        player = make_player(id)
+        await repository.replace(id, dict(player, Hits=random.randint(0, 262)), year=player["Year"])
+    
+    print(f"{players} players, {concurrency} concurrent operations, {seconds:g}s each")
+    await run("get by id and season", get_with_season, players, concurrency, seconds)
+    await run("get by id", get_without_season, players, concurrency, seconds)
+    await run("replace by id and season", replace, players, concurrency, seconds)
+    print(mongodb.get_sharding_stats() or "Not sharded (SHARD_KEY is empty)")
+    await mongodb.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark for bulk player validation.
+
+Validates a batch of raw player JSON into insert-ready documents four ways:
+one ``Player`` model per row, one ``TypeAdapter(List[Player])`` call followed
+by dumping the models, and the ``PlayerDocument`` batch validation used by
+imports and ingest, parsing with the standard library and with
+``validate_json``. A fraction of the rows can be made invalid to include the
+cost of reporting them. No database or network access is needed.
+
+Usage:
+    python -m benchmarks.bench_validation [rows] [invalid_percent]
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import json
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.player import Player
+from app.services.validation import documents_adapter, validate_players_json
+
+models_adapter = TypeAdapter(List[Player])
+
+
+def per_row(data: bytes):
+    documents = []
+    for row in json.loads(data):
+        try:
+            documents.append(Player(**row).model_dump())
+        except (TypeError, ValidationError):
+            pass
+    return documents
+
+
+def model_batch(data: bytes):
+    rows = json.loads(data)
+    try:
+        players = models_adapter.validate_python(rows)
+    except ValidationError as e:
+        invalid = {error["loc"][0] for error in e.errors()}
+        players = models_adapter.validate_python([row for index, row in enumerate(rows) if index not in invalid])
+    return models_adapter.dump_python(players)
+
+
+def document_batch(data: bytes):
+    return validate_players_json(data)[0]
+
+
+def document_batch_validate_json(data: bytes):
+    try:
+        return documents_adapter.validate_json(data)
+    except ValidationError:
+        return validate_players_json(data)[0]
+
+
+def run(name: str, validate, data: bytes, rows: int, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        documents = validate(data)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<36} valid={len(documents):>7}  elapsed={best:6.3f}s  rows/s={rows / best:10.0f}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    invalid_percent = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    every = int(100 / invalid_percent) if invalid_percent else 0
+    players = [
+        {"id": i, "Player": f"Player {i}", "AgeThatYear": str(20 + i % 20), "Hits": i % 262,
+         "Year": 1900 + i % 125, "Bats": str(300 + i % 400), "Rank": str(i)}
+        for i in range(rows)
+    ]
+    if every:
+        for player in players[::every]:
+            player["Hits"] = "many"
+    data = json.dumps(players).encode()
+    
+    print(f"{rows} rows, {invalid_percent:g}% invalid")
+    run("Player model per row", per_row, data, rows)
+    run("List[Player] + model_dump", model_batch, data, rows)
+    run("List[PlayerDocument]", document_batch, data, rows)
+    run("List[PlayerDocument] validate_json", document_batch_validate_json, data, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for running the Baseball Stats Dashboard API in production.
+
+Runs one Uvicorn worker process per available CPU (overridable with
+WEB_CONCURRENCY), or a single one while events, jobs or players are kept in
+process memory (EVENT_SOURCE=local, JOB_STORE=memory, PLAYER_REPOSITORY=memory).
+Each worker opens its own MongoDB connection in the FastAPI lifespan handler,
+after the fork, so no client or socket is shared between processes.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from app.core.config import settings
+from app.core.workers import configured_worker_count
+
+bind = f"0.0.0.0:{settings.PORT}"
+workers = configured_worker_count(settings)
+worker_class = "app.core.workers.ProductionUvicornWorker"
+
+# Import the application once in the master so import errors fail the boot
+# and workers start from an already-loaded copy of the code
+preload_app = settings.PRELOAD_APP
+
+# On SIGTERM, stop accepting connections and give in-flight requests this
+# long to finish before workers are killed
+graceful_timeout = settings.GRACEFUL_TIMEOUT
+timeout = settings.GRACEFUL_TIMEOUT * 2
+keepalive = settings.KEEPALIVE_TIMEOUT
+
+accesslog = "-"
+errorlog = "-"
@@ -2,7 +2,8 @@
 Pytest fixtures for the Baseball Stats Dashboard backend.
 
 This module provides fixtures for testing the FastAPI application, including
-mocking MongoDB connections and other dependencies.
+mocking MongoDB connections and other dependencies, and an in-memory player
+repository for tests that need working storage.
 
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
@@ -16,6 +17,9 @@ os.environ["TESTING"] = "true"
 
 from app.main import app
 from app.db.mongodb import get_collection
+from app.services.changes import Reservation
+from app.services.query_cache import get_query_cache
+from app.services.repository import InMemoryPlayerRepository, get_player_repository
 
 
 @pytest.fixture
@@ -43,8 +47,8 @@ def mock_collection():
     # Create an AsyncMock for the collection
     mock = AsyncMock()
     
-    # Configure find_one to be an AsyncMock that can be awaited
-    mock.find_one = AsyncMock()
+    # Configure find_one to be an AsyncMock that can be awaited (finding nothing by default)
+    mock.find_one = AsyncMock(return_value=None)
     
     # Configure find to return a cursor with to_list method
     mock_cursor = AsyncMock()
@@ -58,10 +62,12 @@ def mock_collection():
     mock.delete_one = AsyncMock()
     mock.count_documents = AsyncMock()
     
-    # Apply the patch to the get_collection function
+    # Back the MongoDB player repository with the mock, for reads and writes
     with patch("app.db.mongodb.get_collection", return_value=mock):
-        with patch("app.api.routes.players.get_collection", return_value=mock):
-            yield mock
+        with patch("app.db.mongodb.get_read_collection", return_value=mock):
+            with patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(1, 1, 0))):
+                with patch("app.services.repository.record_deletion", AsyncMock()):
+                    yield mock
 
 
 @pytest.fixture(autouse=True)
@@ -76,9 +82,11 @@ def mock_mongodb_connection():
     mock_client = AsyncMock()
     mock_db = AsyncMock()
     
-    # Configure the mocks
+    # Configure the mocks; collections find nothing by default
+    mock_db_collection = AsyncMock()
+    mock_db_collection.find_one.return_value = None
     mock_client.__getitem__ = MagicMock(return_value=mock_db)
-    mock_db.__getitem__ = MagicMock(return_value=AsyncMock())
+    mock_db.__getitem__ = MagicMock(return_value=mock_db_collection)
     
     # Mock the admin command to avoid actual MongoDB connection
     mock_admin = AsyncMock()
@@ -89,4 +97,28 @@ def mock_mongodb_connection():
     with patch('motor.motor_asyncio.AsyncIOMotorClient', return_value=mock_client):
         with patch('app.db.mongodb.client', mock_client):
             with patch('app.db.mongodb.db', mock_db):
-                yield
+                with patch('app.db.mongodb.read_db', mock_db):
+                    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    """
+    Drop cached query results after each test, so they don't leak into the next one.
+    """
+    yield
+    get_query_cache().invalidate()
+
+
+@pytest.fixture
+def memory_repository():
+    """
+    Serve player routes from an in-memory repository.
+    
+    Returns:
+        InMemoryPlayerRepository: The repository the routes will use.
+    """
+    repository = InMemoryPlayerRepository()
+    app.dependency_overrides[get_player_repository] = lambda: repository
+    yield repository
+    app.dependency_overrides.pop(get_player_repository, None)
@@ -1,15 +1,29 @@
 """
 Tests for the AI integration module.
 
-This module contains tests for the OpenAI integration used to generate player descriptions.
+This module contains tests for the language model integration used to generate player descriptions.
 
 Copyright (c) 2025 Ken Johansen. All rights reserved.
 """
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from app.api.routes.players import generate_player_description
+import fakeredis
+from fakeredis import aioredis
+
+from app.api.routes.players import generate_player_description, stream_player_description
 from app.models.player import Player
+from app.services.llm import DescriptionBatcher, OpenAIProvider, TemplateProvider
+from app.services.shared_cache import SharedCache
+
+
+def _openai_batcher(client):
+    """
+    Create a description batcher sending requests to the given OpenAI client.
+    """
+    return DescriptionBatcher(OpenAIProvider(client=client))
 
 
 @pytest.mark.asyncio
@@ -37,19 +51,22 @@ async def test_generate_player_description():
     mock_completion = MagicMock()
     mock_completion.choices = [MagicMock()]
     mock_completion.choices[0].text = "Mike Trout is one of the best players in baseball, combining power, speed, and defensive prowess."
+    mock_completion.choices[0].index = 0
     
     # Create a mock OpenAI client
     mock_client = MagicMock()
     mock_client.completions.create = AsyncMock(return_value=mock_completion)
     
     # Patch the OpenAI API call
-    with patch("app.api.routes.players.openai_client", mock_client):
+    with patch("app.services.llm.description_batcher", _openai_batcher(mock_client)):
         # Call the function
         description = await generate_player_description(player_dict)
         
         # Verify the result
-        assert "Mike Trout" in description
-        assert len(description) > 0
+        assert description == mock_completion.choices[0].text
+        assert mock_client.completions.create.call_args.kwargs["prompt"][0].startswith(
+            "Write a detailed description for the baseball player: Mike Trout."
+        )
 
 
 @pytest.mark.asyncio
@@ -78,7 +95,7 @@ async def test_generate_player_description_error_handling():
     mock_client.completions.create = AsyncMock(side_effect=Exception("API Error"))
     
     # Patch the OpenAI API call
-    with patch("app.api.routes.players.openai_client", mock_client):
+    with patch("app.services.llm.description_batcher", _openai_batcher(mock_client)):
         # Call the function
         description = await generate_player_description(player_dict)
         
@@ -87,3 +104,210 @@ async def test_generate_player_description_error_handling():
         assert player_dict["Player"] in description
         assert str(player_dict["Hits"]) in description
         assert player_dict["AgeThatYear"] in description
+
+
+def _stream_of(*texts, error=None):
+    """
+    Create a stand-in for stream_player_description yielding the given texts.
+    """
+    async def stream(player):
+        for text in texts:
+            yield text
+        if error is not None:
+            raise error
+    return stream
+
+
+def _events(body: str):
+    """
+    Parse a server-sent events body into (event, data) pairs.
+    """
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+TROUT = {
+    "id": 1,
+    "Player": "Mike Trout",
+    "AgeThatYear": "29",
+    "Hits": 147,
+    "Year": 2021,
+    "Bats": "333",
+    "Rank": "1"
+}
+
+
+@pytest.mark.asyncio
+async def test_stream_player_description_yields_chunks():
+    """
+    Test that streamed completion chunks are yielded as they arrive.
+    """
+    async def chunks():
+        for text in ["Mike", " Trout", ""]:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock(text=text)]
+            yield chunk
+    
+    mock_client = MagicMock()
+    mock_client.completions.create = AsyncMock(return_value=chunks())
+    
+    with patch("app.services.llm.description_provider", OpenAIProvider(client=mock_client)):
+        texts = [text async for text in stream_player_description(TROUT)]
+    
+    assert texts == ["Mike", " Trout"]
+    assert mock_client.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_stream_describe_player(test_client, mock_collection):
+    """
+    Test that tokens are streamed as events and the full text is cached at the end.
+    """
+    mock_collection.find_one.return_value = dict(TROUT)
+    
+    with patch("app.api.routes.players.stream_player_description", _stream_of("Mike", " Trout", " rocks.")):
+        response = test_client.get("/api/players/description/1/stream")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [data["text"] for event, data in events if event == "token"] == ["Mike", " Trout", " rocks."]
+    assert events[-1] == ("done", {"description": "Mike Trout rocks."})
+    mock_collection.update_one.assert_awaited_once_with(
+        {"id": 1}, {"$set": {"description": "Mike Trout rocks."}}
+    )
+
+
+def test_stream_describe_player_interrupted(test_client, mock_collection):
+    """
+    Test that a stream failing part way ends with an error and caches nothing.
+    """
+    mock_collection.find_one.return_value = dict(TROUT)
+    
+    with patch("app.api.routes.players.stream_player_description", _stream_of("Mike", error=Exception("API Error"))):
+        response = test_client.get("/api/players/description/1/stream")
+    
+    assert _events(response.text)[-1][0] == "error"
+    mock_collection.update_one.assert_not_awaited()
+
+
+def test_stream_describe_player_reuses_shared_description(test_client, mock_collection):
+    """
+    Test that a description streamed on one pod is sent whole by another
+    pod, without generating it again.
+    """
+    server = fakeredis.FakeServer()
+    pods = [SharedCache(aioredis.FakeRedis(server=server)) for _ in range(2)]
+    mock_collection.find_one.return_value = dict(TROUT, _seq=4)
+    
+    with patch("app.api.routes.players.get_shared_cache", return_value=pods[0]), \
+            patch("app.api.routes.players.stream_player_description", _stream_of("Mike", " Trout", " rocks.")):
+        test_client.get("/api/players/description/1/stream")
+    
+    with patch("app.api.routes.players.get_shared_cache", return_value=pods[1]), \
+            patch("app.api.routes.players.stream_player_description", _stream_of(error=Exception("API Error"))):
+        response = test_client.get("/api/players/description/1/stream")
+    
+    assert _events(response.text) == [
+        ("token", {"text": "Mike Trout rocks."}),
+        ("done", {"description": "Mike Trout rocks."}),
+    ]
+
+
+def test_describe_player_returns_description_when_saving_fails(test_client, mock_collection):
+    """
+    Test that a generated description is returned even if caching it on the player fails.
+    """
+    mock_collection.find_one.return_value = dict(TROUT)
+    mock_collection.update_one.side_effect = Exception("Write timed out")
+    
+    with patch("app.api.routes.players.generate_player_description", AsyncMock(return_value="Mike Trout rocks.")):
+        response = test_client.get("/api/players/description/1")
+    
+    assert response.status_code == 200
+    assert response.json()["description"] == "Mike Trout rocks."
+
+
+@pytest.mark.asyncio
+async def test_batcher_sends_concurrent_requests_together():
+    """
+    Test that concurrent description requests are sent as one batch, in order.
+    """
+    provider = TemplateProvider()
+    provider.describe_many = AsyncMock(side_effect=lambda players: [p["Player"] for p in players])
+    batcher = DescriptionBatcher(provider, max_batch_size=8, max_wait=0.01)
+    players = [dict(TROUT, id=i, Player=f"Player {i}") for i in range(3)]
+    
+    descriptions = await asyncio.gather(*(batcher.describe(p) for p in players))
+    
+    assert descriptions == ["Player 0", "Player 1", "Player 2"]
+    provider.describe_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_full_batches():
+    """
+    Test that a batch is sent as soon as it is full, and errors reach every caller.
+    """
+    provider = TemplateProvider()
+    provider.describe_many = AsyncMock(side_effect=Exception("API Error"))
+    batcher = DescriptionBatcher(provider, max_batch_size=2, max_wait=10)
+    
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.describe(TROUT), batcher.describe(TROUT), return_exceptions=True),
+        timeout=1,
+    )
+    
+    assert all(isinstance(result, Exception) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_batcher_fails_only_callers_without_a_description():
+    """
+    Test that a missing or failed description only fails its own caller.
+    """
+    provider = TemplateProvider()
+    provider.describe_many = AsyncMock(return_value=["Player 0", Exception("Bad prompt"), ""])
+    batcher = DescriptionBatcher(provider, max_batch_size=4, max_wait=0.01)
+    players = [dict(TROUT, id=i) for i in range(4)]
+    
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.describe(p) for p in players), return_exceptions=True),
+        timeout=1,
+    )
+    
+    assert results[0] == "Player 0"
+    assert str(results[1]) == "Bad prompt"
+    assert all(isinstance(result, RuntimeError) for result in results[2:])
+    assert not batcher._sending
+
+
+@pytest.mark.asyncio
+async def test_openai_provider_orders_choices_by_index():
+    """
+    Test that multi-prompt completions are matched to players by choice index.
+    """
+    completion = MagicMock()
+    completion.choices = [MagicMock(index=1, text=" second "), MagicMock(index=0, text="first")]
+    client = MagicMock()
+    client.completions.create = AsyncMock(return_value=completion)
+    
+    descriptions = await OpenAIProvider(client=client).describe_many([TROUT, TROUT])
+    
+    assert descriptions == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_template_provider_is_deterministic():
+    """
+    Test that the offline provider streams the same text it returns in batches.
+    """
+    provider = TemplateProvider()
+    
+    [description] = await provider.describe_many([TROUT])
+    streamed = "".join([text async for text in provider.stream_description(TROUT)])
+    
+    assert description == streamed
+    assert "Mike Trout recorded 147 hits in the 2021 season" in description
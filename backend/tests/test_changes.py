@@ -0,0 +1,299 @@
+"""
+Tests for change tracking and the incremental sync endpoint.
+
+This module tests the change sequence, tombstones and the
+GET /api/players/changes endpoint.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pymongo import ReturnDocument
+
+from app.services.changes import Reservation, committed_change_seq, get_changes_since, stamp_unsequenced_players
+from app.services.repository import MotorPlayerRepository, _matches
+
+TROUT = {"id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "333", "Rank": "1"}
+BETTS = {"id": 2, "Player": "Mookie Betts", "AgeThatYear": "28", "Hits": 160, "Year": 2018, "Bats": "346", "Rank": "2"}
+
+
+def _collection_returning(docs):
+    """
+    Create a mock collection whose find().sort().to_list() returns docs.
+    """
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.sort.return_value.to_list = AsyncMock(return_value=docs)
+    collection.find.return_value = cursor
+    return collection
+
+
+def _counters_at(seq, pending=()):
+    """
+    Create a mock counters collection holding the given sequence value and pending reservations.
+    """
+    counters = MagicMock()
+    counters.find_one = AsyncMock(return_value={"seq": seq, "pending": [{"first": first, "at": time.time()} for first in pending]})
+    return counters
+
+
+def _evaluate(expression, document, variables=None):
+    """
+    Evaluate the aggregation expressions used by the change sequence updates.
+    """
+    variables = variables or {}
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, *path = expression[2:].split(".")
+        value = variables[name]
+        for field in path:
+            value = value.get(field)
+        return value
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, list):
+        return [_evaluate(item, document, variables) for item in expression]
+    if isinstance(expression, dict) and len(expression) == 1 and next(iter(expression)).startswith("$"):
+        [(operator, operand)] = expression.items()
+        if operator == "$filter":
+            items = _evaluate(operand["input"], document, variables)
+            return [item for item in items if _evaluate(operand["cond"], document, dict(variables, this=item))]
+        args = _evaluate(operand, document, variables)
+        return {
+            "$add": lambda *values: sum(values),
+            "$concatArrays": lambda *arrays: [item for array in arrays for item in array],
+            "$gte": lambda a, b: a >= b,
+            "$ifNull": lambda value, default: default if value is None else value,
+        }[operator](*args)
+    if isinstance(expression, dict):
+        return {key: _evaluate(value, document, variables) for key, value in expression.items()}
+    return expression
+
+
+class FakeCounters:
+    """
+    Counters collection applying the pipeline updates reserving change sequence values.
+    """
+    def __init__(self):
+        self.document = None
+    
+    async def find_one_and_update(self, query, pipeline, upsert, return_document):
+        before = self.document
+        document = dict(before or query)
+        for stage in pipeline:
+            document.update(_evaluate(stage["$set"], document))
+        self.document = document
+        return before if return_document == ReturnDocument.BEFORE else document
+    
+    async def update_one(self, query, update):
+        first = update["$pull"]["pending"]["first"]
+        self.document["pending"] = [entry for entry in self.document["pending"] if entry["first"] != first]
+    
+    async def find_one(self, query, session=None):
+        return self.document
+
+
+class FakePlayers:
+    """
+    Players collection whose inserts can be held until released.
+    """
+    def __init__(self):
+        self.documents = []
+        self.held = {}
+    
+    async def insert_one(self, document):
+        if document["id"] in self.held:
+            started, release = self.held[document["id"]]
+            started.set()
+            await release.wait()
+        self.documents.append(dict(document))
+        return MagicMock(acknowledged=True)
+    
+    def find(self, query, projection=None, session=None):
+        matches = [dict(document) for document in self.documents if _matches(document, query)]
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(side_effect=lambda length=None: matches[:length])
+        cursor.sort.return_value.to_list = AsyncMock(return_value=sorted(matches, key=lambda document: document.get("_seq", 0)))
+        return cursor
+    
+    async def bulk_write(self, requests, ordered=True):
+        modified = 0
+        for request in requests:
+            for document in self.documents:
+                if _matches(document, request._filter):
+                    document.update(request._doc["$set"])
+                    modified += 1
+                    break
+        return MagicMock(modified_count=modified)
+
+
+@pytest.mark.asyncio
+async def test_get_changes_since_merges_in_sequence_order():
+    """
+    Test that upserts and deletions are merged in change sequence order.
+    """
+    players = _collection_returning([
+        {"id": 1, "Player": "Mike Trout", "_seq": 5},
+        {"id": 2, "Player": "Mookie Betts", "_seq": 8},
+    ])
+    tombstones = _collection_returning([{"id": 3, "_seq": 6}])
+    
+    collections = {None: players, "PlayerTombstones": tombstones, "Counters": _counters_at(8)}
+    with patch("app.services.changes.get_read_collection", side_effect=lambda name=None: collections[name]):
+        changes = await get_changes_since(4, limit=2)
+    
+    assert changes["seq"] == 6
+    assert [p["id"] for p in changes["upserted"]] == [1]
+    assert changes["deleted"] == [3]
+    assert changes["has_more"] is True
+    assert players.find.call_args[0] == ({"_seq": {"$gt": 4, "$lte": 8}}, {"_id": 0})
+    # Both reads share one causally consistent session
+    assert players.find.call_args[1]["session"] is tombstones.find.call_args[1]["session"]
+
+
+@pytest.mark.asyncio
+async def test_get_changes_since_no_changes():
+    """
+    Test that the sequence value is unchanged when nothing has changed.
+    """
+    empty = _collection_returning([])
+    collections = {None: empty, "PlayerTombstones": empty, "Counters": _counters_at(12, pending=[11])}
+    
+    with patch("app.services.changes.get_read_collection", side_effect=lambda name=None: collections[name]):
+        changes = await get_changes_since(10, limit=100)
+    
+    assert changes == {"seq": 10, "upserted": [], "deleted": [], "has_more": False}
+    empty.find.assert_not_called()
+
+
+def test_committed_change_seq():
+    """
+    Test that the committed value stays below the oldest pending reservation,
+    unless that reservation was abandoned.
+    """
+    now = time.time()
+    
+    assert committed_change_seq(None) == 0
+    assert committed_change_seq({"seq": 9, "pending": []}) == 9
+    assert committed_change_seq({"seq": 9, "pending": [{"first": 8, "at": now}, {"first": 5, "at": now}]}) == 4
+    assert committed_change_seq({"seq": 9, "pending": [{"first": 5, "at": now - 3600}, {"first": 8, "at": now}]}) == 7
+
+
+@pytest.mark.asyncio
+async def test_write_finishing_late_is_not_skipped():
+    """
+    Test that when a write commits after a later-reserved one, clients
+    following the change sequence still receive it.
+    """
+    counters, players = FakeCounters(), FakePlayers()
+    empty = _collection_returning([])
+    collections = {None: players, "PlayerTombstones": empty, "Counters": counters}
+    repository = MotorPlayerRepository(players, players)
+    started, release = asyncio.Event(), asyncio.Event()
+    players.held[1] = (started, release)
+    
+    with patch("app.services.changes.get_counters_collection", return_value=counters), \
+            patch("app.services.changes.get_read_collection", side_effect=lambda name=None: collections[name]):
+        # Trout reserves value 1 but commits after Betts, who gets value 2
+        trout = asyncio.create_task(repository.insert(TROUT))
+        await asyncio.wait_for(started.wait(), timeout=1)
+        betts = await repository.insert(BETTS)
+        
+        while_pending = await repository.changes_since(0, 10)
+        snapshot_seq, _ = await repository.snapshot(10)
+        release.set()
+        await trout
+        after = await repository.changes_since(while_pending["seq"], 10)
+    
+    assert betts["_seq"] == 2
+    assert betts["_resume_seq"] == 0
+    assert while_pending == {"seq": 0, "upserted": [], "deleted": [], "has_more": False}
+    assert snapshot_seq == 0
+    assert [player["id"] for player in after["upserted"]] == [1, 2]
+    assert after["seq"] == 2
+    assert counters.document["pending"] == []
+
+
+def test_get_player_changes_endpoint(test_client):
+    """
+    Test the GET /api/players/changes endpoint.
+    """
+    changes = {
+        "seq": 12,
+        "upserted": [{
+            "id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147,
+            "Year": 2021, "Bats": "333", "Rank": "1", "_seq": 12,
+        }],
+        "deleted": [4],
+        "has_more": False,
+    }
+    
+    with patch("app.services.repository.get_changes_since", AsyncMock(return_value=changes)) as mock_changes:
+        response = test_client.get("/api/players/changes?since=7")
+    
+    assert response.status_code == 200
+    assert response.json()["seq"] == 12
+    assert response.json()["deleted"] == [4]
+    assert "_seq" not in response.json()["upserted"][0]
+    mock_changes.assert_awaited_once_with(7, 1000, None)
+
+
+def test_delete_player_records_tombstone(test_client, mock_collection):
+    """
+    Test that deleting a player records a tombstone with a new sequence value.
+    """
+    delete_result = MagicMock()
+    delete_result.deleted_count = 1
+    mock_collection.delete_one.return_value = delete_result
+    
+    with patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(21, 21, 20))):
+        with patch("app.services.repository.record_deletion", AsyncMock()) as mock_record:
+            response = test_client.delete("/api/players/3")
+    
+    assert response.status_code == 200
+    mock_record.assert_awaited_once_with({"id": 3, "_seq": 21, "_resume_seq": 20})
+
+
+def test_update_player_stamps_sequence(test_client, mock_collection):
+    """
+    Test that updating a player stores a new change sequence value on it.
+    """
+    player = {
+        "id": 2, "Player": "Mookie Betts", "AgeThatYear": "28", "Hits": 160,
+        "Year": 2021, "Bats": "305", "Rank": "10",
+    }
+    mock_collection.find_one.return_value = player
+    update_result = MagicMock()
+    update_result.modified_count = 1
+    mock_collection.replace_one.return_value = update_result
+    
+    with patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(30, 30, 29))):
+        response = test_client.put("/api/players/2", json=player)
+    
+    assert response.status_code == 200
+    assert mock_collection.replace_one.call_args[0][1]["_seq"] == 30
+
+
+@pytest.mark.asyncio
+async def test_players_without_sequence_are_stamped():
+    """
+    Test that players written before change tracking get sequence values in
+    batches, so change reads starting from 0 return them.
+    """
+    counters, players = FakeCounters(), FakePlayers()
+    players.documents = [dict(TROUT, _id="a"), dict(BETTS, _id="b"), dict(TROUT, id=3, _id="c", _seq=7)]
+    empty = _collection_returning([])
+    collections = {None: players, "PlayerTombstones": empty, "Counters": counters}
+    
+    with patch("app.services.changes.get_counters_collection", return_value=counters), \
+            patch("app.services.changes.get_read_collection", side_effect=lambda name=None: collections[name]):
+        assert await stamp_unsequenced_players(players, batch_size=1) == 2
+        assert await stamp_unsequenced_players(players) == 0
+        changes = await get_changes_since(0, 10)
+    
+    assert [(player["id"], player["_seq"]) for player in players.documents] == [(1, 1), (2, 2), (3, 7)]
+    assert players.documents[1]["_resume_seq"] == 1
+    assert [player["id"] for player in changes["upserted"]] == [1, 2]
+    assert counters.document["pending"] == []
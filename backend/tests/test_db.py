@@ -8,8 +8,17 @@ Copyright (c) 2025 Ken Johansen. All rights reserved.
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 import os
+from pymongo.errors import DuplicateKeyError
 
-from app.db.mongodb import get_collection, connect_to_mongo, close_mongo_connection
+from app.db.mongodb import (
+    build_read_preference,
+    build_write_concern,
+    close_mongo_connection,
+    connect_to_mongo,
+    create_unique_index,
+    get_collection,
+    get_read_collection,
+)
 
 
 @pytest.mark.asyncio
@@ -96,3 +105,50 @@ async def test_close_mongo_connection():
         
         # Verify the client was closed
         mock_client.close.assert_called_once()
+
+
+def test_build_read_preference():
+    """
+    Test that read preferences are built with the max staleness, except for primary reads.
+    """
+    preference = build_read_preference("secondaryPreferred", 120)
+    
+    assert preference.mongos_mode == "secondaryPreferred"
+    assert preference.max_staleness == 120
+    assert build_read_preference("primary", 120).mongos_mode == "primary"
+    with pytest.raises(ValueError):
+        build_read_preference("secondaries", -1)
+
+
+def test_build_write_concern():
+    """
+    Test that the write concern accepts a tag set name or a member count.
+    """
+    assert build_write_concern("majority", 5000).document == {"w": "majority", "wtimeout": 5000}
+    assert build_write_concern("2", 1000).document == {"w": 2, "wtimeout": 1000}
+
+
+def test_get_read_collection():
+    """
+    Test that read handles come from the secondary-eligible database.
+    """
+    mock_read_db = MagicMock()
+    mock_read_collection = MagicMock()
+    
+    with patch("app.db.mongodb.read_db", mock_read_db):
+        with patch("app.db.mongodb.read_collection", mock_read_collection):
+            assert get_read_collection() is mock_read_collection
+            assert get_read_collection("Counters") is mock_read_db["Counters"]
+
+
+@pytest.mark.asyncio
+async def test_create_unique_index_duplicates():
+    """
+    Test that a unique index blocked by duplicate documents fails with an explanation.
+    """
+    target = MagicMock()
+    target.name = "Players"
+    target.create_index = AsyncMock(side_effect=DuplicateKeyError("E11000 duplicate key error", 11000))
+    
+    with pytest.raises(RuntimeError, match="duplicate values"):
+        await create_unique_index(target, "id")
@@ -0,0 +1,133 @@
+"""
+Tests for live player change events.
+
+This module tests the event bus fan-out, subscriber filters, slow-consumer
+handling and the server-sent events stream.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.changes import Reservation
+from app.services.events import EventBus, event_stream
+
+TROUT = {"id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "333", "Rank": "1"}
+ICHIRO = {"id": 2, "Player": "Ichiro Suzuki", "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "318", "Rank": "1"}
+
+
+def _drain(subscription):
+    frames = []
+    while not subscription.queue.empty():
+        frames.append(subscription.queue.get_nowait()[0])
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_publish_serializes_once_for_all_subscribers():
+    """
+    Test that every subscriber receives the very same serialized frame.
+    """
+    bus = EventBus()
+    first = bus.subscribe()
+    second = bus.subscribe(years=[2021])
+    
+    bus.publish_upsert(TROUT, seq=5)
+    
+    [frame_a] = _drain(first)
+    [frame_b] = _drain(second)
+    assert frame_a is frame_b
+    assert frame_a.startswith(b"id: 5\nevent: upserted\n")
+    assert b'"Player":"Mike Trout"' in frame_a
+
+
+@pytest.mark.asyncio
+async def test_subscription_filters():
+    """
+    Test that season and player filters only receive matching events.
+    """
+    bus = EventBus()
+    season_2004 = bus.subscribe(years=[2004])
+    trout = bus.subscribe(ids=[1])
+    
+    bus.publish_upsert(TROUT, seq=1)
+    bus.publish_upsert(ICHIRO, seq=2)
+    bus.publish_delete(1, seq=3)
+    
+    assert len(_drain(season_2004)) == 2  # Ichiro's upsert and the deletion
+    assert len(_drain(trout)) == 2  # Trout's upsert and deletion
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_resync():
+    """
+    Test that a subscriber whose buffer overflows is told to resync.
+    """
+    bus = EventBus(buffer_size=2)
+    subscription = bus.subscribe()
+    
+    bus.publish_upsert(TROUT, seq=1)
+    assert await subscription.next_frame()
+    for seq in range(2, 6):
+        bus.publish_upsert(TROUT, seq=seq)
+    
+    frames = _drain(subscription)
+    assert subscription.lagged == 1
+    assert any(b"event: resync" in frame and b'"since":1' in frame for frame in frames)
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe():
+    """
+    Test that unsubscribing removes the subscription from every index.
+    """
+    bus = EventBus()
+    subscription = bus.subscribe(years=[2021], ids=[1])
+    assert bus.subscriber_count == 1
+    
+    bus.unsubscribe(subscription)
+    
+    assert bus.subscriber_count == 0
+    bus.publish_upsert(TROUT, seq=1)
+    assert subscription.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_event_stream_yields_frames():
+    """
+    Test that the event stream yields published frames and unsubscribes when closed.
+    """
+    bus = EventBus()
+    subscription = bus.subscribe()
+    
+    with patch("app.services.events.event_bus", bus):
+        stream = event_stream(subscription)
+        assert (await stream.__anext__()).startswith(b"retry:")
+        
+        bus.publish_delete(7, seq=9)
+        frame = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        await stream.aclose()
+    
+    assert b"event: deleted" in frame
+    assert bus.subscriber_count == 0
+
+
+def test_add_player_publishes_event(test_client, mock_collection):
+    """
+    Test that adding a player publishes an upsert event.
+    """
+    insert_result = MagicMock()
+    insert_result.acknowledged = True
+    mock_collection.insert_one.return_value = insert_result
+    mock_collection.find_one.return_value = None
+    bus = EventBus()
+    subscription = bus.subscribe(years=[2021])
+    
+    with patch("app.api.routes.players.get_event_bus", return_value=bus):
+        with patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(11, 11, 10))):
+            response = test_client.post("/api/players/1", json=TROUT)
+    
+    assert response.status_code == 201
+    [frame] = _drain(subscription)
+    assert frame.startswith(b"id: 10\nevent: upserted\n")
@@ -0,0 +1,128 @@
+"""
+Tests for bulk player export.
+
+This module tests the CSV, Parquet and Arrow exporters and the
+GET /api/players/export endpoint.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import csv
+import io
+import pytest
+from unittest.mock import MagicMock
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.services.export import build_player_filter, export_players
+
+
+class FakeCursor:
+    """
+    Stand-in for a Motor cursor supporting chaining and ``async for``.
+    """
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def sort(self, *args):
+        return self
+    
+    def batch_size(self, n):
+        return self
+    
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+PLAYERS = [
+    {"id": i, "Player": f"Player {i}", "AgeThatYear": 25 + i % 10, "Hits": 100 + i, "Year": 2000 + i % 20, "Bats": "L", "Rank": str(i)}
+    for i in range(25)
+]
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_build_player_filter():
+    """
+    Test that query parameters are turned into a MongoDB filter.
+    """
+    assert build_player_filter() == {}
+    assert build_player_filter(year=2004) == {"Year": 2004}
+    assert build_player_filter(year_min=2000, year_max=2010, min_hits=200) == {
+        "Year": {"$gte": 2000, "$lte": 2010},
+        "Hits": {"$gte": 200},
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_csv():
+    """
+    Test that the CSV export has a header and one line per player.
+    """
+    data = await _collect(export_players(FakeCursor(PLAYERS), "csv", batch_size=10))
+    
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert len(rows) == 25
+    assert rows[3]["Player"] == "Player 3"
+
+
+@pytest.mark.asyncio
+async def test_export_arrow_writes_record_batches():
+    """
+    Test that the Arrow export is a valid IPC stream with one record batch per cursor batch.
+    """
+    chunks = [chunk async for chunk in export_players(FakeCursor(PLAYERS), "arrow", batch_size=10)]
+    
+    reader = pa.ipc.open_stream(b"".join(chunks))
+    batches = list(reader)
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    table = pa.Table.from_batches(batches)
+    assert table.column("Hits").to_pylist() == [p["Hits"] for p in PLAYERS]
+    assert table.column("AgeThatYear").type == pa.string()
+
+
+@pytest.mark.asyncio
+async def test_export_parquet_writes_row_groups():
+    """
+    Test that the Parquet export is a valid file with one row group per cursor batch.
+    """
+    data = await _collect(export_players(FakeCursor(PLAYERS), "parquet", batch_size=10))
+    
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().column("id").to_pylist() == list(range(25))
+
+
+def test_export_endpoint(test_client, mock_collection):
+    """
+    Test the GET /api/players/export endpoint with filters.
+    """
+    mock_collection.find = MagicMock(return_value=FakeCursor(PLAYERS[:2]))
+    
+    response = test_client.get("/api/players/export?format=csv&year_min=2000")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "players.csv" in response.headers["content-disposition"]
+    assert response.text.splitlines()[0] == "id,Player,AgeThatYear,Hits,Year,Bats,Rank"
+    query, projection = mock_collection.find.call_args[0]
+    assert query == {"Year": {"$gte": 2000}}
+    assert projection["_id"] == 0
+
+
+def test_export_endpoint_rejects_unknown_format(test_client, mock_collection):
+    """
+    Test that an unsupported format is rejected.
+    """
+    response = test_client.get("/api/players/export?format=xlsx")
+    
+    assert response.status_code == 422
@@ -0,0 +1,117 @@
+"""
+Tests for the health endpoints and admission control.
+
+This module tests the /healthz and /readyz endpoints and the load-shedding
+middleware.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import (
+    AdmissionController,
+    AdmissionControlMiddleware,
+    ConcurrencyBudget,
+)
+
+
+def test_healthz(test_client):
+    """
+    Test the /healthz endpoint when MongoDB is reachable.
+    """
+    with patch("app.api.routes.health.ping_mongo", return_value=True):
+        response = test_client.get("/healthz")
+    
+    assert response.status_code == 200
+    assert response.json()["mongodb"]["reachable"] is True
+    assert "headroom" in response.json()["mongodb"]["pool"]
+    assert "default" in response.json()["admission"]
+
+
+def test_healthz_mongo_unreachable(test_client):
+    """
+    Test the /healthz endpoint when MongoDB cannot be reached.
+    """
+    with patch("app.api.routes.health.ping_mongo", return_value=False):
+        response = test_client.get("/healthz")
+    
+    assert response.status_code == 503
+    assert response.json()["mongodb"]["reachable"] is False
+
+
+def test_readyz_pool_exhausted(test_client):
+    """
+    Test that /readyz reports not ready when the connection pool has no headroom.
+    """
+    pool = {"max_size": 10, "in_use": 10, "headroom": 0}
+    with patch("app.api.routes.health.ping_mongo", return_value=True):
+        with patch("app.api.routes.health.get_pool_stats", return_value=pool):
+            response = test_client.get("/readyz")
+    
+    assert response.status_code == 503
+    assert response.json()["status"] == "mongodb pool exhausted"
+
+
+def test_concurrency_budget():
+    """
+    Test that a budget rejects requests once its limit is reached.
+    """
+    budget = ConcurrencyBudget("test", limit=1)
+    
+    assert budget.try_acquire() is True
+    assert budget.try_acquire() is False
+    assert budget.shed == 1
+    
+    budget.release()
+    assert budget.try_acquire() is True
+
+
+def _limited_app(controller: AdmissionController) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, retry_after=3)
+    
+    @app.get("/api/players/")
+    async def players():
+        return []
+    
+    @app.get("/api/players/description/1")
+    async def description():
+        return {}
+    
+    @app.get("/readyz")
+    async def readyz():
+        return {}
+    
+    return app
+
+
+def test_admission_sheds_with_retry_after():
+    """
+    Test that requests over budget get 503 with a Retry-After header.
+    """
+    controller = AdmissionController(default_limit=0, exempt_paths={"/readyz"})
+    client = TestClient(_limited_app(controller))
+    
+    response = client.get("/api/players/")
+    
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert client.get("/readyz").status_code == 200
+
+
+def test_admission_separate_prefix_budget():
+    """
+    Test that a prefix budget is independent of the default budget.
+    """
+    controller = AdmissionController(
+        default_limit=10,
+        prefix_limits={"/api/players/description/": 0},
+    )
+    client = TestClient(_limited_app(controller))
+    
+    assert client.get("/api/players/description/1").status_code == 503
+    assert client.get("/api/players/").status_code == 200
+    assert controller.default.in_flight == 0
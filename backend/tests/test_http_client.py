@@ -0,0 +1,205 @@
+"""
+Tests for the outbound HTTP client.
+
+This module tests retries, backoff and the circuit breaker against a local
+stub HTTP server, and the player ingest that uses them.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core import http_client
+from app.core.config import settings
+from app.core.http_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    get_circuit_breaker,
+    get_with_retries,
+)
+from app.services.player_jobs import ingest_players
+from app.services.repository import InMemoryPlayerRepository
+
+
+class StubServer:
+    """
+    Local HTTP server replying with a scripted sequence of responses.
+    
+    Each response is a (status, body) tuple; the last one is repeated once
+    the script runs out.
+    """
+    def __init__(self):
+        self.responses = [(200, [])]
+        self.requests = 0
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                index = min(stub.requests, len(stub.responses) - 1)
+                status, body = stub.responses[index]
+                stub.requests += 1
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/baseball"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest_asyncio.fixture
+async def shared_client():
+    """
+    Start the shared HTTP client with near-zero backoff for fast tests.
+    """
+    with patch.object(settings, "HTTP_BACKOFF_BASE", 0.001):
+        http_client.circuit_breakers.clear()
+        await http_client.start_http_client()
+        yield
+        await http_client.close_http_client()
+        http_client.circuit_breakers.clear()
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors(stub_server, shared_client):
+    """
+    Test that retryable responses are retried until the request succeeds.
+    """
+    stub_server.responses = [(503, {}), (502, {}), (200, {"ok": True})]
+    
+    response = await get_with_retries(stub_server.url)
+    
+    assert response.json() == {"ok": True}
+    assert stub_server.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors(stub_server, shared_client):
+    """
+    Test that a 4xx response fails immediately without retrying.
+    """
+    stub_server.responses = [(404, {})]
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        await get_with_retries(stub_server.url)
+    
+    assert stub_server.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_failures(stub_server, shared_client):
+    """
+    Test that the circuit opens once retries are exhausted, failing fast after that.
+    """
+    stub_server.responses = [(503, {})]
+    
+    with patch.object(settings, "HTTP_RETRIES", 1):
+        with patch.object(settings, "CIRCUIT_FAILURE_THRESHOLD", 1):
+            with pytest.raises(httpx.HTTPStatusError):
+                await get_with_retries(stub_server.url)
+            with pytest.raises(CircuitOpenError):
+                await get_with_retries(stub_server.url)
+    
+    assert stub_server.requests == 2
+
+
+def test_circuit_breaker_half_open():
+    """
+    Test that an open circuit lets a single trial request through after the reset timeout.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.allow_request() is False
+    
+    now[0] = 10.0
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_ends(stub_server, shared_client):
+    """
+    Test that a half-open trial request that is cancelled lets the next request through.
+    """
+    breaker = get_circuit_breaker(stub_server.url)
+    breaker.opened_at = breaker.clock() - breaker.reset_timeout
+    sent = asyncio.Event()
+    
+    async def hang(url, **kwargs):
+        sent.set()
+        await asyncio.Event().wait()
+    
+    with patch.object(http_client.http_client, "get", hang):
+        trial = asyncio.create_task(get_with_retries(stub_server.url))
+        await asyncio.wait_for(sent.wait(), timeout=1)
+        assert breaker.allow_request() is False
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+    
+    response = await get_with_retries(stub_server.url)
+    
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_backoff_delay_is_capped():
+    """
+    Test that the jittered backoff never exceeds the configured maximum.
+    """
+    for attempt in range(1, 20):
+        assert 0 <= backoff_delay(attempt) <= settings.HTTP_BACKOFF_MAX
+
+
+@pytest.mark.asyncio
+async def test_ingest_players_from_stub(stub_server, shared_client):
+    """
+    Test that ingest fetches players through the shared client and fills in missing ranks.
+    """
+    stub_server.responses = [(500, {}), (200, [
+        {"id": 1, "Player": "Ichiro Suzuki", "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "L", "Rank": ""},
+    ])]
+    repository = InMemoryPlayerRepository()
+    
+    with patch.object(settings, "BASEBALL_API_URL", stub_server.url):
+        loaded = await ingest_players(repository)
+    
+    assert loaded == 1
+    assert (await repository.get(1))["Rank"] == "262"
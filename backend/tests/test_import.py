@@ -0,0 +1,196 @@
+"""
+Tests for bulk player import.
+
+This module tests reading and validating uploaded files chunk by chunk, the
+bulk upsert of valid players and the POST /api/players/import endpoint.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import io
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymongo.errors import BulkWriteError
+
+from app.services.changes import Reservation
+from app.services.importer import detect_import_format, import_players, read_chunks, validate_chunk
+from app.services.repository import InMemoryPlayerRepository, MotorPlayerRepository
+
+PLAYERS = [
+    {"id": i, "Player": f"Player {i}", "AgeThatYear": str(25 + i % 10), "Hits": 100 + i, "Year": 2000 + i % 20, "Bats": "L", "Rank": str(i)}
+    for i in range(1, 8)
+]
+
+CSV_DATA = (
+    "id,Player,AgeThatYear,Hits,Year,Bats,Rank\n"
+    "1,Ichiro Suzuki,30,262,2004,L,1\n"
+    "2,George Sisler,27,not a number,1920,L,2\n"
+    "3,Bill Terry,31,254,1930,L,3\n"
+).encode()
+
+
+def bulk_result(upserted=0, modified=0):
+    result = MagicMock()
+    result.upserted_count = upserted
+    result.modified_count = modified
+    return result
+
+
+@pytest.fixture
+def mock_change_seq():
+    with patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(100, 100, 99))) as mock:
+        yield mock
+
+
+def test_detect_import_format():
+    """
+    Test that the format is detected from the file name, then the content type.
+    """
+    assert detect_import_format("players.CSV", "application/octet-stream") == "csv"
+    assert detect_import_format("players.jsonl", None) == "ndjson"
+    assert detect_import_format("upload", "application/vnd.apache.parquet") == "parquet"
+    assert detect_import_format("players.xlsx", None) is None
+
+
+def test_read_chunks_csv():
+    """
+    Test that CSV files are read in chunks of at most batch_size rows.
+    """
+    chunks = list(read_chunks(io.BytesIO(CSV_DATA), "csv", batch_size=2))
+    
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0][0]["Player"] == "Ichiro Suzuki"
+
+
+def test_read_chunks_parquet():
+    """
+    Test that Parquet files are read batch by batch.
+    """
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(PLAYERS), buffer)
+    buffer.seek(0)
+    
+    chunks = list(read_chunks(buffer, "parquet", batch_size=3))
+    
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert chunks[2][0] == PLAYERS[6]
+
+
+def test_validate_chunk_reports_invalid_rows():
+    """
+    Test that invalid and unparsable rows are reported by row number and the rest kept.
+    """
+    rows = list(read_chunks(io.BytesIO(b'{"id": 1}\nnot json\n' + json.dumps(PLAYERS[0]).encode()), "ndjson", 10))[0]
+    
+    documents, errors = validate_chunk(rows, first_row=11)
+    
+    assert documents == [PLAYERS[0]]
+    assert [error["row"] for error in errors] == [11, 12]
+    assert {error["field"] for error in errors[0]["errors"]} == {"Player", "AgeThatYear", "Hits", "Year", "Bats", "Rank"}
+    assert errors[1]["errors"][0]["message"].startswith("Invalid JSON")
+
+
+@pytest.mark.asyncio
+async def test_import_players_writes_one_unordered_bulk_per_chunk(mock_change_seq):
+    """
+    Test that each chunk is written with one unordered bulk upsert stamped with change sequences.
+    """
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(return_value=bulk_result(upserted=1, modified=0))
+    
+    repository = MotorPlayerRepository(collection, collection)
+    result = await import_players(repository, io.BytesIO(CSV_DATA), "csv", batch_size=2, max_errors=10)
+    
+    assert collection.bulk_write.await_count == 2
+    requests = collection.bulk_write.call_args_list[0][0][0]
+    assert collection.bulk_write.call_args_list[0][1] == {"ordered": False}
+    assert len(requests) == 1
+    assert requests[0]._filter == {"id": 1}
+    assert requests[0]._upsert is True
+    assert requests[0]._doc["_seq"] == 100
+    assert result["processed"] == 3
+    assert result["inserted"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert result["errors"][0]["errors"][0]["field"] == "Hits"
+
+
+@pytest.mark.asyncio
+async def test_import_players_reports_write_errors(mock_change_seq):
+    """
+    Test that bulk write errors are mapped back to row numbers.
+    """
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(side_effect=BulkWriteError({
+        "nUpserted": 1,
+        "nModified": 0,
+        "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}],
+    }))
+    
+    repository = MotorPlayerRepository(collection, collection)
+    result = await import_players(repository, io.BytesIO(CSV_DATA), "csv", batch_size=10, max_errors=10)
+    
+    assert result["inserted"] == 1
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    assert result["errors"][1]["errors"][0]["message"] == "duplicate key"
+
+
+@pytest.mark.asyncio
+async def test_import_players_truncates_error_report(mock_change_seq):
+    """
+    Test that at most max_errors row errors are reported.
+    """
+    data = b"\n".join(b'{"id": "x"}' for _ in range(5))
+    
+    result = await import_players(InMemoryPlayerRepository(), io.BytesIO(data), "ndjson", batch_size=2, max_errors=3)
+    
+    assert result["failed"] == 5
+    assert len(result["errors"]) == 3
+    assert result["errors_truncated"] is True
+
+
+def test_import_endpoint(test_client, mock_collection):
+    """
+    Test the POST /api/players/import endpoint with a CSV upload.
+    """
+    mock_collection.bulk_write = AsyncMock(return_value=bulk_result(upserted=1, modified=1))
+    
+    response = test_client.post(
+        "/api/players/import",
+        files={"file": ("players.csv", CSV_DATA, "text/csv")},
+    )
+    
+    assert response.status_code == 200
+    result = response.json()
+    assert result["processed"] == 3
+    assert result["inserted"] == 1
+    assert result["updated"] == 1
+    assert result["errors"][0]["row"] == 2
+
+
+def test_import_endpoint_rejects_unknown_format(test_client, mock_collection):
+    """
+    Test that an upload whose format cannot be detected is rejected.
+    """
+    response = test_client.post(
+        "/api/players/import",
+        files={"file": ("players.xlsx", b"data", "application/octet-stream")},
+    )
+    
+    assert response.status_code == 400
+
+
+def test_import_endpoint_rejects_unreadable_parquet(test_client, mock_collection):
+    """
+    Test that a file that is not valid Parquet is rejected.
+    """
+    response = test_client.post(
+        "/api/players/import?format=parquet",
+        files={"file": ("players.parquet", b"not parquet", "application/octet-stream")},
+    )
+    
+    assert response.status_code == 400
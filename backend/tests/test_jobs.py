@@ -0,0 +1,275 @@
+"""
+Tests for the background job runner and job API endpoints.
+
+This module tests job submission, execution, progress reporting and the
+player data job handlers.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from app.services.jobs import InMemoryJobStore, JobQueueFull, JobRunner
+from app.services.player_jobs import run_description_backfill, run_ingest
+from app.services.repository import InMemoryPlayerRepository
+
+TROUT = {"id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "333", "Rank": "1"}
+
+
+async def _count_to_three(params, report):
+    for i in range(1, 4):
+        await report(i, 3)
+    return {"counted": 3}
+
+
+async def _fail(params, report):
+    raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+async def test_job_runner_runs_job():
+    """
+    Test that a submitted job runs to completion and records progress and result.
+    """
+    runner = JobRunner(InMemoryJobStore(), {"count": _count_to_three}, workers=1)
+    await runner.start()
+    try:
+        job = await runner.submit("count", {})
+        assert job["status"] == "queued"
+        
+        await asyncio.wait_for(runner.join(), timeout=1)
+        job = await runner.get(job["id"])
+    finally:
+        await runner.stop()
+    
+    assert job["status"] == "succeeded"
+    assert job["progress"] == {"done": 3, "total": 3}
+    assert job["result"] == {"counted": 3}
+
+
+@pytest.mark.asyncio
+async def test_job_runner_records_failure():
+    """
+    Test that a failing job is marked failed with its error.
+    """
+    runner = JobRunner(InMemoryJobStore(), {"fail": _fail}, workers=1)
+    await runner.start()
+    try:
+        job = await runner.submit("fail", {})
+        await asyncio.wait_for(runner.join(), timeout=1)
+        job = await runner.get(job["id"])
+    finally:
+        await runner.stop()
+    
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_job_runner_rejects_when_full():
+    """
+    Test that submitting to a full queue raises JobQueueFull.
+    """
+    runner = JobRunner(InMemoryJobStore(), {"count": _count_to_three}, queue_size=1)
+    
+    await runner.submit("count", {})
+    with pytest.raises(JobQueueFull):
+        await runner.submit("count", {})
+    with pytest.raises(ValueError):
+        await runner.submit("unknown", {})
+
+
+@pytest.mark.asyncio
+async def test_job_store_claims_once():
+    """
+    Test that a queued job can only be claimed by one worker.
+    """
+    store = InMemoryJobStore()
+    runner = JobRunner(store, {"count": _count_to_three})
+    job = await runner.submit("count", {})
+    
+    lease_until = datetime.now(timezone.utc) + timedelta(seconds=60)
+    
+    assert await store.claim(job["id"], "a", lease_until) is not None
+    assert await store.claim(job["id"], "b", lease_until) is None
+
+
+@pytest.mark.asyncio
+async def test_running_job_keeps_its_lease():
+    """
+    Test that a job whose runner keeps renewing its lease is not reclaimed,
+    while one whose lease expired is queued again.
+    """
+    store = InMemoryJobStore()
+    started = asyncio.Event()
+    
+    async def slow(params, report):
+        started.set()
+        await asyncio.sleep(0.2)
+        return {}
+    
+    runner = JobRunner(store, {"slow": slow}, workers=1, lease_duration=0.06)
+    await runner.start()
+    try:
+        job = await runner.submit("slow", {})
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await asyncio.sleep(0.12)
+        assert await store.recover(datetime.now(timezone.utc)) == []
+        await asyncio.wait_for(runner.join(), timeout=1)
+    finally:
+        await runner.stop()
+    assert (await store.get(job["id"]))["status"] == "succeeded"
+    
+    dead = await JobRunner(store, {"slow": slow}).submit("slow", {})
+    await store.claim(dead["id"], "dead", datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert await store.recover(datetime.now(timezone.utc)) == [dead["id"]]
+
+
+class FlakyJobStore(InMemoryJobStore):
+    """In-memory store whose first claim fails, like a store timing out."""
+    def __init__(self):
+        super().__init__()
+        self.claims = 0
+    
+    async def claim(self, job_id, owner, lease_until):
+        self.claims += 1
+        if self.claims == 1:
+            raise TimeoutError("Timed out claiming the job")
+        return await super().claim(job_id, owner, lease_until)
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_store_errors():
+    """
+    Test that a store error does not stop the worker, and the job is run once recovery queues it again.
+    """
+    store = FlakyJobStore()
+    runner = JobRunner(store, {"count": _count_to_three}, workers=1, lease_duration=0.1)
+    await runner.start()
+    try:
+        job = await runner.submit("count", {})
+        for _ in range(50):
+            if (await store.get(job["id"]))["status"] == "succeeded":
+                break
+            await asyncio.sleep(0.02)
+        second = await runner.submit("count", {})
+        await asyncio.wait_for(runner.join(), timeout=1)
+    finally:
+        await runner.stop()
+    
+    assert (await store.get(job["id"]))["status"] == "succeeded"
+    assert (await store.get(second["id"]))["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_recovered_while_running():
+    """
+    Test that a running runner picks up a job whose lease expired after it started.
+    """
+    store = InMemoryJobStore()
+    dead = await JobRunner(store, {"count": _count_to_three}).submit("count", {})
+    await store.claim(dead["id"], "dead", datetime.now(timezone.utc) + timedelta(seconds=0.1))
+    
+    runner = JobRunner(store, {"count": _count_to_three}, workers=1, lease_duration=0.1)
+    await runner.start()
+    try:
+        await asyncio.sleep(0.02)
+        assert (await store.get(dead["id"]))["status"] == "running"
+        for _ in range(50):
+            if (await store.get(dead["id"]))["status"] == "succeeded":
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await runner.stop()
+    
+    assert (await store.get(dead["id"]))["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_recovery_waits_for_room_in_the_queue():
+    """
+    Test that every recovered job is run, even when there are more than the queue holds.
+    """
+    store = InMemoryJobStore()
+    submitter = JobRunner(store, {"count": _count_to_three}, queue_size=10)
+    jobs = [await submitter.submit("count", {}) for _ in range(5)]
+    
+    runner = JobRunner(store, {"count": _count_to_three}, workers=1, queue_size=2, lease_duration=10)
+    await runner.start()
+    try:
+        for _ in range(50):
+            if [(await store.get(job["id"]))["status"] for job in jobs] == ["succeeded"] * 5:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await runner.stop()
+    
+    assert [(await store.get(job["id"]))["status"] for job in jobs] == ["succeeded"] * 5
+
+
+def test_submit_and_get_job(test_client):
+    """
+    Test the POST /api/jobs/ and GET /api/jobs/{id} endpoints.
+    """
+    repository = InMemoryPlayerRepository([TROUT])
+    with patch("app.services.player_jobs.create_player_repository", return_value=repository):
+        response = test_client.post("/api/jobs/", json={"type": "ingest"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        
+        response = test_client.get(f"/api/jobs/{job_id}")
+    
+    assert response.status_code == 200
+    assert response.json()["type"] == "ingest"
+
+
+def test_get_job_not_found(test_client):
+    """
+    Test the GET /api/jobs/{id} endpoint for an unknown job.
+    """
+    response = test_client.get("/api/jobs/does-not-exist")
+    
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_run_ingest_skips_populated_collection():
+    """
+    Test that the ingest job does nothing if players are already loaded.
+    """
+    repository = InMemoryPlayerRepository([TROUT])
+    
+    with patch("app.services.player_jobs.create_player_repository", return_value=repository):
+        with patch("app.services.player_jobs.ingest_players") as mock_ingest:
+            result = await run_ingest({}, AsyncMock())
+    
+    assert result["loaded"] == 0
+    mock_ingest.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_description_backfill():
+    """
+    Test that the backfill job stores generated descriptions and counts failures.
+    """
+    betts = dict(TROUT, id=2, Player="Mookie Betts")
+    described = dict(TROUT, id=3, Player="Bryce Harper", description="Already described.")
+    repository = InMemoryPlayerRepository([TROUT, betts, described])
+    
+    async def generate(player, fallback=True):
+        if player["id"] == 2:
+            raise RuntimeError("API Error")
+        return f"{player['Player']} is great."
+    
+    report = AsyncMock()
+    with patch("app.services.player_jobs.create_player_repository", return_value=repository):
+        with patch("app.api.routes.players.generate_player_description", side_effect=generate):
+            result = await run_description_backfill({}, report)
+    
+    assert result == {"described": 1, "failed": 1}
+    assert (await repository.get(1))["description"] == "Mike Trout is great."
+    assert "description" not in await repository.get(2)
+    assert (await repository.get(3))["description"] == "Already described."
+    report.assert_awaited_with(2, 2)
@@ -0,0 +1,201 @@
+"""
+Tests for time-partitioned player storage.
+
+This module tests routing filters to decade partitions, the sealed partition
+cache and how the partitioned repository spreads reads and writes across
+partition collections.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import pytest
+from collections import defaultdict
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.changes import Reservation
+from app.services.partitions import (
+    PartitionRouter,
+    PartitionedPlayerRepository,
+    SealedPartitionCache,
+    is_sealed,
+    parse_partition_name,
+    partition_name,
+    year_range,
+)
+
+RUTH = {"id": 1, "Player": "Babe Ruth", "AgeThatYear": "26", "Hits": 204, "Year": 1921, "Bats": "L", "Rank": "1"}
+TROUT = {"id": 2, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "R", "Rank": "2"}
+
+
+class FakeCursor:
+    """
+    Async iterable standing in for a Motor cursor.
+    """
+    def __init__(self, documents):
+        self.documents = documents
+    
+    def sort(self, *args):
+        return self
+    
+    def limit(self, limit):
+        self.documents = self.documents[:limit]
+        return self
+    
+    def batch_size(self, size):
+        return self
+    
+    async def to_list(self, length):
+        return self.documents[:length]
+    
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+def make_database(partitions):
+    """
+    Create a mock database whose partition collections hold the given players.
+    """
+    collections = defaultdict(MagicMock)
+    for name, documents in partitions.items():
+        collections[name].find = MagicMock(side_effect=lambda *args, documents=documents, **kwargs: FakeCursor(list(documents)))
+        collections[name].count_documents = AsyncMock(return_value=len(documents))
+    database = MagicMock()
+    database.__getitem__.side_effect = lambda name: collections[name]
+    database.list_collection_names = AsyncMock(return_value=list(partitions))
+    return database, collections
+
+
+def test_partition_names():
+    """
+    Test that partition collection names round-trip to decades.
+    """
+    assert partition_name(1990) == "Players_1990s"
+    assert parse_partition_name("Players_1990s") == 1990
+    assert parse_partition_name("Players") is None
+    assert parse_partition_name("PlayerPartitions") is None
+
+
+def test_year_range():
+    """
+    Test that Year conditions are turned into inclusive season ranges.
+    """
+    assert year_range({}) == (None, None)
+    assert year_range({"Year": 2004}) == (2004, 2004)
+    assert year_range({"Year": {"$gt": 1999, "$lt": 2010}}) == (2000, 2009)
+    assert year_range({"Year": {"$in": [1921, 2021]}}) == (None, None)
+
+
+def test_router_picks_overlapping_decades():
+    """
+    Test that only partitions overlapping a filter's seasons are searched.
+    """
+    router = PartitionRouter([1920, 1990, 2000, 2010, 2020])
+    
+    assert router.route({"Year": {"$gte": 2005}}) == [2000, 2010, 2020]
+    assert router.route({"Year": 1921}) == [1920]
+    assert router.route({"Year": {"$lt": 1990}}) == [1920]
+    assert router.route({"Hits": {"$gte": 200}}) == [1920, 1990, 2000, 2010, 2020]
+
+
+def test_is_sealed():
+    """
+    Test that decades are sealed once they ended more than PARTITION_SEAL_AFTER_YEARS ago.
+    """
+    assert is_sealed(2010, current_year=2022)
+    assert not is_sealed(2010, current_year=2021)
+    assert not is_sealed(2020, current_year=2026)
+
+
+def test_sealed_partition_cache_expires_and_evicts():
+    """
+    Test that cached entries expire, the least recently used is evicted and
+    results read across an invalidation are not cached.
+    """
+    now = [0.0]
+    cache = SealedPartitionCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    a, b, c = (cache.key(1990, "count", n) for n in range(3))
+    
+    cache.put(a, 1)
+    cache.put(b, 2)
+    assert cache.get(a) == (True, 1)
+    cache.put(c, 3)
+    assert cache.get(b) == (False, None)
+    
+    now[0] = 10
+    assert cache.get(a) == (False, None)
+    
+    generation = cache.generation(1990)
+    cache.invalidate(1990)
+    cache.put(a, 1, generation)
+    assert cache.get(a) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_find_reads_routed_partitions_and_caches_sealed_ones():
+    """
+    Test that find only queries matching partitions and serves sealed ones from cache.
+    """
+    database, collections = make_database({"Players_1920s": [RUTH], "Players_2020s": [TROUT]})
+    cache = SealedPartitionCache(max_entries=10, ttl=60)
+    repository = PartitionedPlayerRepository(database, database, PartitionRouter(refresh_interval=60), cache)
+    
+    assert [p["id"] async for p in repository.find({})] == [1, 2]
+    assert [p["id"] async for p in repository.find({})] == [1, 2]
+    assert [p["id"] async for p in repository.find({"Year": {"$gte": 2020}})] == [2]
+    
+    assert collections["Players_1920s"].find.call_count == 1
+    assert collections["Players_2020s"].find.call_count == 3
+    assert database.list_collection_names.await_count == 1
+    
+    assert await repository.count({}) == 2
+    assert await repository.count({}) == 2
+    assert collections["Players_1920s"].count_documents.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_changes_since_reads_partitions_created_elsewhere():
+    """
+    Test that change reads find a partition another process created since
+    the partition list was last refreshed.
+    """
+    database, collections = make_database({"Players_1920s": [dict(RUTH, _seq=3)], "PlayerTombstones": []})
+    router = PartitionRouter(refresh_interval=60)
+    await router.refresh(database)
+    repository = PartitionedPlayerRepository(database, database, router, SealedPartitionCache(10, 60), session=MagicMock())
+    
+    database.list_collection_names.return_value = ["Players_1920s", "Players_2020s", "PlayerTombstones"]
+    collections["Players_2020s"].find = MagicMock(return_value=FakeCursor([dict(TROUT, _seq=4)]))
+    with patch("app.services.partitions.current_change_seq", AsyncMock(return_value=4)):
+        changes = await repository.changes_since(2, 10)
+    
+    assert [player["id"] for player in changes["upserted"]] == [1, 2]
+    assert changes["seq"] == 4
+    assert router.decades == {1920, 2020}
+
+
+@pytest.mark.asyncio
+async def test_replace_moves_player_to_new_decade():
+    """
+    Test that changing a player's season to another decade moves them between partitions.
+    """
+    database, collections = make_database({"Players_1920s": [RUTH]})
+    directory = collections["PlayerPartitions"]
+    directory.find_one = AsyncMock(return_value={"id": 1, "decade": 1920})
+    directory.bulk_write = AsyncMock()
+    collections["Players_1930s"].insert_one = AsyncMock(return_value=MagicMock(acknowledged=True))
+    collections["Players_1920s"].delete_one = AsyncMock()
+    repository = PartitionedPlayerRepository(database, database, PartitionRouter([1920]), SealedPartitionCache(10, 60))
+    
+    with patch("app.services.partitions.create_partition_indexes", AsyncMock()) as create_indexes, \
+            patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(7, 7, 6))):
+        document = await repository.replace(1, dict(RUTH, Year=1931))
+    
+    assert document["_seq"] == 7
+    create_indexes.assert_awaited_once_with(collections["Players_1930s"])
+    collections["Players_1930s"].insert_one.assert_awaited_once()
+    collections["Players_1920s"].delete_one.assert_awaited_once_with({"id": 1})
+    update = directory.bulk_write.call_args[0][0][0]
+    assert update._doc == {"$set": {"decade": 1930}}
+    assert repository.router.decades == {1920, 1930}
@@ -0,0 +1,100 @@
+"""
+Tests for the query result cache.
+
+This module tests key normalization, size-bounded eviction, expiry and
+write-version and change sequence invalidation of the cache, and that the
+player list is served from it until the next write.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+from app.services.query_cache import QueryCache, get_query_cache
+
+TROUT = {"id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "333", "Rank": "1"}
+
+
+def test_key_ignores_parameter_order_and_missing_values():
+    """
+    Test that equivalent requests map to the same key.
+    """
+    assert QueryCache.key("players", year=2022, sort="Hits", limit=None) == QueryCache.key("players", sort="Hits", year=2022)
+    assert QueryCache.key("players", year=2022) != QueryCache.key("players", year=2021)
+
+
+def test_evicts_least_recently_used_by_size():
+    """
+    Test that entries are evicted, least recently used first, once the cached bytes exceed the limit.
+    """
+    cache = QueryCache(max_bytes=2500, ttl=60)
+    for name in ("a", "b", "c", "d"):
+        cache.put(name, b"x" * 400, {}, cache.version)
+    cache.get("a")
+    cache.put("e", b"x" * 400, {}, cache.version)
+    
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"x" * 400
+    assert cache.bytes <= 2500
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hit_ratio"] == round(2 / 3, 4)
+
+
+def test_expiry_and_write_version():
+    """
+    Test that entries expire, that a write drops them, that a result read across a write is not cached,
+    and that entries computed before the current change sequence value are out of date.
+    """
+    now = [0.0]
+    cache = QueryCache(max_bytes=10000, ttl=30, clock=lambda: now[0])
+    cache.put("a", b"[]", {}, cache.version)
+    now[0] = 30
+    assert cache.get("a") is None
+    
+    cache.put("a", b"[]", {}, cache.version)
+    version = cache.version
+    cache.invalidate()
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+    
+    cache.put("a", b"[]", {}, version)
+    assert cache.get("a") is None
+    
+    cache.put("a", b"[]", {}, cache.version, seq=5)
+    assert cache.get("a", seq=5) is not None
+    assert cache.get("a", seq=6) is None
+
+
+def test_player_list_served_from_cache_until_write(test_client, memory_repository):
+    """
+    Test that the player list is cached, serialized without internal fields, and refreshed after a write.
+    """
+    test_client.post("/api/players/1", json=TROUT)
+    
+    first = test_client.get("/api/players/")
+    second = test_client.get("/api/players/")
+    
+    assert first.content == second.content
+    assert second.headers["X-Change-Seq"] == "1"
+    assert first.json() == [TROUT]
+    assert get_query_cache().stats()["hits"] >= 1
+    
+    test_client.put("/api/players/1", json=dict(TROUT, Hits=150))
+    response = test_client.get("/api/players/")
+    
+    assert response.json()[0]["Hits"] == 150
+    assert response.headers["X-Change-Seq"] == "2"
+
+
+def test_player_list_refreshed_after_write_by_another_worker(test_client, memory_repository):
+    """
+    Test that a cached list is recomputed once the committed change sequence
+    value moves, even when this worker did not make the write.
+    """
+    test_client.post("/api/players/1", json=TROUT)
+    assert test_client.get("/api/players/").json() == [TROUT]
+    
+    # Another worker's write moves the shared sequence without invalidating this worker's cache
+    memory_repository._players[1] = dict(TROUT, Hits=150, _seq=2)
+    memory_repository._seq = 2
+    response = test_client.get("/api/players/")
+    
+    assert response.json()[0]["Hits"] == 150
+    assert response.headers["X-Change-Seq"] == "2"
@@ -0,0 +1,116 @@
+"""
+Tests for the player repository.
+
+This module tests the in-memory player repository, the player endpoints
+served from it through the repository dependency, and how the MongoDB
+repository uses sessions.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.services.repository import InMemoryPlayerRepository, MotorPlayerRepository, PlayerRepository, get_player_repository
+
+TROUT = {"id": 1, "Player": "Mike Trout", "AgeThatYear": "29", "Hits": 147, "Year": 2021, "Bats": "333", "Rank": "1"}
+BETTS = {"id": 2, "Player": "Mookie Betts", "AgeThatYear": "28", "Hits": 160, "Year": 2018, "Bats": "346", "Rank": "2"}
+
+
+def test_repository_interface_is_abstract():
+    """
+    Test that a backend missing part of the repository interface cannot be created.
+    """
+    class Incomplete(PlayerRepository):
+        async def get(self, id, year=None):
+            return None
+
+    with pytest.raises(TypeError):
+        PlayerRepository()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_tracks_changes():
+    """
+    Test that writes are stamped with change sequence values and deletions leave tombstones.
+    """
+    repository = InMemoryPlayerRepository([TROUT])
+
+    await repository.insert(BETTS)
+    await repository.replace(1, dict(TROUT, Hits=150))
+    assert await repository.delete(2) == {"id": 2, "_seq": 4, "_resume_seq": 3}
+    assert await repository.delete(2) is None
+
+    changes = await repository.changes_since(1, limit=10)
+    assert changes["seq"] == 4
+    assert [p["Hits"] for p in changes["upserted"]] == [150]
+    assert changes["deleted"] == [2]
+    seq, players = await repository.snapshot(10)
+    assert seq == 4
+    assert [p["id"] for p in players] == [1]
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_find_filters_and_projects():
+    """
+    Test that find applies filters and field selection, in ID order.
+    """
+    repository = InMemoryPlayerRepository([BETTS, TROUT])
+
+    found = [p async for p in repository.find({"Year": {"$gte": 2020}}, fields=("id", "Player"))]
+
+    assert found == [{"id": 1, "Player": "Mike Trout"}]
+    assert await repository.count({"description": {"$exists": False}}) == 2
+    assert [p["id"] async for p in repository.find({})] == [1, 2]
+
+
+def test_player_crud_with_memory_repository(test_client, memory_repository):
+    """
+    Test the player endpoints end to end against the in-memory repository.
+    """
+    assert test_client.post("/api/players/1", json=TROUT).status_code == 201
+    assert test_client.post("/api/players/1", json=TROUT).status_code == 400
+    assert test_client.put("/api/players/1", json=dict(TROUT, Hits=150)).status_code == 200
+    assert test_client.get("/api/players/1").json()["Hits"] == 150
+
+    response = test_client.get("/api/players/")
+    assert response.headers["X-Change-Seq"] == "2"
+    assert len(response.json()) == 1
+
+    assert test_client.delete("/api/players/1").status_code == 200
+    assert test_client.get("/api/players/1").status_code == 404
+    assert test_client.get("/api/players/changes?since=2").json()["deleted"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_motor_repository_runs_in_session():
+    """
+    Test that a repository created with a session passes it to every operation.
+    """
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=TROUT)
+    collection.update_one = AsyncMock()
+    session = object()
+    repository = MotorPlayerRepository(collection, collection, session=session)
+
+    await repository.get(1)
+    await repository.set_description(1, "A great player.")
+
+    assert collection.find_one.call_args.kwargs == {"session": session}
+    assert collection.update_one.call_args.kwargs == {"session": session}
+
+
+@pytest.mark.asyncio
+async def test_dependency_opens_causal_session_per_request(mock_collection):
+    """
+    Test that the dependency runs each request in its own session when enabled.
+    """
+    with patch.object(settings, "MONGO_CAUSAL_SESSIONS", True):
+        dependency = get_player_repository()
+        repository = await dependency.__anext__()
+        await dependency.aclose()
+
+    assert isinstance(repository, MotorPlayerRepository)
+    assert repository.session is not None
@@ -0,0 +1,157 @@
+"""
+Tests for sharded cluster support.
+
+This module tests that lookups and writes by ID carry the shard key fields
+they know, that queries are classified as targeted or scatter-gather, and
+that the players collection is sharded on the configured key.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.db.sharding import SHARD_KEYS, QueryTargetingMonitor, is_targeted, player_filter, shard_players_collection
+from app.services.changes import Reservation
+from app.services.repository import MotorPlayerRepository
+
+ICHIRO = {"id": 1, "Player": "Ichiro Suzuki", "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "704", "Rank": "1"}
+
+
+class AsyncCursor:
+    """Stands in for a Motor cursor over a list of documents."""
+    def __init__(self, documents):
+        self.documents = documents
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+def test_player_filter_includes_known_shard_key_fields():
+    """
+    Test that the season is only added to player filters when the shard key includes it.
+    """
+    assert player_filter(1, 2004) == {"id": 1}
+    with patch.object(settings, "SHARD_KEY", "year_id"):
+        assert player_filter(1, 2004) == {"Year": 2004, "id": 1}
+        assert player_filter(1) == {"id": 1}
+        with patch.object(settings, "PLAYER_REPOSITORY", "partitioned"):
+            assert player_filter(1, 2004) == {"id": 1}
+
+
+def test_queries_classified_by_shard_key():
+    """
+    Test that queries limiting the leading shard key field are targeted, and others scatter-gather.
+    """
+    by_id, by_season = SHARD_KEYS["id"], SHARD_KEYS["year_id"]
+    
+    assert is_targeted({"id": 1}, by_id)
+    assert is_targeted({"id": {"$in": [1, 2]}}, by_id)
+    assert not is_targeted({"id": {"$gte": 10}}, by_id)
+    assert not is_targeted({"Year": 2004}, by_id)
+    assert is_targeted({"Year": 2004, "id": 1}, by_season)
+    assert is_targeted({"Year": {"$gte": 2000, "$lte": 2009}}, by_season)
+    assert is_targeted({"$and": [{"Year": 2004}, {"Hits": {"$gt": 200}}]}, by_season)
+    assert not is_targeted({"id": 1}, by_season)
+    assert not is_targeted({}, by_season)
+
+
+def test_monitor_reports_scatter_gather_queries():
+    """
+    Test that the monitor counts statements on the players collection by
+    operation, and scatter-gather ones by query shape.
+    """
+    monitor = QueryTargetingMonitor("Players", SHARD_KEYS["year_id"], max_shapes=2)
+    commands = [
+        ("find", {"find": "Players", "filter": {"Year": 2004, "id": 1}}),
+        ("find", {"find": "Players", "filter": {"id": 1}}),
+        ("find", {"find": "Players", "filter": {"id": 2}}),
+        ("find", {"find": "Players", "filter": {"_seq": {"$gt": 5}}}),
+        ("aggregate", {"aggregate": "Players", "pipeline": [{"$match": {}}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]}),
+        ("update", {"update": "Players", "updates": [{"q": {"Year": 2004, "id": 1}}, {"q": {"Year": 1985, "id": 2}}]}),
+        ("find", {"find": "Counters", "filter": {"_id": "players"}}),
+        ("insert", {"insert": "Players", "documents": [ICHIRO]}),
+    ]
+    for command_name, command in commands:
+        monitor.started(SimpleNamespace(command_name=command_name, command=command))
+    
+    stats = monitor.stats()
+    assert stats["targeted"] == {"find": 1, "update": 2}
+    assert stats["scatter_gather"] == {"find": 3, "aggregate": 1}
+    assert stats["scatter_gather_shapes"] == {"find {id}": 2, "find {_seq}": 1}
+
+
+@pytest.mark.asyncio
+async def test_motor_repository_writes_include_shard_key():
+    """
+    Test that with a (Year, id) shard key, writes by ID filter on the whole
+    shard key, looking up the season when it is not given.
+    """
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value={"_id": "a", "Year": 2004})
+    collection.replace_one = AsyncMock(return_value=MagicMock(modified_count=1))
+    collection.update_one = AsyncMock()
+    collection.bulk_write = AsyncMock(return_value=MagicMock(upserted_count=1, modified_count=1))
+    collection.find = MagicMock(return_value=AsyncCursor([{"id": 1, "Year": 2004}]))
+    repository = MotorPlayerRepository(collection, collection)
+    
+    with patch.object(settings, "SHARD_KEY", "year_id"), \
+            patch("app.services.changes.reserve_change_seq", AsyncMock(return_value=Reservation(10, 10, 9))):
+        await repository.get(1, year=2004)
+        await repository.replace(1, dict(ICHIRO, Year=2005), year=2004)
+        await repository.set_description(1, "Great hitter.")
+        await repository.bulk_upsert([dict(ICHIRO, Year=2005), dict(ICHIRO, id=2, Year=2001)])
+    
+    assert collection.find_one.call_args_list[0].args == ({"Year": 2004, "id": 1},)
+    assert collection.replace_one.call_args.args[0] == {"Year": 2004, "id": 1}
+    assert collection.find_one.call_args_list[1].args == ({"id": 1}, {"Year": 1})
+    assert collection.update_one.call_args.args[0] == {"Year": 2004, "id": 1}
+    requests = collection.bulk_write.call_args.args[0]
+    assert [request._filter for request in requests] == [{"Year": 2004, "id": 1}, {"Year": 2001, "id": 2}]
+
+
+@pytest.mark.asyncio
+async def test_shards_collection_once():
+    """
+    Test that the collection is sharded on the configured key, after creating
+    the shard key index, and left alone once it is sharded.
+    """
+    client = MagicMock()
+    config = client["config"]["collections"]
+    config.find_one = AsyncMock(return_value=None)
+    client.admin.command = AsyncMock()
+    collection = MagicMock()
+    collection.database.name = "Baseball"
+    collection.name = "Players"
+    collection.create_index = AsyncMock()
+    
+    with patch.object(settings, "SHARD_KEY", "year_id"):
+        await shard_players_collection(client, collection)
+        config.find_one.return_value = {"_id": "Baseball.Players", "key": {"Year": 1, "id": "hashed"}}
+        await shard_players_collection(client, collection)
+    
+    collection.create_index.assert_awaited_once_with([("Year", 1), ("id", "hashed")])
+    assert [call.args for call in client.admin.command.await_args_list] == [
+        ("enableSharding", "Baseball"),
+        ("shardCollection", "Baseball.Players"),
+    ]
+    assert client.admin.command.await_args.kwargs == {"key": {"Year": 1, "id": "hashed"}}
+
+
+def test_list_players_by_season(test_client, memory_repository):
+    """
+    Test that the player list can be limited to one season.
+    """
+    memory_repository._players = {
+        1: dict(ICHIRO, _seq=1),
+        2: dict(ICHIRO, id=2, Player="Wade Boggs", Year=1985, _seq=2),
+    }
+    memory_repository._seq = 2
+    
+    assert [player["id"] for player in test_client.get("/api/players/?year=1985").json()] == [2]
+    assert len(test_client.get("/api/players/").json()) == 2
@@ -0,0 +1,136 @@
+"""
+Tests for the shared cache tier.
+
+This module tests the Redis-backed cache against fakeredis, with two cache
+instances on one server standing in for two pods: stampede protection,
+write version announcements over pub/sub, query results shared between pods
+and falling back to computing when Redis is unreachable or failed recently.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+from fakeredis import aioredis
+
+from app.services.query_cache import QueryCache, cached_query
+from app.services.shared_cache import SharedCache
+
+
+@pytest.fixture
+def pods():
+    """
+    Two shared caches connected to the same Redis server.
+    """
+    server = fakeredis.FakeServer()
+    return (
+        SharedCache(aioredis.FakeRedis(server=server), lock_timeout=2),
+        SharedCache(aioredis.FakeRedis(server=server), lock_timeout=2),
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(pods):
+    """
+    Test that concurrent misses on different pods compute the value only once.
+    """
+    calls = 0
+    
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return b"Ichiro Suzuki set the single-season hits record."
+    
+    with patch("app.services.shared_cache.settings.SHARED_CACHE_LOCK_POLL_INTERVAL", 0.01):
+        results = await asyncio.gather(*(
+            pod.get_or_compute("bsd:description:1:5", compute, ttl=60)
+            for pod in pods * 3
+        ))
+    
+    assert calls == 1
+    assert set(results) == {b"Ichiro Suzuki set the single-season hits record."}
+
+
+@pytest.mark.asyncio
+async def test_version_bump_reaches_other_pods(pods):
+    """
+    Test that a write version bump is announced to the other pods, which drop their entries.
+    """
+    first, second = pods
+    invalidated = MagicMock()
+    second.on_invalidate(invalidated)
+    listener = asyncio.create_task(second.listen())
+    await asyncio.sleep(0.05)
+    
+    await first.bump_version()
+    for _ in range(50):
+        if second.version == 1:
+            break
+        await asyncio.sleep(0.01)
+    listener.cancel()
+    
+    assert second.version == 1
+    invalidated.assert_called_once()
+    assert first.query_key("x") == second.query_key("x")
+
+
+@pytest.mark.asyncio
+async def test_query_results_shared_between_pods(pods):
+    """
+    Test that a query computed on one pod is served to another from Redis.
+    """
+    compute = AsyncMock(return_value=(b"[]", {"X-Change-Seq": "42"}))
+    
+    for pod in pods:
+        with patch("app.services.query_cache.get_shared_cache", return_value=pod), \
+                patch("app.services.query_cache.query_cache", QueryCache(10000, 30)):
+            cached = await cached_query("players", compute, limit=1000)
+    
+    compute.assert_awaited_once()
+    assert cached.body == b"[]"
+    assert cached.headers == {"X-Change-Seq": "42"}
+
+
+@pytest.mark.asyncio
+async def test_computes_without_redis():
+    """
+    Test that values are still computed when Redis cannot be reached.
+    """
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=ConnectionError("Connection refused"))
+    cache = SharedCache(redis)
+    
+    value = await cache.get_or_compute("bsd:key", AsyncMock(return_value=b"value"), ttl=60)
+    
+    assert value == b"value"
+    assert cache.stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_skips_redis_after_an_error():
+    """
+    Test that Redis is left alone for a while after an error, then tried again.
+    """
+    now = [0.0]
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=TimeoutError("Timeout reading from redis:6379"))
+    redis.incr = AsyncMock()
+    cache = SharedCache(redis, retry_after=5, clock=lambda: now[0])
+    compute = AsyncMock(return_value=b"value")
+    
+    await cache.get_or_compute("bsd:key", compute, ttl=60)
+    await cache.get_or_compute("bsd:key", compute, ttl=60)
+    await cache.bump_version()
+    
+    assert compute.await_count == 2
+    redis.get.assert_awaited_once()
+    redis.incr.assert_not_awaited()
+    assert cache.stats()["skipped"] == 2
+    assert not cache.available
+    
+    now[0] = 5
+    await cache.get_or_compute("bsd:key", compute, ttl=60)
+    assert redis.get.await_count == 2
@@ -0,0 +1,211 @@
+"""
+Tests for similar player search.
+
+This module tests the feature vectors players are compared on, that the
+similarity index returns the same neighbours as a brute-force search as
+players change, warm starts from snapshot files, and the
+GET /api/players/{id}/similar endpoint.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import math
+import random
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.repository import InMemoryPlayerRepository
+from app.services.similarity import SimilarityIndex, feature_vector
+
+
+def make_player(id, rng):
+    return {
+        "id": id,
+        "Player": f"Player {id}",
+        "AgeThatYear": str(rng.randint(20, 40)),
+        "Hits": rng.randint(50, 260),
+        "Year": rng.randint(1900, 2024),
+        "Bats": str(rng.randint(200, 700)),
+        "Rank": str(rng.randint(1, 500)),
+    }
+
+
+def brute_force(index, id, k):
+    """
+    Get the k nearest neighbours of a player by comparing against every live row.
+    """
+    rows = np.flatnonzero(index.alive[:index.size])
+    query = index.vectors[index.row_of(id)]
+    distances = ((index.vectors[rows] - query) ** 2).sum(axis=1)
+    pairs = sorted((d, int(index.ids[row])) for d, row in zip(distances, rows) if index.ids[row] != id)
+    return [math.sqrt(d) for d, _ in pairs[:k]]
+
+
+def test_feature_vector():
+    """
+    Test that features are read as numbers, with NaN for values that are not.
+    """
+    player = {"id": 1, "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "L", "Rank": "1"}
+    
+    features = feature_vector(player)
+    
+    assert features[:3] == [262.0, 30.0, 2004.0]
+    assert math.isnan(features[3])
+    assert features[4] == 1.0
+
+
+def test_nearest_matches_brute_force_across_writes():
+    """
+    Test that the grid search finds the same neighbours as a full scan, with
+    rows in both the grid and the tail and some players removed or updated.
+    """
+    rng = random.Random(7)
+    index = SimilarityIndex()
+    for id in range(1, 20001):
+        index.upsert(make_player(id, rng))
+    index.rebuild()
+    for id in range(1, 2001, 3):
+        index.remove(id)
+    for id in range(2, 2001, 3):
+        index.upsert(make_player(id, rng))
+    for id in range(20001, 20501):
+        index.upsert(make_player(id, rng))
+    
+    assert index.size > index.sorted_end
+    for id in (2, 5000, 20400):
+        nearest = index.nearest(id, 10)
+        assert id not in [neighbour for neighbour, _ in nearest]
+        assert [d for _, d in nearest] == pytest.approx(brute_force(index, id, 10), abs=1e-4)
+    
+    assert index.nearest(1, 10) is None
+    assert len(index) == 20500 - 667
+
+
+@pytest.mark.asyncio
+async def test_refresh_follows_change_sequence():
+    """
+    Test that refreshing applies the repository's changes in batches and
+    rebuilds the grid as the number of players grows.
+    """
+    rng = random.Random(3)
+    repository = InMemoryPlayerRepository([make_player(id, rng) for id in range(1, 6)])
+    index = SimilarityIndex()
+    
+    with patch("app.services.similarity.settings.SIMILARITY_SYNC_BATCH_SIZE", 2):
+        await index.refresh(repository)
+        assert len(index) == 5
+        assert index.sorted_end == 5
+        
+        await repository.delete(1)
+        await repository.insert(make_player(6, rng))
+        await index.refresh(repository, max_age=60)
+        assert 1 in index
+        
+        await index.refresh(repository)
+    
+    assert 1 not in index
+    assert 6 in index
+    assert index.seq == 7
+
+
+@pytest.mark.asyncio
+async def test_warm_start_from_snapshot(tmp_path):
+    """
+    Test that a new index maps the snapshot written by a rebuild and only
+    replays the changes made since, answering like the index that wrote it.
+    """
+    rng = random.Random(11)
+    repository = InMemoryPlayerRepository([make_player(id, rng) for id in range(1, 3001)])
+    
+    with patch("app.services.similarity.settings.SIMILARITY_SNAPSHOT_DIR", str(tmp_path)):
+        writer = SimilarityIndex()
+        await writer.refresh(repository)
+        snapshot_seq = writer.seq
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "similarity-Baseball-Players.snap",
+            "similarity-Baseball-Players.snap.lock",
+        ]
+        
+        await repository.delete(10)
+        await repository.replace(20, make_player(20, rng))
+        await repository.insert(make_player(3001, rng))
+        await writer.refresh(repository)
+        
+        reader = SimilarityIndex()
+        with patch.object(repository, "changes_since", wraps=repository.changes_since) as changes_since:
+            await reader.refresh(repository)
+    
+    assert changes_since.call_args_list[0].args[0] == snapshot_seq
+    assert isinstance(reader.vectors, np.memmap)
+    assert reader.size > reader.sorted_end
+    assert len(reader) == len(writer) == 3000
+    assert 10 not in reader
+    for id in (20, 1500, 3001):
+        assert reader.nearest(id, 5) == writer.nearest(id, 5)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_of_other_database_ignored(tmp_path):
+    """
+    Test that a snapshot written for another database is not loaded.
+    """
+    rng = random.Random(13)
+    repository = InMemoryPlayerRepository([make_player(id, rng) for id in range(1, 11)])
+    
+    with patch("app.services.similarity.settings.SIMILARITY_SNAPSHOT_DIR", str(tmp_path)):
+        await SimilarityIndex().refresh(repository)
+        path = tmp_path / "similarity-Baseball-Players.snap"
+        with patch("app.services.similarity.settings.DATABASE_NAME", "Baseball"):
+            assert SimilarityIndex().load_snapshot(str(path))
+        with patch("app.services.similarity.settings.DATABASE_NAME", "Softball"):
+            assert not SimilarityIndex().load_snapshot(str(path))
+
+
+@pytest.mark.asyncio
+async def test_one_snapshot_writer_per_file(tmp_path):
+    """
+    Test that only the process holding the snapshot lock writes snapshots,
+    and that the others still load them.
+    """
+    rng = random.Random(17)
+    repository = InMemoryPlayerRepository([make_player(id, rng) for id in range(1, 11)])
+    
+    with patch("app.services.similarity.settings.SIMILARITY_SNAPSHOT_DIR", str(tmp_path)), \
+            patch("app.services.similarity.settings.SIMILARITY_SNAPSHOT_INTERVAL", 0):
+        writer = SimilarityIndex()
+        await writer.refresh(repository)
+        await repository.insert(make_player(11, rng))
+        
+        standby = SimilarityIndex()
+        with patch("app.services.similarity.write_snapshot") as write_snapshot:
+            await standby.refresh(repository)
+        
+        assert standby._snapshot_seq == writer.seq
+        assert 11 in standby
+        assert not standby.snapshot_due
+        write_snapshot.assert_not_called()
+        
+        await writer.refresh(repository)
+        assert writer._snapshot_seq == writer.seq == standby.seq
+
+
+def test_similar_endpoint(test_client, memory_repository):
+    """
+    Test the GET /api/players/{id}/similar endpoint.
+    """
+    rng = random.Random(5)
+    for id in range(1, 31):
+        memory_repository._players[id] = dict(make_player(id, rng), _seq=id)
+    memory_repository._seq = 30
+    
+    with patch("app.services.similarity.similarity_index", SimilarityIndex()):
+        response = test_client.get("/api/players/4/similar?k=5")
+        missing = test_client.get("/api/players/99/similar")
+    
+    assert response.status_code == 200
+    similar = response.json()
+    assert len(similar) == 5
+    assert 4 not in [player["id"] for player in similar]
+    assert [player["distance"] for player in similar] == sorted(player["distance"] for player in similar)
+    assert missing.status_code == 404
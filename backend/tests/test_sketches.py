@@ -0,0 +1,148 @@
+"""
+Tests for the season statistics sketches.
+
+This module tests the accuracy of the quantile sketches and HyperLogLogs,
+removing values and merging sketches, following the player change sequence,
+and the GET /api/stats/quantiles endpoint.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import random
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.repository import InMemoryPlayerRepository
+from app.services.sketches import HyperLogLog, QuantileSketch, SeasonSketches, SeasonStats, name_hash
+
+
+def make_player(id, rng, year=None):
+    return {
+        "id": id,
+        "Player": f"Player {id}",
+        "AgeThatYear": str(rng.randint(20, 40)),
+        "Hits": rng.randint(50, 260),
+        "Year": year or rng.randint(2000, 2009),
+        "Bats": str(rng.randint(200, 700)),
+        "Rank": str(rng.randint(1, 500)),
+    }
+
+
+def test_quantiles_within_relative_accuracy():
+    """
+    Test that quantiles are within the relative accuracy of the exact ones, including after removals.
+    """
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(4, 1, 20000)
+    sketch = QuantileSketch(0.01)
+    for value in values:
+        sketch.add(value)
+    for value in values[:5000]:
+        sketch.remove(value)
+    
+    qs = [0, 0.1, 0.5, 0.9, 0.99, 1]
+    exact = np.quantile(values[5000:], qs, method="lower")
+    
+    for estimate, value in zip(sketch.quantiles(qs), exact):
+        assert estimate == pytest.approx(value, rel=0.0201)
+    assert sketch.count == 15000
+    assert QuantileSketch().quantiles([0.5]) == [None]
+    assert QuantileSketch().quantiles([0, 1]) == [None, None]
+
+
+def test_merged_sketches_match_single_sketch():
+    """
+    Test that merging sketches built from parts, including through their
+    serialized form, gives the same answers as one sketch of everything.
+    """
+    rng = random.Random(2)
+    players = [make_player(id, rng) for id in range(1, 3001)]
+    whole = SeasonSketches()
+    parts = [SeasonSketches(), SeasonSketches()]
+    for i, player in enumerate(players):
+        values = (player["Hits"], float(player["AgeThatYear"]))
+        whole.add(player["Year"], values, name_hash(player["Player"]))
+        parts[i % 2].add(player["Year"], values, name_hash(player["Player"]))
+    
+    merged = SeasonSketches.from_dict(parts[0].to_dict())
+    merged.merge(SeasonSketches.from_dict(parts[1].to_dict()))
+    
+    assert merged.years() == whole.years() == list(range(2000, 2010))
+    for year in whole.years():
+        assert merged.counts[year] == whole.counts[year]
+        assert merged.players[year].count() == whole.players[year].count()
+        assert merged.quantile_sketches[year]["Hits"].quantiles([0.5, 0.9]) == whole.quantile_sketches[year]["Hits"].quantiles([0.5, 0.9])
+
+
+def test_hyperloglog_estimates_distinct_count():
+    """
+    Test that a HyperLogLog estimates distinct counts within a few standard errors, small and large.
+    """
+    small, large = HyperLogLog(12), HyperLogLog(12)
+    for i in range(100):
+        small.add(name_hash(f"Player {i}"))
+        small.add(name_hash(f"Player {i}"))
+    for i in range(50000):
+        large.add(name_hash(f"Player {i}"))
+    
+    assert small.count() == pytest.approx(100, abs=3)
+    assert large.count() == pytest.approx(50000, rel=0.05)
+    with pytest.raises(ValueError):
+        large.merge(HyperLogLog(10))
+
+
+@pytest.mark.asyncio
+async def test_season_stats_follow_change_sequence():
+    """
+    Test that the sketches apply inserts, updates and deletions from the change
+    sequence, and recount distinct players once enough were removed.
+    """
+    rng = random.Random(4)
+    repository = InMemoryPlayerRepository([make_player(id, rng, year=2004) for id in range(1, 101)])
+    stats = SeasonStats()
+    await stats.refresh(repository)
+    
+    for id in range(1, 41):
+        await repository.delete(id)
+    await repository.replace(50, dict(make_player(50, rng, year=2005), Hits=262))
+    with patch("app.services.sketches.MIN_STALE_REMOVALS", 10):
+        await stats.refresh(repository)
+    
+    sketches = stats.sketches
+    assert sketches.counts == {2004: 59, 2005: 1}
+    assert sketches.quantile_sketches[2005]["Hits"].quantiles([0.5])[0] == pytest.approx(262, rel=0.01)
+    assert sketches.players[2004].count() == pytest.approx(59, abs=2)
+    assert stats.seq == 141
+
+
+def test_quantiles_endpoint(test_client, memory_repository):
+    """
+    Test the GET /api/stats/quantiles endpoint, by season and combined.
+    """
+    rng = random.Random(5)
+    for id in range(1, 201):
+        memory_repository._players[id] = dict(make_player(id, rng), _seq=id)
+    memory_repository._seq = 200
+    hits = sorted(player["Hits"] for player in memory_repository._players.values())
+    
+    with patch("app.services.sketches.season_stats", SeasonStats()):
+        by_season = test_client.get("/api/stats/quantiles?q=0.5&start_year=2003&end_year=2005")
+        combined = test_client.get("/api/stats/quantiles?field=Hits&q=0&q=0.5&q=1&combined=true")
+        invalid = test_client.get("/api/stats/quantiles?q=1.5")
+        sketches = test_client.get("/api/stats/sketches")
+    
+    assert by_season.status_code == 200
+    assert [season["year"] for season in by_season.json()] == [2003, 2004, 2005]
+    
+    [entry] = combined.json()
+    assert entry["year"] is None
+    assert (entry["start_year"], entry["end_year"], entry["count"]) == (2000, 2009, 200)
+    assert entry["distinct_players"] == pytest.approx(200, abs=5)
+    assert entry["quantiles"]["0.0"] == pytest.approx(hits[0], rel=0.01)
+    assert entry["quantiles"]["0.5"] == pytest.approx(hits[99], rel=0.02)
+    assert entry["quantiles"]["1.0"] == pytest.approx(hits[-1], rel=0.01)
+    
+    assert invalid.status_code == 400
+    assert sketches.json()["seq"] == 200
+    assert len(sketches.json()["seasons"]) == 10
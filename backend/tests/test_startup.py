@@ -0,0 +1,116 @@
+"""
+Tests for application startup.
+
+This module tests the import-time cost of the application and the readiness
+endpoint used by Kubernetes probes.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.main import app, bootstrap
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budget for app.main, in microseconds. Generous enough
+# for slow CI machines, but well under what eager OpenAI/httpx imports cost.
+IMPORT_TIME_BUDGET_US = 1_500_000
+
+
+def _import_times(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with ``-X importtime``.
+    
+    Returns:
+        dict: Cumulative import time in microseconds, keyed by module name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TESTING": "true"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_skips_heavy_integrations():
+    """
+    Test that importing the application does not import openai or httpx.
+    """
+    times = _import_times("app.main")
+    
+    assert "openai" not in times
+    assert "httpx" not in times
+    assert times["app.main"] < IMPORT_TIME_BUDGET_US
+
+
+def test_readyz(test_client):
+    """
+    Test the /readyz endpoint once startup has finished.
+    """
+    response = test_client.get("/readyz")
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_readyz_not_ready(test_client):
+    """
+    Test the /readyz endpoint before bootstrap has finished.
+    """
+    app.state.ready = False
+    
+    response = test_client.get("/readyz")
+    
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_marks_ready():
+    """
+    Test that bootstrap marks the application ready after creating indexes.
+    """
+    app.state.ready = False
+    
+    with patch("app.db.mongodb.ensure_indexes", AsyncMock()) as mock_ensure:
+        await bootstrap(app)
+    
+    mock_ensure.assert_awaited_once()
+    assert app.state.ready is True
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_failure_retries_with_backoff(test_client):
+    """
+    Test that a failed index bootstrap leaves the application not ready,
+    reports the error on /readyz, and retries with backoff until it succeeds.
+    """
+    app.state.ready = False
+    responses = []
+    
+    async def sleep(delay):
+        responses.append((delay, test_client.get("/readyz")))
+    
+    ensure = AsyncMock(side_effect=[Exception("duplicate key"), Exception("duplicate key"), None])
+    with patch("app.db.mongodb.ensure_indexes", ensure), patch("app.main.asyncio.sleep", sleep):
+        await bootstrap(app)
+    
+    assert [delay for delay, _ in responses] == [1, 2]
+    assert responses[0][1].status_code == 503
+    assert responses[0][1].json() == {"status": "starting", "error": "duplicate key"}
+    assert ensure.await_count == 3
+    assert app.state.ready is True
+    assert app.state.bootstrap_error is None
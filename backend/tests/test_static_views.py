@@ -0,0 +1,111 @@
+"""
+Tests for the pre-rendered static views.
+
+This module tests that the player list views are rendered to compressed
+files with their ETags, re-rendered only where players changed, served with
+the same ETag by the API, and rendered by one process per directory.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import gzip
+import json
+import os
+import pytest
+from unittest.mock import patch
+
+from app.services.repository import InMemoryPlayerRepository
+from app.services.sketches import SeasonStats
+from app.services.static_views import StaticViews, etag_of, render_players
+
+ICHIRO = {"id": 1, "Player": "Ichiro Suzuki", "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "704", "Rank": "1"}
+MUELLER = {"id": 2, "Player": "Bill Mueller", "AgeThatYear": "33", "Hits": 155, "Year": 2004, "Bats": "539", "Rank": "70"}
+BOGGS = {"id": 3, "Player": "Wade Boggs", "AgeThatYear": "27", "Hits": 240, "Year": 1985, "Bats": "653", "Rank": "4"}
+
+
+def read_file(directory, name):
+    with open(os.path.join(directory, name), "rb") as f:
+        return f.read()
+
+
+def read_view(directory, name):
+    body = read_file(directory, name)
+    assert gzip.decompress(read_file(directory, f"{name}.gz")) == body
+    return body
+
+
+@pytest.mark.asyncio
+async def test_renders_views_and_follows_changes(tmp_path):
+    """
+    Test that the list and season views are rendered with their ETags, and
+    that only the views of changed players are rendered again.
+    """
+    repository = InMemoryPlayerRepository([ICHIRO, MUELLER, BOGGS])
+    views = StaticViews(str(tmp_path))
+    
+    with patch("app.services.sketches.season_stats", SeasonStats()):
+        await views.refresh(repository)
+        assert json.loads(read_view(tmp_path, "players.json")) == [ICHIRO, MUELLER, BOGGS]
+        assert [player["id"] for player in json.loads(read_view(tmp_path, "seasons/2004.json"))] == [1, 2]
+        
+        await repository.replace(2, dict(MUELLER, Year=2003))
+        await repository.delete(3)
+        await repository.set_description(1, "Great hitter.")
+        await views.refresh(repository)
+    
+    assert [player["id"] for player in json.loads(read_view(tmp_path, "seasons/2004.json"))] == [1]
+    assert json.loads(read_view(tmp_path, "seasons/2003.json")) == [dict(MUELLER, Year=2003)]
+    assert not os.path.exists(tmp_path / "seasons" / "1985.json")
+    assert not os.path.exists(tmp_path / "seasons" / "1985.json.gz")
+    
+    manifest = json.loads(read_file(tmp_path, "manifest.json"))
+    assert manifest["seq"] == 5
+    assert sorted(manifest["views"]) == ["players.json", "seasons/2003.json", "seasons/2004.json"]
+    assert manifest["views"]["players.json"] == etag_of(read_view(tmp_path, "players.json"))
+
+
+@pytest.mark.asyncio
+async def test_unchanged_views_not_rewritten(tmp_path):
+    """
+    Test that a change that leaves a view's content the same does not rewrite its file.
+    """
+    repository = InMemoryPlayerRepository([ICHIRO, BOGGS])
+    views = StaticViews(str(tmp_path))
+    
+    with patch("app.services.sketches.season_stats", SeasonStats()):
+        await views.refresh(repository)
+        os.utime(tmp_path / "seasons" / "2004.json", ns=(0, 0))
+        await repository.replace(1, dict(ICHIRO))
+        await views.refresh(repository)
+    
+    assert os.stat(tmp_path / "seasons" / "2004.json").st_mtime_ns == 0
+    assert views.seq == 3
+
+
+def test_player_list_etag_matches_view(test_client, memory_repository):
+    """
+    Test that the API sends the view's ETag and body, and answers a matching If-None-Match with 304.
+    """
+    memory_repository._players = {1: dict(ICHIRO, _seq=1), 3: dict(BOGGS, _seq=2)}
+    memory_repository._seq = 2
+    body = render_players([ICHIRO])
+    
+    response = test_client.get("/api/players/?year=2004")
+    not_modified = test_client.get("/api/players/?year=2004", headers={"If-None-Match": etag_of(body)})
+    
+    assert response.content == body
+    assert response.headers["ETag"] == etag_of(body)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_one_renderer_per_directory(tmp_path):
+    """
+    Test that only one process at a time holds a directory's render lock.
+    """
+    first, second = StaticViews(str(tmp_path)), StaticViews(str(tmp_path))
+    
+    assert first._acquire()
+    assert not second._acquire()
+    first.release()
+    assert second._acquire()
+    second.release()
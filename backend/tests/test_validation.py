@@ -0,0 +1,109 @@
+"""
+Tests for batch validation of player documents.
+
+This module tests that batches of rows are validated straight into plain
+player documents, that invalid rows (including rows that are not objects)
+are reported individually without losing the rest of the batch, and that
+ingest skips and reports invalid players.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import json
+import pytest
+from typing import Annotated, List
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from pydantic import AfterValidator, TypeAdapter
+
+from app.models.player import PlayerDocument
+from app.services.player_jobs import run_ingest
+from app.services.repository import InMemoryPlayerRepository
+from app.services.validation import error_report, validate_players, validate_players_json
+
+ICHIRO = {"id": 1, "Player": "Ichiro Suzuki", "AgeThatYear": "30", "Hits": 262, "Year": 2004, "Bats": "704", "Rank": "1"}
+BOGGS = {"id": 2, "Player": "Wade Boggs", "AgeThatYear": "27", "Hits": 240, "Year": 1985, "Bats": "653", "Rank": "4"}
+
+
+def test_validates_into_documents():
+    """
+    Test that rows are validated into plain dicts, coercing values and dropping unknown fields.
+    """
+    documents, errors = validate_players([ICHIRO, dict(BOGGS, id="2", team="Red Sox")])
+    
+    assert documents == [ICHIRO, BOGGS]
+    assert all(type(document) is dict for document in documents)
+    assert errors == {}
+
+
+def test_reports_invalid_rows_and_keeps_the_rest():
+    """
+    Test that invalid rows are reported by row with their field errors, and the other rows kept.
+    """
+    rows = [ICHIRO, {"id": 3, "Player": "Nobody"}, "not a player", BOGGS, dict(BOGGS, id=4, Hits="many")]
+    
+    documents, errors = validate_players_json(json.dumps(rows).encode())
+    report = error_report(errors, first_row=1)
+    
+    assert documents == [ICHIRO, BOGGS]
+    assert [entry["row"] for entry in report] == [2, 3, 5]
+    assert {error["field"] for error in report[0]["errors"]} == {"AgeThatYear", "Hits", "Year", "Bats", "Rank"}
+    assert report[1]["errors"][0]["field"] == ""
+    assert report[2]["errors"] == [{"field": "Hits", "message": report[2]["errors"][0]["message"]}]
+    with pytest.raises(ValueError):
+        validate_players_json(b'{"id": 1}')
+
+
+def test_reports_rows_that_are_not_objects():
+    """
+    Test that rows which are not objects are each reported as invalid.
+    """
+    documents, errors = validate_players([1, "x"])
+    
+    assert documents == []
+    assert sorted(errors) == [0, 1]
+    assert all(row_errors[0]["field"] == "" for row_errors in errors.values())
+    
+    documents, errors = validate_players([ICHIRO, 1, "x", BOGGS])
+    assert documents == [ICHIRO, BOGGS]
+    assert sorted(errors) == [1, 2]
+
+
+def test_list_level_errors_fall_back_to_single_rows():
+    """
+    Test that rows are validated one at a time when the adapter rejects the list as a whole.
+    """
+    def unique_ids(documents):
+        if len({document["id"] for document in documents}) < len(documents):
+            raise ValueError("Duplicate player IDs")
+        return documents
+    
+    adapter = TypeAdapter(Annotated[List[PlayerDocument], AfterValidator(unique_ids)])
+    
+    documents, errors = validate_players([ICHIRO, dict(ICHIRO, Hits="many"), ICHIRO], adapter)
+    
+    assert documents == [ICHIRO, ICHIRO]
+    assert list(errors) == [1]
+    documents, errors = validate_players([ICHIRO, ICHIRO], adapter)
+    assert documents == [ICHIRO, ICHIRO]
+    assert errors == {}
+
+
+@pytest.mark.asyncio
+async def test_ingest_skips_invalid_players():
+    """
+    Test that the ingest job loads the valid players, fills in missing ranks and reports the rest.
+    """
+    players = [dict(ICHIRO, Rank=""), {"id": 2, "Player": "Wade Boggs"}, {k: v for k, v in BOGGS.items() if k != "Rank"}]
+    repository = InMemoryPlayerRepository()
+    response = httpx.Response(200, content=json.dumps(players).encode())
+    
+    with patch("app.services.player_jobs.create_player_repository", return_value=repository), \
+            patch("app.services.player_jobs.get_with_retries", AsyncMock(return_value=response)):
+        result = await run_ingest({}, AsyncMock())
+    
+    assert result["loaded"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert (await repository.get(1))["Rank"] == "262"
+    assert (await repository.get(2))["Rank"] == "240"
@@ -0,0 +1,98 @@
+"""
+Tests for the production worker settings.
+
+This module tests the Gunicorn worker class and worker pool sizing.
+
+Copyright (c) 2025 Ken Johansen. All rights reserved.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.core.workers import ProductionUvicornWorker, cgroup_cpu_limit, configured_worker_count, default_worker_count
+
+SHARED = {"EVENT_SOURCE": "change_stream", "JOB_STORE": "mongo", "PLAYER_REPOSITORY": "mongo"}
+
+
+def test_worker_uses_uvloop_and_httptools():
+    """
+    Test that the production worker pins the fast event loop and HTTP parser.
+    """
+    assert ProductionUvicornWorker.CONFIG_KWARGS["loop"] == "uvloop"
+    assert ProductionUvicornWorker.CONFIG_KWARGS["http"] == "httptools"
+
+
+def test_default_worker_count_uses_cpu_affinity():
+    """
+    Test that the default worker count follows the CPUs available to the process.
+    """
+    with patch("os.sched_getaffinity", return_value={0, 1, 2}, create=True), \
+            patch("app.core.workers.cgroup_cpu_limit", return_value=None):
+        assert default_worker_count() == 3
+
+
+def test_default_worker_count_uses_cgroup_v2_quota(tmp_path):
+    """
+    Test that a cgroup v2 CPU quota caps the worker count, rounded up.
+    """
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    
+    with patch("app.core.workers.CGROUP_V2_CPU_MAX", str(cpu_max)), \
+            patch("os.sched_getaffinity", return_value=set(range(16)), create=True):
+        assert default_worker_count() == 2
+        
+        cpu_max.write_text("max 100000\n")
+        assert default_worker_count() == 16
+
+
+def test_default_worker_count_uses_cgroup_v1_quota(tmp_path):
+    """
+    Test that a cgroup v1 CPU quota caps the worker count, and -1 means no quota.
+    """
+    (tmp_path / "cpu.cfs_quota_us").write_text("300000\n")
+    (tmp_path / "cpu.cfs_period_us").write_text("100000\n")
+    
+    with patch("app.core.workers.CGROUP_V2_CPU_MAX", str(tmp_path / "missing")), \
+            patch("app.core.workers.CGROUP_V1_CPU_DIR", str(tmp_path)), \
+            patch("os.sched_getaffinity", return_value=set(range(16)), create=True):
+        assert default_worker_count() == 3
+        
+        (tmp_path / "cpu.cfs_quota_us").write_text("-1\n")
+        assert cgroup_cpu_limit() is None
+        assert default_worker_count() == 16
+
+
+def test_default_worker_count_without_affinity():
+    """
+    Test that the default worker count falls back to the CPU count.
+    """
+    with patch("os.sched_getaffinity", side_effect=AttributeError, create=True), \
+            patch("app.core.workers.cgroup_cpu_limit", return_value=None):
+        with patch("os.cpu_count", return_value=None):
+            assert default_worker_count() == 1
+
+
+def test_configured_worker_count_with_shared_stores():
+    """
+    Test that with shared stores the pool follows WEB_CONCURRENCY, or the CPUs.
+    """
+    with patch("app.core.workers.default_worker_count", return_value=8):
+        assert configured_worker_count(SimpleNamespace(WEB_CONCURRENCY=0, **SHARED)) == 8
+        assert configured_worker_count(SimpleNamespace(WEB_CONCURRENCY=3, **SHARED)) == 3
+
+
+def test_configured_worker_count_with_process_local_stores():
+    """
+    Test that process-local stores default to one worker and refuse several.
+    """
+    settings = SimpleNamespace(WEB_CONCURRENCY=0, **dict(SHARED, JOB_STORE="memory"))
+    with patch("app.core.workers.default_worker_count", return_value=8):
+        assert configured_worker_count(settings) == 1
+        
+        settings.WEB_CONCURRENCY = 1
+        assert configured_worker_count(settings) == 1
+        
+        settings.WEB_CONCURRENCY = 4
+        with pytest.raises(ValueError, match="JOB_STORE=memory"):
+            configured_worker_count(settings)
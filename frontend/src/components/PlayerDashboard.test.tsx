@@ -191,6 +191,27 @@ describe('PlayerDashboard Component', () => {
     });
   });
 
+  test('reloads a fresh list after deleting a player', async () => {
+    jest.spyOn(window, 'confirm').mockReturnValue(true);
+    render(<PlayerDashboard />);
+    
+    // Wait for players to load
+    await waitFor(() => {
+      expect(screen.queryByText(/loading/i)).not.toBeInTheDocument();
+    });
+    expect(mockedAxios.get).toHaveBeenLastCalledWith(expect.stringMatching(/\/players$/));
+    
+    // Delete the first player
+    const deleteButtons = screen.getAllByRole('button', { name: /delete/i });
+    fireEvent.click(deleteButtons[0]);
+    
+    // The list is reloaded past the pre-rendered copy nginx serves
+    await waitFor(() => {
+      expect(mockedAxios.delete).toHaveBeenCalled();
+      expect(mockedAxios.get).toHaveBeenLastCalledWith(expect.stringMatching(/\/players\?fresh=1$/));
+    });
+  });
+
   test('opens player edit dialog when clicking edit button', async () => {
     render(<PlayerDashboard />);
     
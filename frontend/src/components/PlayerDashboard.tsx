@@ -47,11 +47,13 @@ function PlayerDashboard() {
     fetchPlayers();
   }, []);
 
-  const fetchPlayers = async () => {
+  // After a write, ask for a fresh list: nginx serves the plain list from a
+  // pre-rendered file that may not include the write yet (see nginx.conf)
+  const fetchPlayers = async (fresh = false) => {
     setLoading(true);
     setError(null);
     try {
-      const response = await axios.get(`${API_URL}/players`);
+      const response = await axios.get(`${API_URL}/players${fresh ? '?fresh=1' : ''}`);
       setPlayers(response.data);
       setFilteredPlayers(response.data);
     } catch (err) {
@@ -92,7 +94,7 @@ function PlayerDashboard() {
     if (window.confirm('Are you sure you want to delete this player?')) {
       try {
         await axios.delete(`${API_URL}/players/${id}`);
-        fetchPlayers();
+        fetchPlayers(true);
       } catch (err) {
         console.error('Error deleting player:', err);
         setError('Failed to delete player. Please try again later.');
@@ -111,7 +113,7 @@ function PlayerDashboard() {
         await axios.put(`${API_URL}/players/${player.id}`, player);
       }
       setEditDialogOpen(false);
-      fetchPlayers();
+      fetchPlayers(true);
     } catch (err) {
       console.error('Error saving player:', err);
       setError('Failed to save player. Please try again later.');